@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import abort, current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip variants are always written
+    brotli = None
+
+basedir = os.path.dirname(os.path.abspath(__file__))
+
+STATIC_DIR = os.path.join(basedir, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt')
+
+# Output asset -> static files concatenated into it, one bundle per page
+BUNDLES = {
+    'style.css': ['style.css'],
+    'login.css': ['login.css'],
+    'calendar.js': ['calendar.js'],
+    'keywords.js': ['keywords.js'],
+    'media_providers.js': ['media_providers.js'],
+    'news_providers.js': ['news_providers.js'],
+    'rssfeeds.js': ['rssfeeds.js'],
+    'progress.js': ['progress.js'],
+    'logo.png': ['logo.png'],
+}
+
+
+def build_assets(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """
+    Bundle, fingerprint and precompress the static assets.
+
+    Each bundle is written as ``<name>.<content hash>.<ext>`` into ``dist_dir`` together
+    with ``.gz`` and, when brotli is installed, ``.br`` variants, and ``manifest.json``
+    maps bundle names to the hashed files.
+
+    Returns:
+        dict: The manifest.
+    """
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_dir, source), 'rb') as f:
+                parts.append(f.read())
+        content = b'\n;\n'.join(parts) if name.endswith('.js') else b'\n'.join(parts)
+
+        stem, ext = os.path.splitext(name)
+        hashed = f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}'
+        path = os.path.join(dist_dir, hashed)
+        with open(path, 'wb') as f:
+            f.write(content)
+        if ext in COMPRESSIBLE:
+            with open(path + '.gz', 'wb') as f:
+                f.write(gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(path + '.br', 'wb') as f:
+                    f.write(brotli.compress(content, quality=11))
+        manifest[name] = hashed
+
+    with open(os.path.join(dist_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(dist_dir=DIST_DIR):
+    try:
+        with open(os.path.join(dist_dir, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(name):
+    """URL of a built asset, or of the plain static file when assets have not been built."""
+    hashed = current_app.extensions['assets'].get(name)
+    if hashed:
+        return url_for('dist_asset', filename=hashed)
+    return url_for('static', filename=name)
+
+
+def dist_asset(filename):
+    """Serve a fingerprinted asset, precompressed when the client accepts it."""
+    if filename == MANIFEST:
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.exists(os.path.join(DIST_DIR, filename + suffix)):
+            response = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(DIST_DIR, filename, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+def init_app(app):
+    """Register the ``asset_url`` template helper, the dist route and ``flask build-assets``."""
+    app.extensions['assets'] = load_manifest()
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.add_url_rule(f'{app.static_url_path}/dist/<path:filename>', 'dist_asset', dist_asset)
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Bundle, fingerprint and precompress static assets into static/dist."""
+        manifest = build_assets()
+        app.extensions['assets'] = manifest
+        for name, hashed in sorted(manifest.items()):
+            print(f'{name} -> {hashed}')
+
+
+if __name__ == '__main__':
+    for name, hashed in sorted(build_assets().items()):
+        print(f'{name} -> {hashed}')
@@ -0,0 +1,100 @@
+"""
+Closed-loop HTTP load test for the dashboards.
+
+    python benchmarks/load_test.py --base-url https://localhost:8443 --username admin --password ... \
+        --concurrency 16 --duration 30
+
+Each of ``--concurrency`` threads logs in once, then requests the paths in turn for
+``--duration`` seconds. Prints requests/sec and latency percentiles per path.
+"""
+import argparse
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+import requests
+import urllib3
+
+DEFAULT_PATHS = [
+    '/contentoire/providers/news/',
+    '/contentoire/providers/rss/',
+    '/contentoire/providers/media/',
+    '/contentoire/providers/keywords/',
+    '/contentoire/users/',
+    '/contentoire/scheduler/news',
+    '/contentoire/api/v1/news',
+]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def worker(args, deadline, latencies, errors, lock):
+    session = requests.Session()
+    session.verify = not args.insecure
+    if args.username:
+        session.post(f'{args.base_url}/contentoire/login',
+                     data={'username': args.username, 'password': args.password}, allow_redirects=False)
+
+    i = 0
+    while time.monotonic() < deadline:
+        path = args.paths[i % len(args.paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = session.get(args.base_url + path, allow_redirects=False)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies[path].append(elapsed)
+            if not ok:
+                errors[path] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='https://localhost:8443')
+    parser.add_argument('--username')
+    parser.add_argument('--password')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--insecure', action='store_true', help='Skip TLS certificate verification')
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+    args = parser.parse_args()
+    if args.insecure:
+        urllib3.disable_warnings()
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+    threads = [threading.Thread(target=worker, args=(args, deadline, latencies, errors, lock))
+               for _ in range(args.concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.monotonic() - started
+
+    total = sum(len(v) for v in latencies.values())
+    print(f'{total} requests in {wall:.1f}s with {args.concurrency} clients: {total / wall:.1f} req/s')
+    print(f"{'path':40} {'req/s':>8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for path in args.paths:
+        values = latencies[path]
+        if not values:
+            continue
+        print(f'{path:40} {len(values) / wall:8.1f} {statistics.mean(values) * 1000:8.1f} '
+              f'{percentile(values, 50) * 1000:8.1f} {percentile(values, 95) * 1000:8.1f} '
+              f'{percentile(values, 99) * 1000:8.1f} {errors[path]:7d}')
+
+
+if __name__ == '__main__':
+    main()
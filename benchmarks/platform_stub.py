@@ -0,0 +1,218 @@
+"""
+Local stand-in for the media platform APIs, to run ``workers/publisher.py`` without them.
+
+    python benchmarks/platform_stub.py --port 8082 --lost-rate 0.2 --no-idempotency
+
+Each platform is served under its own prefix, so a media provider whose parameters hold
+``{"api_url": "http://127.0.0.1:8082/twitter"}`` publishes here. The endpoints the
+adapters in ``shared/platforms.py`` call are answered, including the listings of recent
+posts, and faults can be injected:
+
+- ``--fail-rate``: share of posts answered 503 without being stored.
+- ``--lost-rate``: share of posts stored but answered 504, as when a response is lost.
+- ``--per-minute``: posts a minute per platform before answering 429 with Retry-After.
+- ``--no-idempotency``: ignore Idempotency-Key headers, like most real platforms.
+
+``GET /stats`` returns, per platform, the posts stored, the duplicates among them (the
+same title posted twice), and the 429s and injected errors. They are also printed on exit.
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class StubPlatforms:
+    def __init__(self, fail_rate, lost_rate, per_minute, idempotency):
+        self.fail_rate = fail_rate
+        self.lost_rate = lost_rate
+        self.per_minute = per_minute
+        self.idempotency = idempotency
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1000)
+        self.posts = defaultdict(list)  # platform -> [{'id', 'title', 'text', 'link', 'key'}]
+        self.by_key = {}  # (platform, idempotency key) -> post
+        self.containers = {}  # Instagram media containers waiting to be published
+        self.recent = defaultdict(deque)  # platform -> monotonic times of its last posts
+        self.stats = defaultdict(lambda: {'posts': 0, 'duplicates': 0, 'rate_limited': 0, 'failed': 0, 'lost': 0})
+
+    def create(self, platform, key, title, text, link=None):
+        """
+        Store a post, applying the injected faults.
+
+        Returns:
+            tuple: (post, None), or (None, (status, body, headers)) for an error answer.
+        """
+        with self.lock:
+            stats = self.stats[platform]
+            if self.idempotency and key and (platform, key) in self.by_key:
+                return self.by_key[platform, key], None
+            now = time.monotonic()
+            recent = self.recent[platform]
+            while recent and now - recent[0] >= 60:
+                recent.popleft()
+            if self.per_minute and len(recent) >= self.per_minute:
+                stats['rate_limited'] += 1
+                return None, (429, {'error': 'rate limited'}, {'Retry-After': str(int(60 - (now - recent[0])) + 1)})
+            if random.random() < self.fail_rate:
+                stats['failed'] += 1
+                return None, (503, {'error': 'unavailable'}, {})
+            recent.append(now)
+            post = {'id': str(next(self.ids)), 'title': title, 'text': text, 'link': link, 'key': key}
+            if any(existing['title'] == title for existing in self.posts[platform]):
+                stats['duplicates'] += 1
+            self.posts[platform].append(post)
+            stats['posts'] += 1
+            if key:
+                self.by_key[platform, key] = post
+            if random.random() < self.lost_rate:
+                stats['lost'] += 1
+                return None, (504, {'error': 'gateway timeout'}, {})
+            return post, None
+
+    def listing(self, platform):
+        with self.lock:
+            return list(reversed(self.posts[platform]))[:25]
+
+    def route(self, method, path, params, key):
+        """Answer one API call as ``(status, body, headers)``."""
+        platform, _, rest = path.lstrip('/').partition('/')
+        rest = '/' + rest
+
+        def title_of(text):
+            return (text or '').split('\n\n', 1)[0]
+
+        if platform == 'reddit':
+            if rest == '/api/v1/access_token':
+                return 200, {'access_token': 'stub-token', 'token_type': 'bearer', 'expires_in': 3600}, {}
+            if rest == '/api/submit' and method == 'POST':
+                post, error = self.create(platform, key, params.get('title', ''), params.get('text', ''), params.get('url'))
+                if error:
+                    return error
+                return 200, {'json': {'errors': [], 'data': {'name': f"t3_{post['id']}", 'url': post['link']}}}, {}
+            if re.fullmatch(r'/user/[^/]+/submitted', rest):
+                children = [{'data': {'name': f"t3_{p['id']}", 'url': p['link'], 'title': p['title']}}
+                            for p in self.listing(platform)]
+                return 200, {'data': {'children': children}}, {}
+        elif platform == 'facebook' and re.fullmatch(r'/[^/]+/feed', rest):
+            if method == 'POST':
+                message = params.get('message', '')
+                post, error = self.create(platform, key, title_of(message), message, params.get('link'))
+                return error or (200, {'id': post['id']}, {})
+            data = [{'id': p['id'], 'message': p['text'], 'permalink_url': f"https://facebook.test/{p['id']}"}
+                    for p in self.listing(platform)]
+            return 200, {'data': data}, {}
+        elif platform == 'instagram':
+            if re.fullmatch(r'/[^/]+/media', rest) and method == 'POST':
+                container = str(next(self.ids))
+                with self.lock:
+                    self.containers[container] = params.get('caption', '')
+                return 200, {'id': container}, {}
+            if re.fullmatch(r'/[^/]+/media_publish', rest):
+                caption = self.containers.get(params.get('creation_id'))
+                if caption is None:
+                    return 400, {'error': {'message': 'Unknown creation_id'}}, {}
+                post, error = self.create(platform, key, title_of(caption), caption)
+                return error or (200, {'id': post['id']}, {})
+            if re.fullmatch(r'/[^/]+/media', rest):
+                data = [{'id': p['id'], 'caption': p['text'], 'permalink': f"https://instagram.test/p/{p['id']}"}
+                        for p in self.listing(platform)]
+                return 200, {'data': data}, {}
+        elif platform == 'twitter':
+            if rest == '/tweets' and method == 'POST':
+                text = params.get('text', '')
+                post, error = self.create(platform, key, title_of(text), text)
+                return error or (201, {'data': {'id': post['id'], 'text': text}}, {})
+            if re.fullmatch(r'/users/[^/]+/tweets', rest):
+                return 200, {'data': [{'id': p['id'], 'text': p['text']} for p in self.listing(platform)]}, {}
+        elif platform == 'linkedin' and rest == '/posts':
+            if method == 'POST':
+                commentary = params.get('commentary', '')
+                link = params.get('content', {}).get('article', {}).get('source')
+                post, error = self.create(platform, key, title_of(commentary), commentary, link)
+                if error:
+                    return error
+                return 201, {}, {'x-restli-id': f"urn:li:share:{post['id']}"}
+            elements = [{'id': f"urn:li:share:{p['id']}", 'commentary': p['text']} for p in self.listing(platform)]
+            return 200, {'elements': elements}, {}
+        elif platform == 'tiktok' and rest == '/post/publish/content/init/':
+            info = params.get('post_info', {})
+            post, error = self.create(platform, key, info.get('title', ''), info.get('description', ''))
+            return error or (200, {'data': {'publish_id': f"p_{post['id']}"}, 'error': {'code': 'ok'}}, {})
+        return 404, {'error': f'No stub for {method} {path}'}, {}
+
+    def summary(self):
+        with self.lock:
+            return {platform: dict(stats) for platform, stats in self.stats.items()}
+
+
+def make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def reply(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def handle_call(self, method):
+            url = urlsplit(self.path)
+            if url.path == '/stats':
+                self.reply(200, stub.summary())
+                return
+            params = dict(parse_qsl(url.query))
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                params.update(json.loads(body or '{}'))
+            else:
+                params.update(parse_qsl(body))
+            self.reply(*stub.route(method, url.path, params, self.headers.get('Idempotency-Key')))
+
+        def do_GET(self):
+            self.handle_call('GET')
+
+        def do_POST(self):
+            self.handle_call('POST')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--lost-rate', type=float, default=0.0)
+    parser.add_argument('--per-minute', type=int, default=0, help='0 for no limit')
+    parser.add_argument('--no-idempotency', action='store_true')
+    args = parser.parse_args()
+
+    stub = StubPlatforms(args.fail_rate, args.lost_rate, args.per_minute, not args.no_idempotency)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(stub))
+    server.daemon_threads = True
+    print(f"Platform stubs on http://{args.host}:{args.port}/<platform>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(stub.summary()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Local stand-in for the Telegram Bot API, to run ``workers/telegram_bot.py`` without Telegram.
+
+    python benchmarks/telegram_stub.py --port 8081 --press 0
+    TELEGRAM_API_URL=http://127.0.0.1:8081/bot TELEGRAM_BOT_TOKEN=test TELEGRAM_CHAT_IDS=1,2,-3 \
+        python workers/telegram_bot.py
+
+It answers the methods the approval bot uses and applies Telegram's flood limits: a
+message to a chat less than ``--chat-interval`` seconds after the previous one (three
+seconds for groups, i.e. negative IDs), or more than ``--global-rate`` messages in a
+second, gets a 429 with ``retry_after``. With ``--press N`` every message's Nth button is
+pressed ``--press-delay`` seconds after it arrives, and the press is delivered through
+``getUpdates``. ``POST /press`` with ``{"chat_id", "message_id", "data"}`` presses a
+button by hand, and ``GET /stats`` returns the counters printed on exit.
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+GROUP_INTERVAL = 3.0  # 20 messages a minute
+
+
+class StubApi:
+    def __init__(self, chat_interval, global_rate, press, press_delay):
+        self.chat_interval = chat_interval
+        self.global_rate = global_rate
+        self.press = press
+        self.press_delay = press_delay
+        self.lock = threading.Condition()
+        self.message_ids = itertools.count(1)
+        self.update_ids = itertools.count(1)
+        self.callback_ids = itertools.count(1)
+        self.updates = []
+        self.messages = {}  # (chat_id, message_id) -> message
+        self.last_sent = {}  # chat_id -> monotonic time of its last accepted message
+        self.recent = deque()  # monotonic times of the messages accepted in the last second
+        self.stats = {'sent': 0, 'flood_429': 0, 'callbacks_answered': 0, 'edits': 0, 'presses': 0}
+
+    def flood_wait(self, chat_id):
+        """Seconds the sender should have waited, 0 when the message is within the limits."""
+        now = time.monotonic()
+        while self.recent and now - self.recent[0] >= 1:
+            self.recent.popleft()
+        interval = GROUP_INTERVAL if chat_id < 0 else self.chat_interval
+        # Some slack for network jitter, a request sent on time may arrive early after a slow one
+        wait = max(0.0, self.last_sent.get(chat_id, -interval) + interval * 0.8 - now)
+        if len(self.recent) >= self.global_rate:
+            wait = max(wait, 1 - (now - self.recent[0]))
+        if wait:
+            return wait
+        self.last_sent[chat_id] = now
+        self.recent.append(now)
+        return 0
+
+    def send_message(self, params):
+        chat_id = int(params['chat_id'])
+        with self.lock:
+            wait = self.flood_wait(chat_id)
+            if wait:
+                self.stats['flood_429'] += 1
+                retry_after = max(1, round(wait))
+                return 429, {'ok': False, 'error_code': 429, 'description': f'Too Many Requests: retry after {retry_after}',
+                             'parameters': {'retry_after': retry_after}}
+            message = {
+                'message_id': next(self.message_ids),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'group' if chat_id < 0 else 'private', 'title': f'chat {chat_id}'},
+                'text': params.get('text', ''),
+            }
+            if params.get('reply_markup'):
+                message['reply_markup'] = params['reply_markup']
+            self.messages[chat_id, message['message_id']] = message
+            self.stats['sent'] += 1
+        if self.press is not None and message.get('reply_markup'):
+            buttons = [button for row in message['reply_markup']['inline_keyboard'] for button in row]
+            if self.press < len(buttons):
+                timer = threading.Timer(self.press_delay, self.press_button,
+                                        (chat_id, message['message_id'], buttons[self.press]['callback_data']))
+                timer.daemon = True
+                timer.start()
+        return 200, {'ok': True, 'result': message}
+
+    def press_button(self, chat_id, message_id, data):
+        with self.lock:
+            message = self.messages.get((chat_id, message_id))
+            if message is None:
+                return False
+            self.updates.append({
+                'update_id': next(self.update_ids),
+                'callback_query': {
+                    'id': str(next(self.callback_ids)),
+                    'from': {'id': 1000, 'is_bot': False, 'first_name': 'Editor', 'username': 'editor'},
+                    'chat_instance': str(chat_id),
+                    'message': message,
+                    'data': data,
+                },
+            })
+            self.stats['presses'] += 1
+            self.lock.notify_all()
+        return True
+
+    def get_updates(self, params):
+        offset = int(params.get('offset') or 0)
+        deadline = time.monotonic() + float(params.get('timeout') or 0)
+        with self.lock:
+            # Updates before the offset are confirmed and forgotten
+            self.updates = [update for update in self.updates if update['update_id'] >= offset]
+            while not self.updates and time.monotonic() < deadline:
+                self.lock.wait(deadline - time.monotonic())
+            return 200, {'ok': True, 'result': list(self.updates)}
+
+    def edit_reply_markup(self, params):
+        with self.lock:
+            message = self.messages.get((int(params['chat_id']), int(params['message_id'])))
+            if message is None:
+                return 400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: message to edit not found'}
+            message['reply_markup'] = params.get('reply_markup')
+            self.stats['edits'] += 1
+            return 200, {'ok': True, 'result': message}
+
+    def answer_callback_query(self, params):
+        with self.lock:
+            self.stats['callbacks_answered'] += 1
+        return 200, {'ok': True, 'result': True}
+
+    def call(self, method, params):
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': {'id': 1, 'is_bot': True, 'first_name': 'Stub', 'username': 'stub_bot'}}
+        handler = {
+            'sendMessage': self.send_message,
+            'getUpdates': self.get_updates,
+            'editMessageReplyMarkup': self.edit_reply_markup,
+            'answerCallbackQuery': self.answer_callback_query,
+        }.get(method)
+        if handler is None:
+            return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+        return handler(params)
+
+
+def make_handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, as the bot's connection pool expects
+
+        def reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def params(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                params = json.loads(body or '{}')
+            else:
+                params = dict(parse_qsl(body))
+            # Form posts carry objects such as reply_markup as JSON strings
+            for key, value in params.items():
+                if isinstance(value, str) and value[:1] in '{[':
+                    try:
+                        params[key] = json.loads(value)
+                    except ValueError:
+                        pass
+            return params
+
+        def do_GET(self):
+            if self.path == '/stats':
+                with api.lock:
+                    self.reply(200, dict(api.stats))
+            else:
+                self.do_POST()
+
+        def do_POST(self):
+            if self.path == '/press':
+                params = self.params()
+                pressed = api.press_button(int(params['chat_id']), int(params['message_id']), params['data'])
+                self.reply(200 if pressed else 404, {'ok': pressed})
+                return
+            # /bot<token>/<method>
+            parts = self.path.strip('/').split('/')
+            if len(parts) != 2 or not parts[0].startswith('bot'):
+                self.reply(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+                return
+            self.reply(*api.call(parts[1], self.params()))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--chat-interval', type=float, default=1.0)
+    parser.add_argument('--global-rate', type=int, default=30)
+    parser.add_argument('--press', type=int, default=None, help='index of the button to press on every message')
+    parser.add_argument('--press-delay', type=float, default=1.0)
+    args = parser.parse_args()
+
+    api = StubApi(args.chat_interval, args.global_rate, args.press, args.press_delay)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(api))
+    server.daemon_threads = True
+    print(f"Bot API stub on http://{args.host}:{args.port}/bot<token>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(api.stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Compare worker startup time: full web app (``wsgi.create_app``) vs ``data.bootstrap``.
+
+    python benchmarks/worker_startup.py --runs 10
+
+Each run is a fresh interpreter that builds the app, opens an app context and runs one
+query, which is what every cron-launched worker does before its real work.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    # What the workers used to do: importing wsgi builds one app, then they built another
+    'wsgi.create_app': (
+        'from wsgi import create_app\n'
+        'app = create_app()\n'
+    ),
+    'data.bootstrap': (
+        'from data.bootstrap import create_worker_app\n'
+        'app = create_worker_app()\n'
+    ),
+}
+
+QUERY = (
+    'from models.provider import NewsProvider\n'
+    'with app.app_context():\n'
+    '    NewsProvider.query.first()\n'
+)
+
+
+def run(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    subprocess.run([sys.executable, '-c', 'import wsgi'], cwd=ROOT, check=True)  # warm bytecode caches
+    print(f"{'startup path':20} {'mean ms':>8} {'median ms':>10} {'min ms':>8}")
+    for name, code in SCENARIOS.items():
+        timings = [run(code + QUERY) for _ in range(args.runs)]
+        print(f'{name:20} {statistics.mean(timings) * 1000:8.0f} {statistics.median(timings) * 1000:10.0f} '
+              f'{min(timings) * 1000:8.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import os
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from data.db import db
+from data.publishing import WAITING_STATUSES
+from models.approval import ApprovalRequest
+from models.news import News, NewsCategory, NewsSummary, NewsTag, news_keywords
+from models.schedule import ScheduledPost
+
+basedir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ARCHIVE_DIR = os.environ.get('NEWS_ARCHIVE_DIR', os.path.join(basedir, 'data/archive/news'))
+RETENTION_DAYS = int(os.environ.get('NEWS_RETENTION_DAYS', 90))
+BATCH_SIZE = 5000
+
+ARCHIVE_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('title', pa.string()),
+    ('authors', pa.string()),
+    ('news_text', pa.string()),
+    ('url', pa.string()),
+    ('published_date', pa.string()),
+    ('language', pa.string()),
+    ('summary', pa.string()),
+    ('options', pa.string()),
+    ('guid', pa.string()),
+    ('source', pa.string()),
+    ('sentiment', pa.float64()),
+    ('categories', pa.list_(pa.string())),
+    ('tags', pa.list_(pa.string())),
+    ('summaries', pa.list_(pa.struct([
+        ('title', pa.string()),
+        ('summary', pa.string()),
+        ('model', pa.string()),
+        ('prompt_version', pa.int64()),
+        ('created_at', pa.timestamp('us')),
+    ]))),
+    ('posts', pa.list_(pa.struct([
+        ('media_provider_id', pa.int64()),
+        ('status', pa.string()),
+        ('scheduled_at', pa.timestamp('us')),
+        ('published_at', pa.timestamp('us')),
+        ('external_id', pa.string()),
+        ('external_url', pa.string()),
+    ]))),
+    ('add_date', pa.timestamp('us')),
+    ('provider_id', pa.int64()),
+    ('keyword_id', pa.int64()),
+    ('feed_id', pa.int64()),
+    ('processed', pa.timestamp('us')),
+])
+
+
+def _row(news, posts):
+    row = {field.name: getattr(news, field.name) for field in ARCHIVE_SCHEMA
+           if field.name not in ('categories', 'tags', 'summaries', 'posts')}
+    row['categories'] = [category.name for category in news.categories]
+    row['tags'] = [tag.tag for tag in news.tags]
+    row['summaries'] = [{'title': s.title, 'summary': s.summary, 'model': s.model,
+                         'prompt_version': s.prompt_version, 'created_at': s.created_at}
+                        for s in news.summaries]
+    row['posts'] = [{'media_provider_id': p.media_provider_id, 'status': p.status, 'scheduled_at': p.scheduled_at,
+                     'published_at': p.published_at, 'external_id': p.external_id, 'external_url': p.external_url}
+                    for p in posts]
+    return row
+
+
+def archive_news(older_than_days=RETENTION_DAYS, archive_dir=ARCHIVE_DIR, batch_size=BATCH_SIZE):
+    """
+    Move news older than the retention window into monthly Parquet partitions.
+
+    Rows are written to ``<archive_dir>/month=YYYY-MM/part-<first_id>-<last_id>.parquet``
+    and only deleted from the ``news`` table once their batch has been written, so an
+    interrupted run can simply be started again. Their published or failed posts are
+    archived with them; articles with posts still waiting to be published are kept until
+    those are done. Must be called inside an app context.
+
+    Args:
+        older_than_days (int): Articles added before now minus this many days are archived.
+        archive_dir (str): Root directory of the archive dataset.
+        batch_size (int): Number of rows moved per transaction.
+
+    Returns:
+        int: The number of archived articles.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    waiting = (db.select(ScheduledPost.id)
+               .where(ScheduledPost.news_id == News.id, ScheduledPost.status.in_(WAITING_STATUSES))
+               .exists())
+    archived = 0
+    after_id = 0
+    while True:
+        batch = (News.query
+                 .options(db.selectinload(News.categories), db.selectinload(News.tags),
+                          db.selectinload(News.summaries))
+                 .filter(News.add_date < cutoff, News.id > after_id, ~waiting)
+                 .order_by(News.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+
+        ids = [news.id for news in batch]
+        after_id = ids[-1]
+        posts = {}
+        for post in ScheduledPost.query.filter(ScheduledPost.news_id.in_(ids)).order_by(ScheduledPost.id):
+            posts.setdefault(post.news_id, []).append(post)
+
+        months = {}
+        for news in batch:
+            months.setdefault(news.add_date.strftime('%Y-%m'), []).append(_row(news, posts.get(news.id, [])))
+
+        for month, rows in months.items():
+            partition = os.path.join(archive_dir, f'month={month}')
+            os.makedirs(partition, exist_ok=True)
+            path = os.path.join(partition, f"part-{rows[0]['id']}-{rows[-1]['id']}.parquet")
+            table = pa.Table.from_pylist(rows, schema=ARCHIVE_SCHEMA)
+            pq.write_table(table, path, compression='zstd')
+
+        NewsCategory.query.filter(NewsCategory.news_id.in_(ids)).delete(synchronize_session=False)
+        NewsTag.query.filter(NewsTag.news_id.in_(ids)).delete(synchronize_session=False)
+        NewsSummary.query.filter(NewsSummary.news_id.in_(ids)).delete(synchronize_session=False)
+        ApprovalRequest.query.filter(ApprovalRequest.news_id.in_(ids)).delete(synchronize_session=False)
+        ScheduledPost.query.filter(ScheduledPost.news_id.in_(ids),
+                                   ScheduledPost.status.notin_(WAITING_STATUSES)).delete(synchronize_session=False)
+        db.session.execute(news_keywords.delete().where(news_keywords.c.news_id.in_(ids)))
+        # An article scheduled again since the batch was read stays, rather than orphan its post
+        News.query.filter(News.id.in_(ids), ~waiting).delete(synchronize_session=False)
+        db.session.commit()
+        archived += len(ids)
+
+    return archived
+
+
+def _dataset(archive_dir):
+    if not os.path.isdir(archive_dir):
+        return None
+    return ds.dataset(archive_dir, format='parquet', schema=ARCHIVE_SCHEMA.append(pa.field('month', pa.string())),
+                      partitioning='hive')
+
+
+def _month_filter(start, end):
+    expression = None
+    if start:
+        expression = pc.field('month') >= start.strftime('%Y-%m')
+    if end:
+        upper = pc.field('month') <= end.strftime('%Y-%m')
+        expression = upper if expression is None else expression & upper
+    return expression
+
+
+def read_archive(start=None, end=None, columns=None, archive_dir=ARCHIVE_DIR):
+    """
+    Read archived news as an Arrow table.
+
+    Partitions outside ``start``/``end`` are pruned by month without being opened.
+
+    Args:
+        start (datetime, optional): Earliest ``add_date`` to include.
+        end (datetime, optional): Latest ``add_date`` to include.
+        columns (list, optional): Columns to project, all of them by default.
+        archive_dir (str): Root directory of the archive dataset.
+
+    Returns:
+        pyarrow.Table: The matching archived rows.
+    """
+    dataset = _dataset(archive_dir)
+    if dataset is None:
+        return ARCHIVE_SCHEMA.empty_table() if columns is None else ARCHIVE_SCHEMA.empty_table().select(columns)
+
+    expression = _month_filter(start, end)
+    if start:
+        expression = expression & (pc.field('add_date') >= pa.scalar(start, pa.timestamp('us')))
+    if end:
+        expression = expression & (pc.field('add_date') <= pa.scalar(end, pa.timestamp('us')))
+    return dataset.to_table(columns=columns or ARCHIVE_SCHEMA.names, filter=expression)
+
+
+def search_archive(text, limit=50, start=None, end=None, archive_dir=ARCHIVE_DIR):
+    """
+    Case-insensitive substring search over archived titles and summaries.
+
+    Intended as a fallback for searches that find nothing in the hot ``news`` table.
+
+    Args:
+        text (str): The text to look for.
+        limit (int): Maximum number of results.
+        start (datetime, optional): Earliest ``add_date`` to search.
+        end (datetime, optional): Latest ``add_date`` to search.
+        archive_dir (str): Root directory of the archive dataset.
+
+    Returns:
+        list: Archived articles as dictionaries, newest first.
+    """
+    dataset = _dataset(archive_dir)
+    if dataset is None:
+        return []
+
+    expression = (pc.match_substring(pc.field('title'), text, ignore_case=True) |
+                  pc.match_substring(pc.field('summary'), text, ignore_case=True))
+    months = _month_filter(start, end)
+    if months is not None:
+        expression = months & expression
+
+    columns = ['id', 'title', 'url', 'summary', 'published_date', 'add_date', 'provider_id', 'feed_id',
+               'source', 'categories']
+    table = dataset.to_table(columns=columns, filter=expression)
+    table = table.sort_by([('add_date', 'descending')]).slice(0, limit)
+    return table.to_pylist()
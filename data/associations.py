@@ -0,0 +1,76 @@
+from data.db import db
+from models.provider import (
+    FeedProvider,
+    MediaProvider,
+    NewsProvider,
+    SearchKeyword,
+    keyword_feed_providers,
+    keyword_medias,
+    keyword_news_providers,
+)
+
+# Owner kind -> (owner model, association table, owner column in that table)
+KEYWORD_ASSOCIATIONS = {
+    'news': (NewsProvider, keyword_news_providers, 'news_provider_id'),
+    'media': (MediaProvider, keyword_medias, 'media_id'),
+    'rss': (FeedProvider, keyword_feed_providers, 'feed_provider_id'),
+}
+
+
+def keyword_choices(kind, owner_id):
+    """
+    List every keyword and whether it is linked to an owner, in a single query.
+
+    Args:
+        kind (str): One of ``KEYWORD_ASSOCIATIONS``.
+        owner_id (int): The ID of the provider or feed.
+
+    Returns:
+        list: Dictionaries with 'id', 'keyword' and 'selected' keys.
+    """
+    _, table, owner_column = KEYWORD_ASSOCIATIONS[kind]
+    rows = (db.session.query(SearchKeyword.id, SearchKeyword.keyword, table.c.keyword_id.isnot(None))
+            .outerjoin(table, db.and_(table.c.keyword_id == SearchKeyword.id,
+                                      table.c[owner_column] == owner_id))
+            .order_by(SearchKeyword.id)
+            .all())
+    return [{'id': id, 'keyword': keyword, 'selected': bool(selected)} for id, keyword, selected in rows]
+
+
+def keyword_ids_by_name(names):
+    """Resolve keyword names to IDs with one query, ignoring unknown names."""
+    if not names:
+        return []
+    return [id for (id,) in db.session.query(SearchKeyword.id).filter(SearchKeyword.keyword.in_(set(names)))]
+
+
+def set_keywords(kind, owner_id, keyword_ids):
+    """
+    Make the keywords linked to an owner exactly ``keyword_ids``.
+
+    Only the difference with the current links is written, as one bulk DELETE and one
+    bulk INSERT. Unknown keyword IDs are ignored. The caller commits.
+
+    Args:
+        kind (str): One of ``KEYWORD_ASSOCIATIONS``.
+        owner_id (int): The ID of the provider or feed.
+        keyword_ids (iterable): The keyword IDs that should be linked.
+
+    Returns:
+        tuple: The sets of added and removed keyword IDs.
+    """
+    _, table, owner_column = KEYWORD_ASSOCIATIONS[kind]
+    owner = table.c[owner_column]
+    desired = set(keyword_ids)
+    current = {id for (id,) in db.session.execute(db.select(table.c.keyword_id).where(owner == owner_id))}
+
+    removed = current - desired
+    added = desired - current
+    if added:
+        added = {id for (id,) in db.session.query(SearchKeyword.id).filter(SearchKeyword.id.in_(added))}
+
+    if removed:
+        db.session.execute(table.delete().where(owner == owner_id, table.c.keyword_id.in_(removed)))
+    if added:
+        db.session.execute(table.insert(), [{owner_column: owner_id, 'keyword_id': id} for id in sorted(added)])
+    return added, removed
@@ -0,0 +1,33 @@
+from flask import Flask
+
+from data.db import configure_db, db
+
+
+def create_worker_app():
+    """
+    Create the smallest app that gives workers a configured database session.
+
+    Unlike ``wsgi.create_app`` this registers no blueprints, OAuth clients or login
+    manager, and importing this module does not import the web stack. Workers import
+    the models they need themselves; the remaining models are only loaded here so that
+    foreign keys between tables resolve.
+
+    Usage::
+
+        app = create_worker_app()
+        with app.app_context():
+            News.query...
+    """
+    app = Flask('contentoire-worker')
+    configure_db(app)
+    db.init_app(app)
+
+    import models.approval  # noqa: F401
+    import models.ingestion  # noqa: F401
+    import models.job  # noqa: F401
+    import models.news  # noqa: F401
+    import models.provider  # noqa: F401
+    import models.quota  # noqa: F401
+    import models.schedule  # noqa: F401
+    import models.user  # noqa: F401
+    return app
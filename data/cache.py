@@ -0,0 +1,167 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUBackend:
+    """Thread-safe in-process LRU store with per-entry expiry."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def generation(self, namespace):
+        return self._generations.get(namespace, 0)
+
+    def bump_generation(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            prefix = f'{namespace}:'
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generations.clear()
+
+
+class RedisBackend:
+    """Shared store for multi-process deployments, values are pickled."""
+
+    def __init__(self, url, prefix='contentoire:cache:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return _MISSING if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def generation(self, namespace):
+        return int(self.client.get(f'{self.prefix}{namespace}:generation') or 0)
+
+    def bump_generation(self, namespace):
+        # Old entries become unreachable and expire with their TTL
+        self.client.incr(f'{self.prefix}{namespace}:generation')
+
+    def clear(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+
+class Cache:
+    """
+    Application cache for data that only changes when an admin edits it.
+
+    Entries live in a namespace; ``invalidate(namespace)`` drops all of them at once by
+    moving the namespace to a new generation. The backend is an in-process LRU by default
+    or Redis when ``CACHE_PROVIDER=redis``, which is needed to share invalidations between
+    several server processes. Backend errors are logged and treated as misses.
+    """
+
+    def __init__(self):
+        self.backend = LRUBackend()
+        self.default_ttl = 3600
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def init_app(self, app):
+        provider = app.config.get('CACHE_PROVIDER', os.environ.get('CACHE_PROVIDER', 'memory'))
+        self.default_ttl = int(app.config.get('CACHE_TTL', os.environ.get('CACHE_TTL', 3600)))
+        if provider == 'redis':
+            url = app.config.get('REDIS_URL', os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+            self.backend = RedisBackend(url)
+        else:
+            self.backend = LRUBackend(int(app.config.get('CACHE_MAX_ENTRIES', 1024)))
+        app.extensions['cache'] = self
+
+    def _count(self, namespace, outcome):
+        with self._stats_lock:
+            stats = self._stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'invalidations': 0, 'errors': 0})
+            stats[outcome] += 1
+
+    def get_or_set(self, namespace, name, factory, ttl=None):
+        """Return the cached value of ``namespace``/``name``, computing it with ``factory`` on a miss."""
+        try:
+            key = f'{namespace}:{self.backend.generation(namespace)}:{name}'
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning('Cache read failed for %s/%s: %s', namespace, name, e)
+            self._count(namespace, 'errors')
+            return factory()
+
+        if value is not _MISSING:
+            self._count(namespace, 'hits')
+            return value
+
+        self._count(namespace, 'misses')
+        value = factory()
+        try:
+            self.backend.set(key, value, ttl or self.default_ttl)
+        except Exception as e:
+            logger.warning('Cache write failed for %s/%s: %s', namespace, name, e)
+            self._count(namespace, 'errors')
+        return value
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            try:
+                self.backend.bump_generation(namespace)
+            except Exception as e:
+                logger.warning('Cache invalidation failed for %s: %s', namespace, e)
+                self._count(namespace, 'errors')
+            else:
+                self._count(namespace, 'invalidations')
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """Hit/miss counters of this process per namespace."""
+        with self._stats_lock:
+            namespaces = {namespace: dict(stats) for namespace, stats in self._stats.items()}
+        for stats in namespaces.values():
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else None
+        return {'backend': type(self.backend).__name__, 'namespaces': namespaces}
@@ -1,7 +1,33 @@
+import os
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 db = SQLAlchemy()
 
+basedir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure_db(app):
+    """Set the database configuration shared by the web app and the workers."""
+    # Configure SQLite database; the tests point CONTENTOIRE_DATABASE_URI at a scratch file
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+        'CONTENTOIRE_DATABASE_URI', 'sqlite:///' + os.path.join(basedir, 'data/contentoire.db'))
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Several processes share the SQLite file: wait for locks instead of failing
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers in the web workers proceed while an ingestion worker writes
+    if type(dbapi_connection).__module__.startswith('sqlite3'):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
 '''
 flask db init         # Only once, to initialize migrations folder
 flask db migrate -m "Initial migration"
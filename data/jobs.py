@@ -0,0 +1,190 @@
+import random
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from data.db import db
+from models.job import Job
+from shared.job_types import decode_task, encode_task
+from sqlalchemy.exc import IntegrityError
+
+VISIBILITY_TIMEOUT = 300
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    stage: str
+    task: object
+    priority: int
+    attempts: int
+    max_attempts: int
+    lease: str
+
+
+def enqueue(task, priority=0, key=None, delay=0, max_attempts=5):
+    """
+    Queue a task from ``shared.job_types`` for its stage.
+
+    The job is added to the current session, so it is committed atomically with the rows
+    that caused it. The caller commits.
+
+    Args:
+        task: A task dataclass, e.g. ``SummarizeTask(news_id=1)``.
+        priority (int): Higher priorities are dequeued first.
+        key (str): Optional idempotency key. While a job with the same stage and key
+            exists, enqueueing another one is a no-op.
+        delay (int): Seconds before the job becomes visible.
+        max_attempts (int): Deliveries before the job is dead-lettered.
+
+    Returns:
+        Job: The queued job, or None when ``key`` was already queued.
+    """
+    job = Job(stage=task.stage, key=key, payload=encode_task(task), priority=priority,
+              max_attempts=max_attempts, available_at=datetime.now() + timedelta(seconds=delay))
+    try:
+        with db.session.begin_nested():
+            db.session.add(job)
+    except IntegrityError:
+        return None
+    return job
+
+
+def dequeue(stage, limit=10, visibility_timeout=VISIBILITY_TIMEOUT):
+    """
+    Claim up to ``limit`` visible jobs of a stage, highest priority first, and commit.
+
+    Claimed jobs stay invisible for ``visibility_timeout`` seconds. A job that is neither
+    acknowledged nor failed by then is delivered again, or dead-lettered once it has used
+    all its attempts. Each claim is a single UPDATE, so concurrent consumers never receive
+    the same job.
+
+    Returns:
+        list: ``ClaimedJob`` instances to pass to ``ack``, ``fail`` or ``extend``.
+    """
+    now = datetime.now()
+    lease = secrets.token_hex(8)
+
+    # Jobs whose consumer died on their last attempt
+    db.session.execute(
+        db.update(Job)
+        .where(Job.stage == stage, Job.status == 'running', Job.available_at <= now,
+               Job.attempts >= Job.max_attempts)
+        .values(status='dead', lease=None, last_error=db.func.coalesce(Job.last_error, 'Visibility timeout'))
+        .execution_options(synchronize_session=False))
+
+    candidates = (db.select(Job.id)
+                  .where(Job.stage == stage, Job.status.in_(('queued', 'running')), Job.available_at <= now,
+                         Job.attempts < Job.max_attempts)
+                  .order_by(Job.priority.desc(), Job.id)
+                  .limit(limit)
+                  .scalar_subquery())
+    rows = db.session.execute(
+        db.update(Job)
+        .where(Job.id.in_(candidates))
+        .values(status='running', lease=lease, attempts=Job.attempts + 1,
+                available_at=now + timedelta(seconds=visibility_timeout))
+        .returning(Job.id, Job.payload, Job.priority, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)).all()
+    db.session.commit()
+
+    jobs = [ClaimedJob(id, stage, decode_task(stage, payload), priority, attempts, max_attempts, lease)
+            for id, payload, priority, attempts, max_attempts in rows]
+    return sorted(jobs, key=lambda job: (-job.priority, job.id))
+
+
+def _owned(job):
+    return db.update(Job).where(Job.id == job.id, Job.lease == job.lease).execution_options(synchronize_session=False)
+
+
+def ack(job):
+    """
+    Remove a finished job. The caller commits, together with the job's results.
+
+    Returns:
+        bool: False when the lease expired and the job may be running elsewhere.
+    """
+    result = db.session.execute(db.delete(Job).where(Job.id == job.id, Job.lease == job.lease)
+                                .execution_options(synchronize_session=False))
+    return result.rowcount == 1
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the retry after ``attempts`` deliveries."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1)
+
+
+def fail(job, error):
+    """
+    Retry a failed job after a backoff, or dead-letter it after its last attempt.
+
+    The caller commits.
+
+    Returns:
+        bool: True when the job was dead-lettered.
+    """
+    dead = job.attempts >= job.max_attempts
+    values = {'lease': None, 'last_error': str(error)[:2000]}
+    if dead:
+        values['status'] = 'dead'
+    else:
+        values.update(status='queued', available_at=datetime.now() + timedelta(seconds=retry_delay(job.attempts)))
+    db.session.execute(_owned(job).values(**values))
+    return dead
+
+
+def extend(job, visibility_timeout=VISIBILITY_TIMEOUT):
+    """Keep a claimed job invisible for another ``visibility_timeout`` seconds. The caller commits."""
+    result = db.session.execute(_owned(job).values(
+        available_at=datetime.now() + timedelta(seconds=visibility_timeout)))
+    return result.rowcount == 1
+
+
+def requeue_dead(stage=None, ids=None):
+    """Give dead-lettered jobs a fresh set of attempts. The caller commits."""
+    query = db.update(Job).where(Job.status == 'dead')
+    if stage:
+        query = query.where(Job.stage == stage)
+    if ids:
+        query = query.where(Job.id.in_(ids))
+    result = db.session.execute(query.values(status='queued', attempts=0, lease=None, available_at=datetime.now())
+                                .execution_options(synchronize_session=False))
+    return result.rowcount
+
+
+def queue_stats():
+    """Job counts per stage and status, with the age of the oldest queued job."""
+    now = datetime.now()
+    stats = {}
+    rows = (db.session.query(Job.stage, Job.status, db.func.count(Job.id), db.func.min(Job.created_at))
+            .group_by(Job.stage, Job.status))
+    for stage, status, count, oldest in rows:
+        stage_stats = stats.setdefault(stage, {'queued': 0, 'running': 0, 'dead': 0, 'oldest_queued_seconds': None})
+        stage_stats[status] = count
+        if status == 'queued' and oldest is not None:
+            stage_stats['oldest_queued_seconds'] = round((now - oldest).total_seconds())
+    return stats
+
+
+def enqueue_summary(news):
+    """Queue the summary of a newly added News row. The caller commits."""
+    from shared.job_types import SummarizeTask
+
+    db.session.flush()
+    return enqueue(SummarizeTask(news_id=news.id), key=str(news.id))
+
+
+def discard_summary(news_id):
+    """
+    Drop the summary job of an article summarized outside the pipeline, e.g. by a polling
+    run of ``workers/summarizer/main.py``. A job already running is left to its consumer,
+    which finds the article processed. The caller commits.
+    """
+    from shared.job_types import SummarizeTask
+
+    db.session.execute(db.delete(Job)
+                       .where(Job.stage == SummarizeTask.stage, Job.key == str(news_id), Job.status != 'running')
+                       .execution_options(synchronize_session=False))
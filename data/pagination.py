@@ -0,0 +1,79 @@
+import base64
+import json
+from datetime import datetime
+
+from data.db import db
+from sqlalchemy import and_, func, or_
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page into an opaque URL-safe cursor."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """
+    Decode a cursor produced by ``encode_cursor`` for the given sort columns.
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the columns.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+    return [datetime.fromisoformat(v) if isinstance(column.type, db.DateTime) and v else v
+            for column, v in zip(columns, values)]
+
+
+def _after(columns, values):
+    # (a, b) < (x, y) spelled out so SQLite can use the composite index as a range scan
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, column < values[i]))
+    return or_(*clauses)
+
+
+def keyset_page(query, columns, cursor=None, limit=50):
+    """
+    Fetch one page of ``query`` in descending order of ``columns``.
+
+    Unlike OFFSET paging the cost of a page does not depend on how deep it is, as long
+    as ``columns`` are covered by an index. The last column must be unique (usually the
+    primary key) so the order is total.
+
+    Args:
+        query: The filtered query to page through.
+        columns (list): The sort key columns, e.g. ``[News.published_at, News.id]``.
+        cursor (str, optional): Cursor of the previous page, None for the first page.
+        limit (int): Page size.
+
+    Returns:
+        tuple: The rows of the page and the cursor of the next page, or None on the last page.
+    """
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, columns)))
+    rows = query.order_by(*[column.desc() for column in columns]).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return rows, next_cursor
+
+
+def estimate_count(query, cap=1000):
+    """
+    Count the rows of ``query`` but stop scanning after ``cap`` of them.
+
+    Returns:
+        tuple: The count and whether it is exact (False means "at least ``cap``").
+    """
+    subquery = query.order_by(None).limit(cap).subquery()
+    count = db.session.query(func.count()).select_from(subquery).scalar()
+    return count, count < cap
@@ -0,0 +1,288 @@
+import json
+import os
+import random
+import secrets
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from data.db import db
+from models.news import News
+from models.provider import MediaProvider, SearchKeyword
+from models.schedule import ScheduledPost
+
+basedir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE_DIR = os.environ.get('NEWS_IMAGE_DIR', os.path.join(basedir, 'data', 'images'))
+# Public address of IMAGE_DIR, needed by the platforms that fetch images themselves
+PUBLIC_IMAGE_URL = os.environ.get('PUBLIC_IMAGE_URL', '').rstrip('/')
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = int(os.environ.get('PUBLISH_MAX_ATTEMPTS', 5))
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+
+
+@dataclass
+class Account:
+    """Credentials of a media provider, read before the publisher leaves the session."""
+    id: int
+    platform: str
+    client_id: str
+    client_secret: str
+    params: dict = field(default_factory=dict)
+
+
+@dataclass
+class ClaimedPost:
+    id: int
+    lease: str
+    attempts: int
+    key: str
+    news_id: int
+    title: str
+    text: str
+    link: Optional[str]
+    image_url: Optional[str]
+    account: Account
+
+
+def parse_parameters(value):
+    """The ``parameters`` of a media provider, a JSON object such as ``{"page_id": "123"}``."""
+    if not value:
+        return {}
+    try:
+        params = json.loads(value)
+    except ValueError:
+        raise ValueError("Media provider parameters must be a JSON object")
+    if not isinstance(params, dict):
+        raise ValueError("Media provider parameters must be a JSON object")
+    return params
+
+
+def image_url(news_id):
+    if PUBLIC_IMAGE_URL and os.path.exists(os.path.join(IMAGE_DIR, f'{news_id}.png')):
+        return f'{PUBLIC_IMAGE_URL}/{news_id}.png'
+    return None
+
+
+def linked_media(news):
+    """Enabled media providers of the article's keywords, or all of them when none is linked."""
+    keyword_ids = {keyword.id for keyword in news.keywords}
+    if news.keyword_id:
+        keyword_ids.add(news.keyword_id)
+    providers = []
+    if keyword_ids:
+        providers = (MediaProvider.query
+                     .filter(MediaProvider.enabled.is_(True),
+                             MediaProvider.keywords.any(SearchKeyword.id.in_(keyword_ids)))
+                     .all())
+    return providers or MediaProvider.query.filter_by(enabled=True).all()
+
+
+def schedule_news(news, scheduled_at, providers=None):
+    """
+    Schedule an approved article on each of its media, one ScheduledPost per provider.
+
+    The caller commits.
+
+    Returns:
+        list: The new posts, none when no media provider is enabled.
+    """
+    summary = news.latest_summary
+    posts = []
+    for provider in providers if providers is not None else linked_media(news):
+        post = ScheduledPost(
+            news_id=news.id,
+            media=provider,
+            scheduled_at=scheduled_at,
+            title=summary.title if summary and summary.title else news.title,
+            content=summary.summary if summary else news.summary,
+        )
+        db.session.add(post)
+        posts.append(post)
+    return posts
+
+
+def claimable(now):
+    """Posts no publisher holds: scheduled and past their retry delay, or whose lease expired."""
+    return db.or_(
+        db.and_(ScheduledPost.status == 'scheduled',
+                db.or_(ScheduledPost.available_at.is_(None), ScheduledPost.available_at <= now)),
+        db.and_(ScheduledPost.status == 'publishing', ScheduledPost.available_at <= now),
+    )
+
+
+def claim(post_ids=None, news_id=None, due=False, limit=100, lease_seconds=LEASE_SECONDS):
+    """
+    Claim posts for publishing, and commit.
+
+    Without ``post_ids`` or ``news_id`` the due posts are claimed, oldest first. Claimed
+    posts are held for ``lease_seconds``; a post neither published nor failed by then,
+    e.g. because the publisher died, can be claimed again. Each claim is a single
+    UPDATE, so two publishers never get the same post.
+
+    Args:
+        post_ids (list): Posts to publish now, whatever their scheduled time
+        news_id (int): Publish every post of this article now
+        due (bool): Only claim the posts of ``post_ids`` or ``news_id`` that are due
+        limit (int): Most posts claimed at once
+
+    Returns:
+        list: ``ClaimedPost`` instances to pass to ``published`` or ``failed``.
+    """
+    now = datetime.now()
+    lease = secrets.token_hex(8)
+
+    # Posts whose publisher died on their last attempt
+    db.session.execute(
+        db.update(ScheduledPost)
+        .where(ScheduledPost.status == 'publishing', ScheduledPost.available_at <= now,
+               ScheduledPost.attempts >= MAX_ATTEMPTS)
+        .values(status='failed', lease=None, available_at=None,
+                last_error=db.func.coalesce(ScheduledPost.last_error, 'Lease expired'))
+        .execution_options(synchronize_session=False))
+
+    candidates = db.select(ScheduledPost.id).where(claimable(now), ScheduledPost.attempts < MAX_ATTEMPTS)
+    if post_ids:
+        candidates = candidates.where(ScheduledPost.id.in_(post_ids))
+    elif news_id:
+        candidates = candidates.where(ScheduledPost.news_id == news_id)
+    if due or not (post_ids or news_id):
+        candidates = candidates.where(ScheduledPost.scheduled_at <= now)
+    candidates = candidates.order_by(ScheduledPost.scheduled_at, ScheduledPost.id).limit(limit).scalar_subquery()
+    ids = db.session.execute(
+        db.update(ScheduledPost)
+        .where(ScheduledPost.id.in_(candidates))
+        .values(status='publishing', lease=lease, attempts=ScheduledPost.attempts + 1,
+                available_at=now + timedelta(seconds=lease_seconds))
+        .returning(ScheduledPost.id)
+        .execution_options(synchronize_session=False)).scalars().all()
+    db.session.commit()
+    if not ids:
+        return []
+
+    rows = (db.session.query(ScheduledPost, News.title, News.summary, News.url, MediaProvider)
+            .join(News, News.id == ScheduledPost.news_id)
+            .join(MediaProvider, MediaProvider.id == ScheduledPost.media_provider_id)
+            .filter(ScheduledPost.id.in_(ids))
+            .order_by(ScheduledPost.scheduled_at, ScheduledPost.id))
+    posts = []
+    for post, news_title, news_summary, url, provider in rows:
+        try:
+            params = parse_parameters(provider.parameters)
+        except ValueError as e:
+            failed_post = ClaimedPost(post.id, lease, post.attempts, post.idempotency_key, post.news_id,
+                                      '', '', None, None, None)
+            failed(failed_post, e, permanent=True)
+            continue
+        posts.append(ClaimedPost(
+            id=post.id,
+            lease=lease,
+            attempts=post.attempts,
+            key=post.idempotency_key,
+            news_id=post.news_id,
+            title=(post.title or news_title or '').strip(),
+            text=(post.content or news_summary or '').strip(),
+            link=url or None,
+            image_url=image_url(post.news_id),
+            account=Account(provider.id, provider.provider_name, provider.client_id, provider.client_secret, params),
+        ))
+    db.session.commit()
+    return posts
+
+
+def due_at(scheduled_at, available_at):
+    """When a waiting post can be claimed: its scheduled time, or later after a retry delay or lease."""
+    return max(scheduled_at, available_at) if available_at else scheduled_at
+
+
+WAITING_STATUSES = ('scheduled', 'publishing')
+
+
+def waiting(until, after=None):
+    """
+    Posts waiting to be published that are scheduled by ``until``.
+
+    Args:
+        until (datetime): Last scheduled time loaded
+        after (datetime): Only load the posts scheduled after this time
+
+    Returns:
+        list: (post ID, due time, media provider ID) tuples
+    """
+    query = (db.session.query(ScheduledPost.id, ScheduledPost.scheduled_at, ScheduledPost.available_at,
+                              ScheduledPost.media_provider_id)
+             .filter(ScheduledPost.status.in_(WAITING_STATUSES), ScheduledPost.scheduled_at <= until))
+    if after is not None:
+        query = query.filter(ScheduledPost.scheduled_at > after)
+    return [(id, due_at(scheduled_at, available_at), media_provider_id)
+            for id, scheduled_at, available_at, media_provider_id in query]
+
+
+def changed(since):
+    """
+    Posts created or changed after ``since``, e.g. rescheduled, published or sent back for a retry.
+
+    Returns:
+        list: (post ID, due time, media provider ID) tuples, with None as the due time of the
+        posts no longer waiting
+    """
+    rows = (db.session.query(ScheduledPost.id, ScheduledPost.status, ScheduledPost.scheduled_at,
+                             ScheduledPost.available_at, ScheduledPost.media_provider_id)
+            .filter(ScheduledPost.updated_at > since))
+    return [(id, due_at(scheduled_at, available_at) if status in WAITING_STATUSES else None, media_provider_id)
+            for id, status, scheduled_at, available_at, media_provider_id in rows]
+
+
+def _owned(post):
+    return (db.update(ScheduledPost)
+            .where(ScheduledPost.id == post.id, ScheduledPost.lease == post.lease)
+            .execution_options(synchronize_session=False))
+
+
+def extend(post, lease_seconds=LEASE_SECONDS):
+    """
+    Keep holding a claimed post for another ``lease_seconds``. The caller commits.
+
+    Returns:
+        bool: False when the lease expired and another publisher may hold the post.
+    """
+    result = db.session.execute(_owned(post).values(
+        available_at=datetime.now() + timedelta(seconds=lease_seconds)))
+    return result.rowcount == 1
+
+
+def published(post, external_id, external_url=None):
+    """
+    Record a post as published. The caller commits.
+
+    Returns:
+        bool: False when the lease expired and another publisher may hold the post.
+    """
+    result = db.session.execute(_owned(post).values(
+        status='published', lease=None, available_at=None, published_at=datetime.now(),
+        external_id=external_id, external_url=external_url, last_error=None))
+    return result.rowcount == 1
+
+
+def retry_delay(attempts, retry_after=None):
+    """Exponential backoff with jitter, at least the platform's ``retry_after``."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS) * random.uniform(0.5, 1)
+    return max(delay, retry_after or 0)
+
+
+def failed(post, error, retry_after=None, permanent=False):
+    """
+    Retry a post after a backoff, or mark it failed after its last attempt. The caller commits.
+
+    Returns:
+        bool: True when the post is marked failed.
+    """
+    final = permanent or post.attempts >= MAX_ATTEMPTS
+    values = {'lease': None, 'last_error': str(error)[:2000]}
+    if final:
+        values.update(status='failed', available_at=None)
+    else:
+        values.update(status='scheduled',
+                      available_at=datetime.now() + timedelta(seconds=retry_delay(post.attempts, retry_after)))
+    db.session.execute(_owned(post).values(**values))
+    return final
@@ -0,0 +1,243 @@
+import json
+import math
+import os
+from datetime import datetime, timedelta
+
+from data.db import db
+from models.ingestion import DEFAULT_INTERVALS, IngestionSchedule
+from models.news import News
+from models.quota import DEFAULT_DAILY_LIMITS, FALLBACK_DAILY_LIMIT, KeywordYield, ProviderQuota
+
+# Share of the daily quota held back: below it a run makes only its most productive call
+RESERVE = float(os.environ.get('PROVIDER_QUOTA_RESERVE', 0.1))
+# Weight of the latest run in the moving average of new articles per call
+YIELD_WEIGHT = 0.3
+# Score of a keyword never queried, so new keywords get tried
+EXPLORATION_YIELD = 20.0
+# Error codes (lowercased) meaning the quota is used up, e.g. NewsAPI's 'rateLimited'
+QUOTA_CODE_MARKERS = ('ratelimit', 'limitexceeded', 'exhausted', 'quota', 'toomanyrequests')
+QUOTA_STATUSES = (402, 429)
+# Quota left for the day. The RateLimit-* headers describe a short window (often a minute)
+# and only tell when to retry after a 429
+REMAINING_HEADERS = ('x-api-quota-left', 'x-requests-remaining')
+RESET_HEADERS = ('x-ratelimit-reset', 'ratelimit-reset', 'retry-after')
+
+
+class ProviderError(Exception):
+    """A provider answered with an error instead of results."""
+
+    def __init__(self, message, status=None, code=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+class QuotaExceeded(ProviderError):
+    """The provider's quota is used up until its reset."""
+
+
+def utcnow():
+    return datetime.utcnow()
+
+
+def next_midnight(now):
+    return datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+
+
+def parse_reset(value, now):
+    """A reset header as a UTC datetime, given as an epoch timestamp or as seconds from now."""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    if seconds > 1e9:
+        return datetime.utcfromtimestamp(seconds)
+    return now + timedelta(seconds=seconds)
+
+
+def known_urls(urls):
+    """The URLs among ``urls`` that are already stored."""
+    urls = [url for url in set(urls) if url]
+    if not urls:
+        return set()
+    return {url for (url,) in db.session.query(News.url).filter(News.url.in_(urls))}
+
+
+class ProviderBudget:
+    """
+    Quota bookkeeping and call budget of one provider run.
+
+    Every response goes through ``check``: it counts the call, records the remaining quota
+    the provider reports in its headers, and turns error bodies into ProviderError, or
+    QuotaExceeded once the quota is used up. The quota left until the daily reset is
+    spread over the runs the ingestion schedule still has before it, and ``order`` puts
+    the queries that brought the most new articles per call first, so a run that cannot
+    afford every query spends its calls where they pay.
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.calls = 0
+        self.quota = ProviderQuota.query.filter_by(provider_id=provider.id).first()
+        if self.quota is None:
+            self.quota = ProviderQuota(provider_id=provider.id, window_start=utcnow(), used=0,
+                                       daily_limit=DEFAULT_DAILY_LIMITS.get(provider.provider_name,
+                                                                            FALLBACK_DAILY_LIMIT))
+            db.session.add(self.quota)
+        self._roll_window()
+        self.yields = {stats.keyword_id: stats for stats in KeywordYield.query.filter_by(provider_id=provider.id)}
+        self.budget = self.run_budget()
+        db.session.commit()
+
+    def _roll_window(self):
+        now = utcnow()
+        reset_at = self.quota.reset_at or next_midnight(self.quota.window_start)
+        if now >= reset_at:
+            self.quota.window_start = now
+            self.quota.used = 0
+            self.quota.reported_remaining = None
+            self.quota.reset_at = None
+        if self.quota.exhausted_until and now >= self.quota.exhausted_until:
+            self.quota.exhausted_until = None
+
+    @property
+    def remaining(self):
+        remaining = self.quota.daily_limit - self.quota.used
+        if self.quota.reported_remaining is not None:
+            remaining = min(remaining, self.quota.reported_remaining)
+        return max(0, math.floor(remaining))
+
+    def run_budget(self):
+        """Calls this run may make: the usable quota shared by the runs left before the reset."""
+        if self.quota.exhausted_until or self.remaining <= 0:
+            return 0
+        now = utcnow()
+        schedule = IngestionSchedule.query.filter_by(kind='news', source_id=self.provider.id).first()
+        interval = schedule.interval if schedule else timedelta(minutes=DEFAULT_INTERVALS['news'])
+        reset_at = self.quota.reset_at or next_midnight(now)
+        runs_left = max(1, math.ceil((reset_at - now) / interval))
+        usable = self.remaining - RESERVE * self.quota.daily_limit
+        if usable <= 0:
+            return 1
+        return max(1, math.ceil(usable / runs_left))
+
+    def allow(self):
+        return self.calls < self.budget and not self.quota.exhausted_until and self.remaining > 0
+
+    def check(self, status, headers, body, items_key=None):
+        """
+        Count a provider call and check its answer, then commit.
+
+        Args:
+            status (int): HTTP status code
+            headers (dict): Response headers
+            body: The decoded JSON body, or None when the caller decoded it already
+            items_key (str): Key the results are listed under in a successful JSON body
+
+        Raises:
+            QuotaExceeded: When the provider says the quota is used up.
+            ProviderError: When the response holds no results.
+        """
+        now = utcnow()
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        self.calls += 1
+        self.quota.used += 1
+        self.quota.last_status = status
+        self.quota.last_error = None
+        for header in REMAINING_HEADERS:
+            if headers.get(header) not in (None, ''):
+                try:
+                    self.quota.reported_remaining = float(headers[header])
+                except ValueError:
+                    pass
+                break
+
+        error = None
+        if isinstance(body, dict):
+            details = body.get('results') if isinstance(body.get('results'), dict) else body
+            if body.get('status') == 'error' or (items_key and items_key not in body):
+                error = ProviderError(details.get('message') or f"Unexpected answer: {str(body)[:200]}",
+                                      status, details.get('code'))
+        elif status >= 400 or (items_key and body is None):
+            error = ProviderError(f"HTTP {status} without a JSON body", status)
+        if error is None and status >= 400:
+            error = ProviderError(f"HTTP {status}", status)
+
+        if error is not None:
+            code = (error.code or '').lower()
+            if status in QUOTA_STATUSES or any(marker in code for marker in QUOTA_CODE_MARKERS):
+                error = QuotaExceeded(str(error), status, error.code)
+                # A short rate limit says when to retry, a daily quota resets at its window's end
+                for header in RESET_HEADERS:
+                    retry_at = parse_reset(headers.get(header), now)
+                    if retry_at:
+                        self.quota.exhausted_until = retry_at
+                        break
+                else:
+                    self.quota.exhausted_until = self.quota.reset_at or next_midnight(now)
+                    self.quota.reported_remaining = 0
+            self.quota.last_error = str(error)[:500]
+        db.session.commit()
+        if error is not None:
+            raise error
+        return body
+
+    def check_response(self, response, items_key):
+        """``check`` for a ``requests`` response; returns its decoded body."""
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return self.check(response.status_code, response.headers, body, items_key)
+
+    def check_exception(self, e):
+        """``check`` for the ApiException of a generated API client; always raises."""
+        try:
+            body = json.loads(e.body) if e.body else None
+        except (TypeError, ValueError):
+            body = None
+        self.check(e.status or 0, dict(e.headers or {}), body)
+        raise ProviderError(str(e), e.status)
+
+    def score(self, plan):
+        """Expected new articles per call of a query."""
+        now = datetime.now()
+        score = 0.0
+        for keyword in plan.keywords:
+            stats = self.yields.get(keyword.id)
+            if stats is None or stats.yield_per_call is None:
+                score += EXPLORATION_YIELD
+                continue
+            # Keywords left out for a while gain weight, so a low yield is not final
+            idle_hours = (now - stats.last_called_at).total_seconds() / 3600 if stats.last_called_at else 24
+            score += stats.yield_per_call * (1 + idle_hours / 24)
+        return score
+
+    def order(self, plans):
+        return sorted(plans, key=self.score, reverse=True)
+
+    def record_yield(self, plan, calls, new_by_keyword):
+        """
+        Update the moving yield of the keywords of a query after it ran, then commit.
+
+        Args:
+            plan: The QueryPlan that ran
+            calls (int): Calls the query took
+            new_by_keyword (dict): Keyword ID -> new articles stored for it
+        """
+        if not calls:
+            return
+        for keyword in plan.keywords:
+            stats = self.yields.get(keyword.id)
+            if stats is None:
+                stats = self.yields[keyword.id] = KeywordYield(provider_id=self.provider.id, keyword_id=keyword.id,
+                                                               calls=0, new_articles=0)
+                db.session.add(stats)
+            new = new_by_keyword.get(keyword.id, 0)
+            latest = new / calls
+            stats.yield_per_call = latest if stats.yield_per_call is None else (
+                (1 - YIELD_WEIGHT) * stats.yield_per_call + YIELD_WEIGHT * latest)
+            stats.calls += calls / len(plan.keywords)
+            stats.new_articles += new
+            stats.last_called_at = datetime.now()
+        db.session.commit()
@@ -1,12 +1,14 @@
 from authlib.integrations.flask_client import OAuth
+from data.cache import Cache
 from flask_login import LoginManager
-from models.user import User
+from profiling import Profiler
 
 oauth = OAuth()
 login_manager = LoginManager()
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.filter_by(alternative_id=user_id).first()
+cache = Cache()
+# Always in-process: holds detached User instances for the user_loader
+identity_cache = Cache()
+profiler = Profiler()
 
 social_media_providers = [
     'reddit',
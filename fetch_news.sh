@@ -1,6 +1,10 @@
 #!/bin/bash
+# One-off run of every news provider worker. For continuous ingestion run the scheduler
+# daemon instead: python workers/ingestion.py
 cd "$(dirname "$0")"
+# Use the interpreter of the active virtualenv unless PYTHON says otherwise
+PYTHON="${PYTHON:-python3}"
 for script in workers/providers/*.py; do
     echo "Running $script..."
-    /home/vahid/contentoire-env/bin/python "$script"
+    "$PYTHON" "$script"
 done
@@ -0,0 +1,48 @@
+# Production serving: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Every setting can be overridden from the environment. Reload gracefully with
+# `kill -HUP $(cat gunicorn.pid)`: workers finish their requests and are replaced.
+# Because the app is preloaded in the master, HUP does not pick up new code; deploy new
+# code with `kill -USR2` (start a new master) followed by `kill -QUIT` of the old one.
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8443')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import the app once in the master so workers share its memory copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+# Recycle workers now and then so slow leaks cannot accumulate
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+pidfile = os.environ.get('GUNICORN_PIDFILE', 'gunicorn.pid')
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+certfile = os.environ.get('GUNICORN_CERTFILE', '../certs/gpu.pem')
+keyfile = os.environ.get('GUNICORN_KEYFILE', '../certs/gpu-key.pem')
+if not (os.path.exists(certfile) and os.path.exists(keyfile)):
+    certfile = keyfile = None
+
+
+def post_fork(server, worker):
+    # Database connections opened by the master while preloading must not be shared
+    from data.db import db
+    from wsgi import app
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Live gauges of a finished worker must not be served by /metrics any more
+    from shared import metrics
+
+    metrics.mark_process_dead(worker.pid)
@@ -1,53 +1,55 @@
 import { NewsItem } from '@/types/news';
 
-// Mock news data for demonstration
-const mockNews: NewsItem[] = [
-  {
-    id: '1',
-    title: 'Revolutionary AI Technology Transforms Digital Marketing Landscape',
-    summary: 'Recent breakthroughs in artificial intelligence are reshaping how businesses approach digital marketing, with new tools offering unprecedented personalization.',
-    content: 'Full article content here...',
-    source: 'TechCrunch',
-    publishedAt: '2025-01-20T10:30:00Z',
-    url: 'https://example.com/article1',
-    imageUrl: 'https://images.pexels.com/photos/8439093/pexels-photo-8439093.jpeg',
-    keywords: ['technology', 'AI', 'marketing'],
-  },
-  {
-    id: '2',
-    title: 'Social Media Engagement Reaches All-Time High in 2025',
-    summary: 'New data reveals that social media engagement has reached unprecedented levels, with users spending more time interacting with content than ever before.',
-    content: 'Full article content here...',
-    source: 'Social Media Today',
-    publishedAt: '2025-01-20T08:15:00Z',
-    url: 'https://example.com/article2',
-    imageUrl: 'https://images.pexels.com/photos/267389/pexels-photo-267389.jpeg',
-    keywords: ['social media', 'engagement', 'trends'],
-  },
-  {
-    id: '3',
-    title: 'Mobile App Development Trends That Will Define 2025',
-    summary: 'Industry experts identify key trends in mobile app development that are expected to shape the landscape throughout 2025 and beyond.',
-    content: 'Full article content here...',
-    source: 'App Developer Magazine',
-    publishedAt: '2025-01-19T16:45:00Z',
-    url: 'https://example.com/article3',
-    imageUrl: 'https://images.pexels.com/photos/699459/pexels-photo-699459.jpeg',
-    keywords: ['mobile', 'development', 'trends'],
-  },
-];
+const API_BASE_URL = process.env.EXPO_PUBLIC_API_URL || 'https://contentoire.smartoire.com';
+const NEWS_API_URL = `${API_BASE_URL}/contentoire/api/v1/news`;
+
+type NewsPage = {
+  data: NewsItem[];
+  next_cursor: string | null;
+};
+
+// Last response per URL, revalidated with If-None-Match so unchanged pages cost a 304
+const responseCache = new Map<string, { etag: string; page: NewsPage }>();
+
+async function fetchPage(url: string): Promise<NewsPage> {
+  const cached = responseCache.get(url);
+  const response = await fetch(url, {
+    headers: {
+      Accept: 'application/json',
+      ...(cached ? { 'If-None-Match': cached.etag } : {}),
+    },
+  });
+
+  if (response.status === 304 && cached) {
+    return cached.page;
+  }
+  if (!response.ok) {
+    throw new Error(`News API request failed with status ${response.status}`);
+  }
+
+  const page: NewsPage = await response.json();
+  const etag = response.headers.get('ETag');
+  if (etag) {
+    responseCache.set(url, { etag, page });
+  }
+  return page;
+}
 
 class NewsService {
-  async fetchNewsByKeyword(keyword: string): Promise<NewsItem[]> {
-    // Simulate API delay
-    await new Promise(resolve => setTimeout(resolve, 1000));
-    
-    // Filter mock data based on keyword
-    return mockNews.filter(item =>
-      item.keywords.some(k => k.toLowerCase().includes(keyword.toLowerCase())) ||
-      item.title.toLowerCase().includes(keyword.toLowerCase()) ||
-      item.summary.toLowerCase().includes(keyword.toLowerCase())
-    );
+  async fetchNewsByKeyword(keyword: string, cursor?: string): Promise<NewsItem[]> {
+    const page = await this.fetchNewsPage(keyword, cursor);
+    return page.data;
+  }
+
+  async fetchNewsPage(keyword: string, cursor?: string): Promise<NewsPage> {
+    const params = new URLSearchParams();
+    if (keyword) {
+      params.set('keyword', keyword);
+    }
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
+    return fetchPage(`${NEWS_API_URL}?${params.toString()}`);
   }
 
   async summarizeArticle(content: string): Promise<string> {
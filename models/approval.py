@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from data.db import db
+
+APPROVAL_STATUSES = ('pending', 'scheduled', 'rejected')
+
+
+class ApprovalRequest(db.Model):
+  """A summarized article offered for approval in a Telegram chat, and the answer given."""
+  __tablename__ = 'approval_requests'
+  __table_args__ = (
+    db.UniqueConstraint('news_id', 'chat_id', name='uq_approval_requests_chat'),
+  )
+
+  id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+  news_id = db.Column(db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), nullable=False, index=True)
+  chat_id = db.Column(db.BigInteger, nullable=False)
+  message_id = db.Column(db.BigInteger, nullable=True)
+  status = db.Column(db.String, nullable=False, default='pending')
+  sent_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+  decided_at = db.Column(db.DateTime, nullable=True)
+  decided_by = db.Column(db.String, nullable=True)  # Telegram username or user ID
+  news = db.relationship('News')
+
+  def to_dict(self):
+    return {
+      'id': self.id,
+      'news_id': self.news_id,
+      'chat_id': self.chat_id,
+      'message_id': self.message_id,
+      'status': self.status,
+      'sent_at': self.sent_at.isoformat() if self.sent_at else None,
+      'decided_at': self.decided_at.isoformat() if self.decided_at else None,
+      'decided_by': self.decided_by,
+    }
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+from data.db import db
+
+# Source kind -> default minutes between runs; API quotas are tighter than RSS feeds
+DEFAULT_INTERVALS = {
+  'news': 60,
+  'rss': 15,
+}
+# 'finished': a run adopted after a scheduler restart ended, its exit code is unknown
+INGESTION_STATUSES = ('pending', 'running', 'succeeded', 'failed', 'finished', 'timed_out', 'interrupted')
+
+
+class IngestionSchedule(db.Model):
+  """Fetch cadence and last-run state of one news provider or RSS feed."""
+  __tablename__ = 'ingestion_schedules'
+  __table_args__ = (
+    db.UniqueConstraint('kind', 'source_id', name='uq_ingestion_schedules_source'),
+  )
+
+  id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+  kind = db.Column(db.String, nullable=False)  # 'news' or 'rss'
+  source_id = db.Column(db.Integer, nullable=False)
+  interval_minutes = db.Column(db.Integer, nullable=False)
+  jitter_seconds = db.Column(db.Integer, nullable=False, default=60)
+  enabled = db.Column(db.Boolean, nullable=False, default=True)
+  next_run_at = db.Column(db.DateTime, nullable=True, index=True)
+  status = db.Column(db.String, nullable=False, default='pending')
+  pid = db.Column(db.Integer, nullable=True)
+  last_started_at = db.Column(db.DateTime, nullable=True)
+  last_finished_at = db.Column(db.DateTime, nullable=True)
+  last_exit_code = db.Column(db.Integer, nullable=True)
+  skipped_runs = db.Column(db.Integer, nullable=False, default=0)
+
+  @property
+  def interval(self):
+    return timedelta(minutes=self.interval_minutes)
+
+  def to_dict(self):
+    return {
+      'id': self.id,
+      'kind': self.kind,
+      'source_id': self.source_id,
+      'interval_minutes': self.interval_minutes,
+      'jitter_seconds': self.jitter_seconds,
+      'enabled': self.enabled,
+      'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+      'status': self.status,
+      'last_started_at': self.last_started_at.isoformat() if self.last_started_at else None,
+      'last_finished_at': self.last_finished_at.isoformat() if self.last_finished_at else None,
+      'last_exit_code': self.last_exit_code,
+      'skipped_runs': self.skipped_runs,
+    }
+
+
+def sync_schedules():
+  """
+  Create a schedule with the default interval for every provider or feed that lacks one.
+
+  New schedules are due immediately. The caller commits.
+
+  Returns:
+    list: The schedules created.
+  """
+  from models.provider import FeedProvider, NewsProvider
+
+  created = []
+  for kind, model in (('news', NewsProvider), ('rss', FeedProvider)):
+    known = db.session.query(IngestionSchedule.source_id).filter(IngestionSchedule.kind == kind)
+    for (source_id,) in db.session.query(model.id).filter(model.id.not_in(known)):
+      schedule = IngestionSchedule(kind=kind, source_id=source_id, interval_minutes=DEFAULT_INTERVALS[kind],
+                                   next_run_at=datetime.now())
+      db.session.add(schedule)
+      created.append(schedule)
+  return created
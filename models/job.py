@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from data.db import db
+
+JOB_STATUSES = ('queued', 'running', 'dead')
+
+
+class Job(db.Model):
+  """A pipeline job; the payload is the JSON form of a shared/job_types.py task."""
+  __tablename__ = 'jobs'
+  __table_args__ = (
+    # Dequeue scans one stage for the highest priority visible jobs
+    db.Index('ix_jobs_stage_status_priority', 'stage', 'status', 'priority', 'available_at'),
+    # At most one live job per stage and key, so enqueueing the same work twice is harmless
+    db.UniqueConstraint('stage', 'key', name='uq_jobs_stage_key'),
+  )
+
+  id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+  stage = db.Column(db.String, nullable=False)
+  key = db.Column(db.String, nullable=True)
+  payload = db.Column(db.String, nullable=False)
+  priority = db.Column(db.Integer, nullable=False, default=0)
+  status = db.Column(db.String, nullable=False, default='queued')
+  attempts = db.Column(db.Integer, nullable=False, default=0)
+  max_attempts = db.Column(db.Integer, nullable=False, default=5)
+  # Queued: not before this time (retry backoff). Running: lease expiry, redelivered after it.
+  available_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+  lease = db.Column(db.String, nullable=True)
+  last_error = db.Column(db.String, nullable=True)
+  created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
@@ -1,10 +1,54 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 
 from data.db import db
+from sqlalchemy.orm import validates
+
+
+def parse_published_date(value):
+  """Parse the date formats used by our providers into a naive UTC datetime, or None."""
+  if not value:
+    return None
+  if isinstance(value, datetime):
+    parsed = value
+  else:
+    value = str(value).strip()
+    parsed = None
+    try:
+      parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+      pass
+    if parsed is None:
+      try:
+        parsed = datetime.strptime(value, '%Y-%m-%d %H:%M:%S %z')
+      except ValueError:
+        pass
+    if parsed is None:
+      try:
+        parsed = parsedate_to_datetime(value)
+      except (TypeError, ValueError):
+        return None
+  if parsed.tzinfo is not None:
+    parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+  return parsed
+
+
+# Every SearchKeyword an article matched when one provider query combined several of them
+news_keywords = db.Table(
+    'news_keyword',
+    db.Column('news_id', db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('keyword_id', db.Integer, db.ForeignKey('search_keywords.id', ondelete='CASCADE'), primary_key=True)
+)
 
 
 class News(db.Model):
   __tablename__ = 'news'
+  __table_args__ = (
+    # Keyset pagination walks this index newest first
+    db.Index('ix_news_published_at_id', 'published_at', 'id'),
+    # Provider workers skip the articles they already stored
+    db.Index('ix_news_url', 'url'),
+  )
 
   id = db.Column(db.Integer, primary_key=True, autoincrement=True)
   title = db.Column(db.String, nullable=False)
@@ -12,11 +56,125 @@ class News(db.Model):
   news_text = db.Column(db.String, nullable=True)
   url = db.Column(db.String, nullable=True)
   published_date = db.Column(db.String, nullable=True)
+  published_at = db.Column(db.DateTime, nullable=True, default=datetime.now)
   language = db.Column(db.String, nullable=True)
   summary = db.Column(db.String, nullable=True)
-  options = db.Column(db.String, nullable=True)
-  add_date = db.Column(db.DateTime, nullable=False, default=datetime.now())
+  options = db.Column(db.String, nullable=True)  # legacy, superseded by the metadata columns below
+  guid = db.Column(db.String, nullable=True, index=True)
+  source = db.Column(db.String, nullable=True, index=True)
+  sentiment = db.Column(db.Float, nullable=True, index=True)
+  add_date = db.Column(db.DateTime, nullable=False, default=datetime.now, index=True)
   provider_id = db.Column(db.Integer, db.ForeignKey('news_providers.id'), nullable=True)
   keyword_id = db.Column(db.Integer, db.ForeignKey('search_keywords.id'), nullable=True)
   feed_id = db.Column(db.Integer, db.ForeignKey('feed_providers.id'), nullable=True)
   processed = db.Column(db.DateTime, nullable=True)
+  categories = db.relationship('NewsCategory', cascade='all, delete-orphan', back_populates='news')
+  tags = db.relationship('NewsTag', cascade='all, delete-orphan', back_populates='news')
+  keywords = db.relationship('SearchKeyword', secondary=news_keywords)
+  summaries = db.relationship('NewsSummary', cascade='all, delete-orphan', back_populates='news',
+                              order_by='NewsSummary.created_at.desc()')
+
+  @validates('published_date')
+  def _set_published_at(self, key, value):
+    self.published_at = parse_published_date(value) or self.published_at or datetime.now()
+    return value
+
+  @property
+  def latest_summary(self):
+    return self.summaries[0] if self.summaries else None
+
+  def set_metadata(self, source=None, sentiment=None, categories=None, tags=None):
+    """Fill the structured metadata reported by a provider, skipping empty values."""
+    if source:
+      self.source = source.strip()
+    if sentiment not in (None, ''):
+      self.sentiment = float(sentiment)
+    for name in dict.fromkeys(c.strip() for c in categories or [] if c and c.strip()):
+      self.categories.append(NewsCategory(name=name))
+    for tag in dict.fromkeys(t.strip() for t in tags or [] if t and t.strip()):
+      self.tags.append(NewsTag(tag=tag))
+
+
+class NewsCategory(db.Model):
+  __tablename__ = 'news_categories'
+
+  news_id = db.Column(db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), primary_key=True)
+  name = db.Column(db.String, primary_key=True, index=True)
+  news = db.relationship('News', back_populates='categories')
+
+
+# Keywords reported by the provider for an article, not our SearchKeywords
+class NewsTag(db.Model):
+  __tablename__ = 'news_tags'
+
+  news_id = db.Column(db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), primary_key=True)
+  tag = db.Column(db.String, primary_key=True, index=True)
+  news = db.relationship('News', back_populates='tags')
+
+
+# Generated title and summary of an article, one row per model and prompt version
+class NewsSummary(db.Model):
+  __tablename__ = 'news_summaries'
+  __table_args__ = (
+    db.UniqueConstraint('news_id', 'model', 'prompt_version'),
+  )
+
+  id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+  news_id = db.Column(db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), nullable=False, index=True)
+  title = db.Column(db.String, nullable=True)
+  summary = db.Column(db.String, nullable=False)
+  model = db.Column(db.String, nullable=False)
+  prompt_version = db.Column(db.Integer, nullable=False, default=1)
+  created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+  news = db.relationship('News', back_populates='summaries')
+
+
+def parse_legacy_options(news):
+  """
+  Split the legacy ``options`` string into structured metadata.
+
+  Each worker used to pack a different format into ``options``; this recognises them all.
+
+  Args:
+      news (News): The article whose ``options`` should be parsed.
+
+  Returns:
+      dict: Keyword arguments for ``News.set_metadata`` plus an optional ``guid``.
+  """
+  options = news.options or ''
+  if not options:
+    return {}
+  if news.feed_id:
+    return {'guid': options}
+  if options.startswith('category:'):
+    return {'categories': options[len('category:'):].split(', ')}
+  if options.startswith('source:'):
+    return {'source': options[len('source:'):]}
+  if options.startswith('sentiment:'):
+    fields = dict(part.split(':', 1) for part in options.split(';') if ':' in part)
+    return {'sentiment': fields.get('sentiment') or None}
+  return {'tags': options.split(',')}
+
+
+def filter_news(query, args):
+  """Apply the news list filters from request arguments to a News query."""
+  if args.get('provider_id', type=int):
+    query = query.filter(News.provider_id == args.get('provider_id', type=int))
+  if args.get('feed_id', type=int):
+    query = query.filter(News.feed_id == args.get('feed_id', type=int))
+  if args.get('keyword_id', type=int):
+    keyword_id = args.get('keyword_id', type=int)
+    query = query.filter(db.or_(News.keyword_id == keyword_id, News.keywords.any(id=keyword_id)))
+  if args.get('processed') == 'yes':
+    query = query.filter(News.processed.isnot(None))
+  elif args.get('processed') == 'no':
+    query = query.filter(News.processed.is_(None))
+  if args.get('source'):
+    query = query.filter(News.source == args['source'])
+  if args.get('category'):
+    query = query.filter(News.categories.any(NewsCategory.name == args['category']))
+  if args.get('min_sentiment', type=float) is not None:
+    query = query.filter(News.sentiment >= args.get('min_sentiment', type=float))
+  if args.get('max_sentiment', type=float) is not None:
+    query = query.filter(News.sentiment <= args.get('max_sentiment', type=float))
+  return query
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from data.db import db
+
+# Provider name -> requests per day on the plan we use; editable per provider by admins
+DEFAULT_DAILY_LIMITS = {
+  'News API': 100,
+  'NewsData.io': 200,
+  'World News API': 50,
+  'Currents API': 600,
+}
+FALLBACK_DAILY_LIMIT = 100
+
+
+class ProviderQuota(db.Model):
+  """Daily request quota of a news provider and how much of it is used."""
+  __tablename__ = 'provider_quotas'
+
+  id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+  provider_id = db.Column(db.Integer, db.ForeignKey('news_providers.id', ondelete='CASCADE'), nullable=False,
+                          unique=True)
+  daily_limit = db.Column(db.Integer, nullable=False)
+  window_start = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # UTC
+  used = db.Column(db.Integer, nullable=False, default=0)
+  # Last values reported by the provider itself, in its own unit (requests or points)
+  reported_remaining = db.Column(db.Float, nullable=True)
+  reset_at = db.Column(db.DateTime, nullable=True)  # UTC, end of the daily window; next midnight when unset
+  exhausted_until = db.Column(db.DateTime, nullable=True)  # UTC
+  last_status = db.Column(db.Integer, nullable=True)
+  last_error = db.Column(db.String, nullable=True)
+  updated_at = db.Column(db.DateTime, nullable=True, default=datetime.now, onupdate=datetime.now)
+
+  def to_dict(self):
+    return {
+      'id': self.id,
+      'provider_id': self.provider_id,
+      'daily_limit': self.daily_limit,
+      'window_start': self.window_start.isoformat() if self.window_start else None,
+      'used': self.used,
+      'reported_remaining': self.reported_remaining,
+      'reset_at': self.reset_at.isoformat() if self.reset_at else None,
+      'exhausted_until': self.exhausted_until.isoformat() if self.exhausted_until else None,
+      'last_status': self.last_status,
+      'last_error': self.last_error,
+    }
+
+
+class KeywordYield(db.Model):
+  """New articles per provider call for one keyword, to spend the quota where it pays."""
+  __tablename__ = 'keyword_yields'
+  __table_args__ = (
+    db.UniqueConstraint('provider_id', 'keyword_id', name='uq_keyword_yields_keyword'),
+  )
+
+  id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+  provider_id = db.Column(db.Integer, db.ForeignKey('news_providers.id', ondelete='CASCADE'), nullable=False)
+  keyword_id = db.Column(db.Integer, db.ForeignKey('search_keywords.id', ondelete='CASCADE'), nullable=False)
+  calls = db.Column(db.Float, nullable=False, default=0)
+  new_articles = db.Column(db.Integer, nullable=False, default=0)
+  # Exponentially weighted new articles per call
+  yield_per_call = db.Column(db.Float, nullable=True)
+  last_called_at = db.Column(db.DateTime, nullable=True)
+
+  def to_dict(self):
+    return {
+      'keyword_id': self.keyword_id,
+      'calls': self.calls,
+      'new_articles': self.new_articles,
+      'yield_per_call': self.yield_per_call,
+      'last_called_at': self.last_called_at.isoformat() if self.last_called_at else None,
+    }
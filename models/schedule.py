@@ -0,0 +1,41 @@
+import secrets
+from datetime import datetime
+
+from data.db import db
+
+SCHEDULED_POST_STATUSES = ('scheduled', 'publishing', 'published', 'failed')
+
+
+def new_idempotency_key():
+  return secrets.token_hex(16)
+
+
+class ScheduledPost(db.Model):
+  __tablename__ = 'scheduled_posts'
+  __table_args__ = (
+    # Due-post scans filter on status, calendar ranges on time alone
+    db.Index('ix_scheduled_posts_status_scheduled_at', 'status', 'scheduled_at'),
+  )
+
+  id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+  news_id = db.Column(db.Integer, db.ForeignKey('news.id'), nullable=False, index=True)
+  media_provider_id = db.Column(db.Integer, db.ForeignKey('media_providers.id'), nullable=False, index=True)
+  scheduled_at = db.Column(db.DateTime, nullable=False, index=True)
+  title = db.Column(db.String, nullable=True)
+  content = db.Column(db.String, nullable=True)
+  status = db.Column(db.String, nullable=False, default='scheduled')
+  created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+  published_at = db.Column(db.DateTime, nullable=True)
+  # Lets the dispatcher reload only the posts changed since its last look
+  updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now, index=True)
+  # Sent with every publish attempt, so a retried post is not published twice
+  idempotency_key = db.Column(db.String, nullable=False, unique=True, default=new_idempotency_key)
+  attempts = db.Column(db.Integer, nullable=False, default=0)
+  lease = db.Column(db.String, nullable=True)  # held by the publisher run working on the post
+  # Not claimed again before: the end of the lease while publishing, the retry delay after a failure
+  available_at = db.Column(db.DateTime, nullable=True)
+  external_id = db.Column(db.String, nullable=True)  # the post's ID on the platform
+  external_url = db.Column(db.String, nullable=True)
+  last_error = db.Column(db.String, nullable=True)
+  news = db.relationship('News')
+  media = db.relationship('MediaProvider')
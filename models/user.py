@@ -23,6 +23,9 @@ class User(db.Model, UserMixin):
     picture_url = db.Column(db.String, nullable=True)
     comments = db.Column(db.String, nullable=True)
 
+    def has_permission(self, name):
+        return any(permission.name == name for permission in self.permissions)
+
 class Permission(db.Model):
     __tablename__ = "permissions"
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,219 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+# The same statement run this many times in one request is reported as an N+1 pattern
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+RECENT_REPORTS = 100
+MAX_STATEMENT_LENGTH = 1000
+
+
+def fingerprint(statement):
+    """Normalize a statement so that runs differing only in IN list sizes or whitespace match."""
+    statement = re.sub(r'\s+', ' ', statement).strip()
+    return re.sub(r'\((?:\?|%\(\w+\)s|:\w+)(?:, (?:\?|%\(\w+\)s|:\w+))*\)', '(...)', statement)
+
+
+def redact_parameters(parameters):
+    """Replace bound parameter values by their type, so slow-query logs never hold user data."""
+    if isinstance(parameters, dict):
+        return {key: f'<{type(value).__name__}>' for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: one set of parameters per row
+            return [redact_parameters(parameters[0]), f'... {len(parameters)} rows']
+        return [f'<{type(value).__name__}>' for value in parameters]
+    return parameters
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram over ``LATENCY_BUCKETS_MS``."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if value_ms <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile, capped by the largest value."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, round(self.max, 2))
+        return round(self.max, 2)
+
+    def report(self):
+        # [upper bound, cumulative count] pairs, kept as a list so JSON preserves the order
+        buckets = []
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + ('+Inf',), self.counts):
+            seen += count
+            buckets.append([bound, seen])
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 2) if self.count else None,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max, 2),
+            'buckets': buckets,
+        }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.query_ms = 0.0
+        self.n_plus_one = 0
+
+    def report(self):
+        count = self.latency.count
+        return {
+            **self.latency.report(),
+            'errors': self.errors,
+            'queries': {
+                'total': self.queries,
+                'mean_per_request': round(self.queries / count, 2) if count else None,
+                'max_per_request': self.max_queries,
+                'mean_ms_per_request': round(self.query_ms / count, 2) if count else None,
+            },
+            'n_plus_one_requests': self.n_plus_one,
+        }
+
+
+class Profiler:
+    """
+    Request timing and query profiling for the web app.
+
+    Every request is timed into a per-endpoint latency histogram together with the number
+    and duration of the SQL queries it ran. Requests running the same statement at least
+    ``N_PLUS_ONE_THRESHOLD`` times are reported as N+1 patterns, and queries slower than
+    ``SLOW_QUERY_MS`` are logged with their parameters redacted. Statistics are per process.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self.slow_queries = deque(maxlen=RECENT_REPORTS)
+        self.n_plus_one = deque(maxlen=RECENT_REPORTS)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['profiler'] = self
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        for name, listener in (('before_cursor_execute', self._start_query_timer),
+                               ('after_cursor_execute', self._stop_query_timer),
+                               ('handle_error', self._discard_query_timer)):
+            if not event.contains(Engine, name, listener):
+                event.listen(Engine, name, listener)
+
+    def start_request(self):
+        g._profile = {'start': time.perf_counter(), 'queries': Counter(), 'query_ms': 0.0}
+
+    def finish_request(self, response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        elapsed_ms = (time.perf_counter() - profile['start']) * 1000
+        endpoint = request.endpoint or '<unmatched>'
+        query_count = sum(profile['queries'].values())
+        repeated = [(statement, count) for statement, count in profile['queries'].items()
+                    if count >= N_PLUS_ONE_THRESHOLD]
+
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, EndpointStats())
+            stats.latency.observe(elapsed_ms)
+            stats.errors += response.status_code >= 500
+            stats.queries += query_count
+            stats.max_queries = max(stats.max_queries, query_count)
+            stats.query_ms += profile['query_ms']
+            if repeated:
+                stats.n_plus_one += 1
+                for statement, count in repeated:
+                    self.n_plus_one.append({'endpoint': endpoint, 'statement': statement[:MAX_STATEMENT_LENGTH],
+                                            'count': count, 'time': time.time()})
+
+        for statement, count in repeated:
+            logger.warning('Possible N+1 in %s: statement ran %d times: %s', endpoint, count,
+                           statement[:MAX_STATEMENT_LENGTH])
+        response.headers['Server-Timing'] = (f'app;dur={elapsed_ms:.1f}, '
+                                             f'db;dur={profile["query_ms"]:.1f};desc="{query_count} queries"')
+        return response
+
+    def record_query(self, statement, parameters, duration_ms):
+        profile = g.get('_profile') if has_request_context() else None
+        statement = fingerprint(statement)
+        if profile is not None:
+            profile['queries'][statement] += 1
+            profile['query_ms'] += duration_ms
+
+        if duration_ms >= SLOW_QUERY_MS:
+            parameters = redact_parameters(parameters)
+            endpoint = request.endpoint if has_request_context() else None
+            logger.warning('Slow query (%.1f ms) in %s: %s %s', duration_ms, endpoint or 'worker',
+                           statement[:MAX_STATEMENT_LENGTH], parameters)
+            with self._lock:
+                self.slow_queries.append({'endpoint': endpoint, 'duration_ms': round(duration_ms, 2),
+                                          'statement': statement[:MAX_STATEMENT_LENGTH],
+                                          'parameters': parameters, 'time': time.time()})
+
+    def _start_query_timer(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _stop_query_timer(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start')
+        if starts:
+            self.record_query(statement, parameters, (time.perf_counter() - starts.pop()) * 1000)
+
+    def _discard_query_timer(self, exception_context):
+        starts = exception_context.connection.info.get('query_start') if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+    def report(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'slow_query_ms': SLOW_QUERY_MS,
+                'n_plus_one_threshold': N_PLUS_ONE_THRESHOLD,
+                'endpoints': {endpoint: stats.report() for endpoint, stats in sorted(self.endpoints.items())},
+                'slow_queries': list(self.slow_queries),
+                'n_plus_one': list(self.n_plus_one),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+            self.slow_queries.clear()
+            self.n_plus_one.clear()
+
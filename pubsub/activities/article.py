@@ -0,0 +1,114 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+
+from temporalio import activity
+from temporalio.exceptions import ApplicationError
+
+from data.bootstrap import create_worker_app
+from data.db import db
+from models.news import News
+from shared import progress
+
+HEARTBEAT_SECONDS = 10
+
+_app = None
+
+
+def worker_app():
+    global _app
+    if _app is None:
+        _app = create_worker_app()
+    return _app
+
+
+@contextmanager
+def heartbeating(interval=HEARTBEAT_SECONDS):
+    """Heartbeat from a background thread while a blocking activity body runs."""
+    stop = threading.Event()
+    context = contextvars.copy_context()
+
+    def beat():
+        while not stop.wait(interval):
+            context.run(activity.heartbeat)
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def get_news(news_id):
+    news = db.session.get(News, news_id)
+    if news is None:
+        raise ApplicationError(f"News {news_id} does not exist", non_retryable=True)
+    return news
+
+
+@activity.defn(name="extract_article")
+def extract_article(news_id: int) -> bool:
+    """Load the article page and store its text. False when there was nothing to extract."""
+    from workers.extraction import CONTENT_NOT_LOADED, MIN_CONTENT_LENGTH, extract_article as extract_text, is_video_url
+
+    with heartbeating(), worker_app().app_context():
+        news = get_news(news_id)
+        has_text = news.news_text and news.news_text != CONTENT_NOT_LOADED and len(news.news_text) >= MIN_CONTENT_LENGTH
+        if has_text or not news.url or is_video_url(news.url):
+            return False
+        # ExtractionError is retried by the workflow's retry policy
+        news.news_text = extract_text(news.url)
+        db.session.commit()
+    progress.publish(progress.ARTICLE_EXTRACTED, 'temporal', news_id=news_id)
+    return True
+
+
+@activity.defn(name="summarize_article")
+def summarize_article(news_id: int) -> Optional[str]:
+    """Write the summary of a news item and return its new title."""
+    from workers.summarizer.main import store_summary
+
+    with heartbeating(), worker_app().app_context():
+        news = get_news(news_id)
+        latest = news.latest_summary
+        if news.processed is not None and latest:
+            return latest.title
+        title = store_summary(news.id, news.title, news.news_text, news.summary)
+        db.session.commit()
+    progress.publish(progress.SUMMARY_WRITTEN, 'temporal', news_id=news_id, title=title)
+    return title
+
+
+@activity.defn(name="generate_hashtags")
+def generate_hashtags(news_id: int) -> List[str]:
+    from workers.hashtag.main import store_hashtags
+
+    with heartbeating(), worker_app().app_context():
+        get_news(news_id)
+        hashtags = store_hashtags(news_id)
+        db.session.commit()
+    return hashtags
+
+
+@activity.defn(name="generate_article_image")
+def generate_article_image(news_id: int) -> Optional[str]:
+    from workers.image_gen.main import store_article_image
+
+    with heartbeating(), worker_app().app_context():
+        get_news(news_id)
+        return store_article_image(news_id)
+
+
+@activity.defn(name="generate_image")
+def generate_image(prompt: str, width: int, height: int) -> str:
+    """Activity of ImageGenerationWorkflow: the base64 PNG for a prompt."""
+    from workers.image_gen.main import generate_image as render_image
+
+    with heartbeating():
+        return render_image(prompt, width, height).image_data
+
+
+ACTIVITIES = [extract_article, summarize_article, generate_hashtags, generate_article_image, generate_image]
@@ -0,0 +1,43 @@
+import asyncio
+import os
+import sys
+
+# Add the parent directory (project root) to the Python path
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+from temporalio.client import Client
+from temporalio.exceptions import WorkflowAlreadyStartedError
+
+from pubsub.worker import TASK_QUEUE, TEMPORAL_ADDRESS, TEMPORAL_NAMESPACE
+from pubsub.workflows.article_pipeline import ArticlePipelineInput, ArticlePipelineWorkflow
+
+
+async def start_article_pipelines(news_ids, generate_image=True):
+    """
+    Start an ArticlePipelineWorkflow per news item, skipping those already running.
+
+    The workflow ID is derived from the News ID, so starting the same article twice
+    does not process it twice.
+
+    Returns:
+        list: The IDs of the workflows started.
+    """
+    client = await Client.connect(TEMPORAL_ADDRESS, namespace=TEMPORAL_NAMESPACE)
+    started = []
+    for news_id in news_ids:
+        try:
+            handle = await client.start_workflow(
+                ArticlePipelineWorkflow.run,
+                ArticlePipelineInput(news_id=news_id, generate_image=generate_image),
+                id=f"article-{news_id}",
+                task_queue=TASK_QUEUE,
+            )
+        except WorkflowAlreadyStartedError:
+            continue
+        started.append(handle.id)
+    return started
+
+
+if __name__ == "__main__":
+    for workflow_id in asyncio.run(start_article_pipelines([int(arg) for arg in sys.argv[1:]])):
+        print(f"Started {workflow_id}")
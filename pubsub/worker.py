@@ -0,0 +1,41 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory (project root) to the Python path
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+from temporalio.client import Client
+from temporalio.worker import Worker
+
+from pubsub.activities.article import ACTIVITIES
+from pubsub.workflows.article_pipeline import ArticlePipelineWorkflow
+from pubsub.workflows.image_generation import ImageGenerationWorkflow
+
+TEMPORAL_ADDRESS = os.environ.get('TEMPORAL_ADDRESS', 'localhost:7233')
+TEMPORAL_NAMESPACE = os.environ.get('TEMPORAL_NAMESPACE', 'default')
+TASK_QUEUE = os.environ.get('TEMPORAL_TASK_QUEUE', 'contentoire')
+# Activities block on Selenium and the models, each one holds a thread while it runs
+ACTIVITY_THREADS = int(os.environ.get('TEMPORAL_ACTIVITY_THREADS', 4))
+
+WORKFLOWS = [ArticlePipelineWorkflow, ImageGenerationWorkflow]
+
+
+async def main():
+    client = await Client.connect(TEMPORAL_ADDRESS, namespace=TEMPORAL_NAMESPACE)
+    with ThreadPoolExecutor(max_workers=ACTIVITY_THREADS) as executor:
+        worker = Worker(
+            client,
+            task_queue=TASK_QUEUE,
+            workflows=WORKFLOWS,
+            activities=ACTIVITIES,
+            activity_executor=executor,
+            max_concurrent_activities=ACTIVITY_THREADS,
+        )
+        print(f"Worker polling {TASK_QUEUE} on {TEMPORAL_ADDRESS}")
+        await worker.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
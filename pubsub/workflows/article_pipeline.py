@@ -0,0 +1,97 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import List, Optional
+
+from temporalio import workflow
+from temporalio.common import RetryPolicy
+from temporalio.exceptions import ActivityError
+
+# Activities send a heartbeat every few seconds, a silent one is retried elsewhere
+HEARTBEAT_TIMEOUT = timedelta(seconds=60)
+
+EXTRACT_RETRY = RetryPolicy(
+    initial_interval=timedelta(seconds=10),
+    backoff_coefficient=2.0,
+    maximum_interval=timedelta(minutes=5),
+    maximum_attempts=3,
+)
+MODEL_RETRY = RetryPolicy(
+    initial_interval=timedelta(seconds=30),
+    backoff_coefficient=2.0,
+    maximum_interval=timedelta(minutes=10),
+    maximum_attempts=5,
+)
+
+
+@dataclass
+class ArticlePipelineInput:
+    news_id: int
+    generate_image: bool = True
+
+
+@dataclass
+class ArticlePipelineResult:
+    news_id: int
+    extracted: bool = False
+    summary_title: Optional[str] = None
+    hashtags: List[str] = field(default_factory=list)
+    image_path: Optional[str] = None
+    failures: List[str] = field(default_factory=list)
+
+
+@workflow.defn
+class ArticlePipelineWorkflow:
+    @workflow.run
+    async def run(self, input: ArticlePipelineInput) -> ArticlePipelineResult:
+        """
+        Process one stored article: extract its text, then summarize, tag and illustrate it.
+
+        Hashtags and the image are taken from the summary title, so they start once the
+        summary is written, in parallel with each other. A step that still fails after its
+        retries is reported in ``failures`` without failing the others; without a summary,
+        hashtags and image fall back to the original title.
+
+        Args:
+            input: ArticlePipelineInput with the News ID
+
+        Returns:
+            ArticlePipelineResult: What each step produced
+        """
+        result = ArticlePipelineResult(news_id=input.news_id)
+        try:
+            result.extracted = await workflow.execute_activity(
+                "extract_article",
+                input.news_id,
+                start_to_close_timeout=timedelta(minutes=2),
+                heartbeat_timeout=HEARTBEAT_TIMEOUT,
+                retry_policy=EXTRACT_RETRY,
+            )
+        except ActivityError as e:
+            # The summary falls back to the feed or API description
+            result.failures.append(f"extract_article: {e.cause or e}")
+
+        async def step(activity, timeout):
+            try:
+                return await workflow.execute_activity(
+                    activity,
+                    input.news_id,
+                    start_to_close_timeout=timeout,
+                    heartbeat_timeout=HEARTBEAT_TIMEOUT,
+                    retry_policy=MODEL_RETRY,
+                )
+            except ActivityError as e:
+                result.failures.append(f"{activity}: {e.cause or e}")
+                return None
+
+        result.summary_title = await step("summarize_article", timedelta(minutes=15))
+
+        steps = [step("generate_hashtags", timedelta(minutes=5))]
+        if input.generate_image:
+            steps.append(step("generate_article_image", timedelta(minutes=30)))
+        outputs = await asyncio.gather(*steps)
+
+        result.hashtags = outputs[0] or []
+        if input.generate_image:
+            result.image_path = outputs[1]
+        return result
@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from temporalio import workflow, activity
 from dataclasses import dataclass
 from typing import Optional
@@ -26,5 +28,5 @@ class ImageGenerationWorkflow:
         return await workflow.execute_activity(
             "generate_image",
             args=[input.prompt, input.width, input.height],
-            start_to_close_timeout=180
+            start_to_close_timeout=timedelta(seconds=180)
         )
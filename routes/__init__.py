@@ -1,6 +1,10 @@
+from .admin import admin_bp
+from .api import api_bp
 from .auth.google import google_bp
+from .events import events_bp
 from .main import main_bp
 from .media_providers import media_provider_bp
+from .metrics import metrics_bp
 from .news_providers import news_provider_bp
 from .rssfeeds import rssfeeds_bp
 from .scheduler import scheduler_bp
@@ -8,4 +12,4 @@ from .search_keywords import keywords_bp
 from .users import users_bp
 
 blueprints = [main_bp, google_bp, news_provider_bp, users_bp, media_provider_bp, keywords_bp, 
-              scheduler_bp, rssfeeds_bp]
+              scheduler_bp, rssfeeds_bp, api_bp, events_bp, admin_bp, metrics_bp]
@@ -0,0 +1,171 @@
+from datetime import datetime
+from functools import wraps
+
+import click
+from data import jobs
+from data.db import db
+from extensions import profiler
+from flask import Blueprint, abort, jsonify, request
+from flask_login import current_user, login_required
+from models.ingestion import IngestionSchedule, sync_schedules
+from models.quota import KeywordYield, ProviderQuota
+from models.user import Permission, User
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+ADMIN_PERMISSION = 'admin'
+
+
+def admin_required(view):
+    """Require a logged-in user holding the ``admin`` permission."""
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if not current_user.has_permission(ADMIN_PERMISSION):
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@admin_bp.cli.command('grant')
+@click.argument('username')
+def grant_admin(username):
+    """Give USERNAME the admin permission, creating the permission on first use."""
+    user = User.query.filter((User.username == username) | (User.email == username)).first()
+    if user is None:
+        raise click.ClickException(f"No user '{username}'")
+    permission = Permission.query.filter_by(name=ADMIN_PERMISSION).first()
+    if permission is None:
+        permission = Permission(name=ADMIN_PERMISSION)
+        db.session.add(permission)
+    if permission not in user.permissions:
+        user.permissions.append(permission)
+    db.session.commit()
+    print(f"{user.username or user.email} is an admin")
+
+
+@admin_bp.route('/performance', methods=['GET'])
+@admin_required
+def performance():
+    """Per-endpoint latency histograms, query counts, N+1 reports and slow queries of this process."""
+    return jsonify(profiler.report())
+
+
+@admin_bp.route('/performance/reset', methods=['POST'])
+@admin_required
+def reset_performance():
+    profiler.reset()
+    return jsonify({'status': 'reset'})
+
+
+@admin_bp.route('/ingestion', methods=['GET'])
+@admin_required
+def ingestion_schedules():
+    """Interval and last-run state of every news provider and RSS feed."""
+    sync_schedules()
+    db.session.commit()
+    schedules = IngestionSchedule.query.order_by(IngestionSchedule.kind, IngestionSchedule.source_id).all()
+    return jsonify({'data': [schedule.to_dict() for schedule in schedules]})
+
+
+@admin_bp.route('/ingestion/<int:schedule_id>', methods=['PATCH', 'POST'])
+@admin_required
+def update_ingestion_schedule(schedule_id):
+    """
+    Change a source's schedule; the scheduler daemon picks it up on its next poll.
+
+    JSON or form fields (all optional):
+        interval_minutes: Minutes between runs, at least 1.
+        jitter_seconds: Random delay of up to this many seconds added to each run.
+        enabled: Whether the daemon runs this source.
+        run_now: Make the source due immediately.
+    """
+    schedule = IngestionSchedule.query.get_or_404(schedule_id)
+    data = request.get_json(silent=True) or request.form
+
+    try:
+        if 'interval_minutes' in data:
+            schedule.interval_minutes = int(data['interval_minutes'])
+        if 'jitter_seconds' in data:
+            schedule.jitter_seconds = int(data['jitter_seconds'])
+    except (TypeError, ValueError):
+        abort(400, "interval_minutes and jitter_seconds must be integers")
+    if schedule.interval_minutes < 1 or schedule.jitter_seconds < 0:
+        abort(400, "interval_minutes must be at least 1 and jitter_seconds not negative")
+    if 'enabled' in data:
+        schedule.enabled = str(data['enabled']).lower() in ('1', 'true', 'yes', 'on')
+    if str(data.get('run_now', '')).lower() in ('1', 'true', 'yes', 'on'):
+        schedule.next_run_at = datetime.now()
+
+    db.session.commit()
+    return jsonify({'data': schedule.to_dict()})
+
+
+@admin_bp.route('/quotas', methods=['GET'])
+@admin_required
+def provider_quotas():
+    """Daily quota use of every news provider, with the yield of its keywords."""
+    yields = {}
+    for stats in KeywordYield.query.order_by(KeywordYield.yield_per_call.desc()):
+        yields.setdefault(stats.provider_id, []).append(stats.to_dict())
+    return jsonify({'data': [dict(quota.to_dict(), keywords=yields.get(quota.provider_id, []))
+                             for quota in ProviderQuota.query.order_by(ProviderQuota.provider_id)]})
+
+
+@admin_bp.route('/quotas/<int:provider_id>', methods=['PATCH', 'POST'])
+@admin_required
+def update_provider_quota(provider_id):
+    """
+    Change a provider's quota, e.g. after switching plans.
+
+    JSON or form fields (all optional):
+        daily_limit: Requests per day, at least 1.
+        reset: Forget the usage and exhaustion recorded for the current day.
+    """
+    quota = ProviderQuota.query.filter_by(provider_id=provider_id).first_or_404()
+    data = request.get_json(silent=True) or request.form
+
+    if 'daily_limit' in data:
+        try:
+            quota.daily_limit = int(data['daily_limit'])
+        except (TypeError, ValueError):
+            abort(400, "daily_limit must be an integer")
+        if quota.daily_limit < 1:
+            abort(400, "daily_limit must be at least 1")
+    if str(data.get('reset', '')).lower() in ('1', 'true', 'yes', 'on'):
+        quota.used = 0
+        quota.reported_remaining = None
+        quota.exhausted_until = None
+
+    db.session.commit()
+    return jsonify({'data': quota.to_dict()})
+
+
+@admin_bp.route('/jobs', methods=['GET'])
+@admin_required
+def job_queue():
+    """Queued, running and dead-lettered job counts per pipeline stage."""
+    return jsonify({'data': jobs.queue_stats()})
+
+
+@admin_bp.route('/jobs/requeue', methods=['POST'])
+@admin_required
+def requeue_dead_jobs():
+    """Retry dead-lettered jobs, optionally only those of ``stage`` or with the given ``ids``."""
+    data = request.get_json(silent=True) or {}
+    requeued = jobs.requeue_dead(stage=data.get('stage'), ids=data.get('ids'))
+    db.session.commit()
+    return jsonify({'requeued': requeued})
+
+
+@admin_bp.route('/frontier', methods=['GET'])
+@admin_required
+def frontier_stats():
+    """Queued, leased and dead-lettered URLs of the extraction frontier."""
+    from redis.exceptions import RedisError
+    from shared.frontier import Frontier
+
+    try:
+        return jsonify({'data': Frontier().stats()})
+    except RedisError as e:
+        return jsonify({'error': f"Frontier unavailable: {e}"}), 503
@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+
+from data.db import db
+from data.pagination import keyset_page
+from flask import Blueprint, abort, jsonify, request, url_for
+from models.news import News, NewsSummary, filter_news
+from models.provider import SearchKeyword
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+API_PAGE_SIZE = 20
+MIN_COMPRESS_SIZE = 512
+
+# NewsItem field (mobile/types/news.ts) -> columns needed to build it
+NEWS_ITEM_FIELDS = {
+    'id': [],
+    'title': [News.title],
+    'summary': [News.summary],
+    'content': [News.news_text],
+    'source': [News.source],
+    'publishedAt': [],
+    'url': [News.url],
+    'imageUrl': [],
+    'keywords': [],
+}
+
+
+def parse_fields():
+    """Return the requested sparse fieldset, or all NewsItem fields."""
+    fields = request.args.get('fields')
+    if not fields:
+        return list(NEWS_ITEM_FIELDS)
+    fields = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in NEWS_ITEM_FIELDS]
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def news_query(fields):
+    """Build a News query that only loads what the requested fields need."""
+    columns = [News.id, News.published_at]
+    for field in fields:
+        columns += NEWS_ITEM_FIELDS[field]
+    options = [db.load_only(*columns)]
+    if 'summary' in fields:
+        options.append(db.selectinload(News.summaries).load_only(NewsSummary.summary, NewsSummary.created_at))
+    if 'keywords' in fields:
+        options.append(db.selectinload(News.tags))
+    return News.query.options(*options)
+
+
+def serialize_news(news, fields):
+    """Render a News row in the mobile NewsItem shape, restricted to ``fields``."""
+    item = {}
+    for field in fields:
+        if field == 'id':
+            item['id'] = str(news.id)
+        elif field == 'title':
+            item['title'] = news.title
+        elif field == 'summary':
+            latest = news.latest_summary
+            item['summary'] = latest.summary if latest else (news.summary or '')
+        elif field == 'content':
+            item['content'] = news.news_text or ''
+        elif field == 'source':
+            item['source'] = news.source or ''
+        elif field == 'publishedAt':
+            item['publishedAt'] = news.published_at.isoformat() + 'Z' if news.published_at else None
+        elif field == 'url':
+            item['url'] = news.url or ''
+        elif field == 'imageUrl':
+            item['imageUrl'] = ''
+        elif field == 'keywords':
+            item['keywords'] = [tag.tag for tag in news.tags]
+    return item
+
+
+@api_bp.route('/news', methods=['GET'])
+def list_news():
+    """
+    List news newest first in the mobile ``NewsItem`` shape.
+
+    Query args:
+        cursor: ``next_cursor`` of the previous page.
+        limit: Page size, at most 100.
+        fields: Comma-separated sparse fieldset, e.g. ``id,title,summary``.
+        keyword: Only news found for this search keyword or with it in the title.
+        provider_id, feed_id, keyword_id, processed, source, category, min_sentiment,
+            max_sentiment: As on the news dashboard.
+    """
+    fields = parse_fields()
+    limit = max(1, min(request.args.get('limit', API_PAGE_SIZE, type=int), 100))
+
+    query = filter_news(news_query(fields), request.args)
+    keyword = request.args.get('keyword', '').strip()
+    if keyword:
+        keyword_ids = db.session.query(SearchKeyword.id).filter(SearchKeyword.keyword == keyword)
+        query = query.filter(db.or_(News.keyword_id.in_(keyword_ids.scalar_subquery()),
+                                    News.title.icontains(keyword, autoescape=True)))
+
+    try:
+        news, next_cursor = keyset_page(query, [News.published_at, News.id],
+                                        cursor=request.args.get('cursor'), limit=limit)
+    except ValueError:
+        abort(400, "Invalid cursor")
+
+    links = {}
+    if next_cursor:
+        args = {k: v for k, v in request.args.items() if k != 'cursor'}
+        links['next'] = url_for('api.list_news', cursor=next_cursor, **args)
+    return jsonify({
+        'data': [serialize_news(item, fields) for item in news],
+        'next_cursor': next_cursor,
+        'links': links,
+    })
+
+
+@api_bp.route('/news/<int:news_id>', methods=['GET'])
+def get_news(news_id):
+    fields = parse_fields()
+    news = news_query(fields).filter(News.id == news_id).first_or_404()
+    return jsonify({'data': serialize_news(news, fields)})
+
+
+def negotiate_encoding():
+    """Pick the best compression the client accepts."""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+@api_bp.after_request
+def conditional_compressed_response(response):
+    """
+    Add a strong ETag to JSON responses, answer 304 when it matches and compress the rest.
+
+    The ETag is computed on the uncompressed body and suffixed with the content coding,
+    so each encoded representation has its own strong validator.
+    """
+    if response.status_code != 200 or response.direct_passthrough or not response.is_json:
+        return response
+
+    body = response.get_data()
+    encoding = negotiate_encoding() if len(body) >= MIN_COMPRESS_SIZE else None
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    if encoding:
+        etag = f'{etag}-{encoding}'
+
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(etag)
+
+    if request.if_none_match.contains(etag):
+        response.status_code = 304
+        response.set_data(b'')
+        response.headers.pop('Content-Type', None)
+        response.headers.pop('Content-Length', None)
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=5))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(body, compresslevel=6))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
@@ -1,7 +1,7 @@
 import os
 
 from data.db import db
-from extensions import oauth
+from extensions import cache, oauth
 from flask import Blueprint, redirect, url_for
 from flask_login import login_user
 from models.user import User
@@ -39,5 +39,6 @@ def authorized():
         user = User(email=user_info['email'], username=user_info['email'], first_name=user_info['given_name'], last_name=user_info['family_name'], picture_url=user_info['picture'])
         db.session.add(user)
         db.session.commit()
+        cache.invalidate('users')
     login_user(user)
     return redirect(url_for('main.index'))
\ No newline at end of file
@@ -0,0 +1,14 @@
+from extensions import cache
+from flask import render_template
+from markupsafe import Markup
+
+
+def render_cards(namespace, build_cards):
+    """
+    Render the card grid of a dashboard.
+
+    The HTML is cached until ``cache.invalidate(namespace)`` is called by a route that
+    changes the underlying rows, so ``build_cards`` only runs on a miss.
+    """
+    html = cache.get_or_set(namespace, 'cards', lambda: render_template('cards.html', cards=build_cards()))
+    return Markup(html)
@@ -0,0 +1,44 @@
+import json
+
+from flask import Blueprint, Response, stream_with_context
+from flask_login import login_required
+from shared.progress import get_broker
+
+events_bp = Blueprint('events', __name__, url_prefix='/events')
+
+# Comment lines keep proxies from closing an idle stream
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 5000
+
+
+def sse_stream(broker):
+    subscription = broker.subscribe()
+    yield f'retry: {RETRY_MILLISECONDS}\n\n'
+    try:
+        while True:
+            event = subscription.get(timeout=HEARTBEAT_SECONDS)
+            if event is None:
+                if get_broker() is not broker:
+                    # Redis came back: the browser reconnects and subscribes to it
+                    return
+                yield ': heartbeat\n\n'
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        subscription.close()
+
+
+@events_bp.route('/progress', methods=['GET'])
+@login_required
+def progress():
+    """
+    Stream pipeline progress as Server-Sent Events.
+
+    Events are pushed by the workers through ``shared.progress`` and forwarded as they
+    arrive, nothing is read from the database. Each open stream holds a server thread.
+    """
+    response = Response(stream_with_context(sse_stream(get_broker())),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
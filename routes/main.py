@@ -1,13 +1,16 @@
 import os
 
-from extensions import login_manager
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from data.db import db
+from extensions import cache, identity_cache, login_manager
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required, login_user, logout_user
 from models.user import User
 from werkzeug.security import check_password_hash
 
 main_bp = Blueprint('main', __name__)
 
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+
 @main_bp.route('/', methods=['GET'])
 @login_required
 def index():
@@ -24,9 +27,26 @@ def get_enabled_providers():
     return providers
 
 
+def fetch_user(user_id):
+    user = User.query.options(db.selectinload(User.permissions)).filter_by(id=user_id).first()
+    if user is not None:
+        # Detach with permissions loaded so the instance can be reused by later requests
+        for permission in user.permissions:
+            db.session.expunge(permission)
+        db.session.expunge(user)
+    return user
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.filter_by(id=user_id).first()
+    """
+    Load the logged-in user, from the identity cache when possible.
+
+    Entries live for ``USER_CACHE_TTL`` seconds and are dropped by the user update and
+    delete routes. The cache is per process, so other server processes may see a
+    change only once their entry expires.
+    """
+    return identity_cache.get_or_set('identity', str(user_id), lambda: fetch_user(user_id), ttl=USER_CACHE_TTL)
 
 
 @main_bp.route('/login', methods=['GET', 'POST'])
@@ -50,4 +70,10 @@ def login():
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('main.login'))
\ No newline at end of file
+    return redirect(url_for('main.login'))
+
+
+@main_bp.route('/cache/stats', methods=['GET'])
+@login_required
+def cache_stats():
+    return jsonify(cache.stats())
@@ -1,13 +1,13 @@
 from data.db import db
-from extensions import social_media_providers
+from extensions import cache, social_media_providers
 from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
 from models.provider import MediaProvider
 
+from .cards import render_cards
+
 media_provider_bp = Blueprint('media_provider', __name__, url_prefix='/providers/media')
 
-# Get all media providers
-@media_provider_bp.route('/', methods=['GET'])
-def dashboard():
+def media_cards():
     providers = MediaProvider.query.all()
     cards = []
     for provider in providers:
@@ -25,7 +25,13 @@ def dashboard():
             }
         }
         cards.append(card)
-    return render_template('media_providers.html', cards=cards, social_media_providers=social_media_providers)
+    return cards
+
+# Get all media providers
+@media_provider_bp.route('/', methods=['GET'])
+def dashboard():
+    return render_template('media_providers.html', cards_html=render_cards('media_providers', media_cards),
+                           social_media_providers=social_media_providers)
 
 # Create a new media provider
 @media_provider_bp.route('/', methods=['POST'])
@@ -54,6 +60,7 @@ def create_media_provider():
         enabled=True )
     db.session.add(provider)
     db.session.commit()
+    cache.invalidate('media_providers')
     flash('Media provider created successfully', 'success')
     return redirect(url_for('media_provider.dashboard'))
 
@@ -64,6 +71,7 @@ def update_media_provider(provider_id):
     provider = MediaProvider.query.get_or_404(provider_id)
     provider.provider_name = request.form.get('provider-name')
     db.session.commit()
+    cache.invalidate('media_providers')
     flash('Media provider updated successfully', 'success')
     return redirect(url_for('media_provider.dashboard'))
 
@@ -73,5 +81,6 @@ def delete_media_provider(provider_id):
     provider = MediaProvider.query.get_or_404(provider_id)
     db.session.delete(provider)
     db.session.commit()
+    cache.invalidate('media_providers')
     flash('Media provider deleted successfully', 'success')
     return redirect(url_for('media_provider.dashboard'))
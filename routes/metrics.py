@@ -0,0 +1,36 @@
+import hmac
+import os
+import time
+
+from flask import Blueprint, Response, abort, g, request
+from shared import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# When set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+
+@metrics_bp.before_app_request
+def start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+@metrics_bp.after_app_request
+def observe_request(response):
+    start = g.pop('metrics_start', None)
+    if start is not None and request.endpoint != 'metrics.scrape':
+        metrics.HTTP_REQUEST_SECONDS.labels(request.endpoint or '<unmatched>', request.method,
+                                            str(response.status_code)).observe(time.perf_counter() - start)
+    return response
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def scrape():
+    """Prometheus metrics of the web app and, with ``METRICS_DIR``, of the workers."""
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied, METRICS_TOKEN):
+            abort(401)
+    body, content_type = metrics.exposition()
+    return Response(body, content_type=content_type)
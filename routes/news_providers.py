@@ -1,12 +1,14 @@
+from data.associations import keyword_choices, keyword_ids_by_name, set_keywords
 from data.db import db
+from extensions import cache
 from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
-from models.provider import NewsProvider, SearchKeyword, keyword_news_providers
+from models.provider import NewsProvider
+
+from .cards import render_cards
 
 news_provider_bp = Blueprint('news_provider', __name__, url_prefix='/providers/news')
 
-# Get all news providers
-@news_provider_bp.route('/', methods=['GET'])
-def dashboard():
+def provider_cards():
     providers = NewsProvider.query.all()
     cards = []
     for provider in providers:
@@ -22,7 +24,12 @@ def dashboard():
             }
         }
         cards.append(card)
-    return render_template('news_providers.html', cards=cards)
+    return cards
+
+# Get all news providers
+@news_provider_bp.route('/', methods=['GET'])
+def dashboard():
+    return render_template('news_providers.html', cards_html=render_cards('news_providers', provider_cards))
 
 # Create a new news provider
 @news_provider_bp.route('/', methods=['POST'])
@@ -46,6 +53,7 @@ def create_news_provider():
         enabled=True )
     db.session.add(provider)
     db.session.commit()
+    cache.invalidate('news_providers')
     flash('News provider created successfully', 'success')
     return redirect(url_for('news_provider.dashboard'))
 
@@ -60,40 +68,22 @@ def update_news_provider(provider_id):
     provider.access_token_secret = request.form.get('provider-access-token')
     provider.description = request.form.get('description')
     db.session.commit()
+    cache.invalidate('news_providers')
     flash('News provider updated successfully', 'success')
     return redirect(url_for('news_provider.dashboard'))
 
 # Get keywords for a news provider
 @news_provider_bp.route('/<int:provider_id>/keywords', methods=['GET'])
 def get_provider_keywords(provider_id):
-    provider = NewsProvider.query.get_or_404(provider_id)
-    keywords = SearchKeyword.query.all()
-    selected_keywords = [k.keyword for k in provider.keywords]
-    return {
-        'keywords': [{'id': k.id, 'keyword': k.keyword, 'selected': k.keyword in selected_keywords} 
-                    for k in keywords]
-    }
+    NewsProvider.query.get_or_404(provider_id)
+    return {'keywords': keyword_choices('news', provider_id)}
 
 # Update keywords for a news provider
 @news_provider_bp.route('/<int:provider_id>/keywords', methods=['POST'])
 def update_provider_keywords(provider_id):
-    provider = NewsProvider.query.get_or_404(provider_id)
+    NewsProvider.query.get_or_404(provider_id)
     selected_keywords = request.form.getlist('keywords[]')
-    
-    # Clear existing relationships
-    db.session.query(keyword_news_providers).filter_by(news_provider_id=provider_id).delete()
-    
-    # Create new relationships
-    for keyword in selected_keywords:
-        keyword_obj = SearchKeyword.query.filter_by(keyword=keyword).first()
-        if keyword_obj:
-            db.session.execute(
-                keyword_news_providers.insert().values(
-                    news_provider_id=provider_id,
-                    keyword_id=keyword_obj.id
-                )
-            )
-    
+    set_keywords('news', provider_id, keyword_ids_by_name(selected_keywords))
     db.session.commit()
     flash('Keywords updated successfully', 'success')
     return redirect(url_for('news_provider.dashboard'))
@@ -104,5 +94,6 @@ def delete_news_provider(provider_id):
     provider = NewsProvider.query.get_or_404(provider_id)
     db.session.delete(provider)
     db.session.commit()
+    cache.invalidate('news_providers')
     flash('News provider deleted successfully', 'success')
     return redirect(url_for('news_provider.dashboard'))
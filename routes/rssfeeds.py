@@ -1,12 +1,14 @@
+from data.associations import keyword_choices, keyword_ids_by_name, set_keywords
 from data.db import db
+from extensions import cache
 from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
-from models.provider import FeedProvider, SearchKeyword, keyword_feed_providers
+from models.provider import FeedProvider
+
+from .cards import render_cards
 
 rssfeeds_bp = Blueprint('rssfeeds', __name__, url_prefix='/providers/rss')
 
-# Get all media providers
-@rssfeeds_bp.route('/', methods=['GET'])
-def dashboard():
+def feed_cards():
     providers = FeedProvider.query.all()
     cards = []
     for provider in providers:
@@ -22,7 +24,12 @@ def dashboard():
             }
         }
         cards.append(card)
-    return render_template('rssfeeds.html', cards=cards)
+    return cards
+
+# Get all media providers
+@rssfeeds_bp.route('/', methods=['GET'])
+def dashboard():
+    return render_template('rssfeeds.html', cards_html=render_cards('rssfeeds', feed_cards))
 
 
 # Create a new news provider
@@ -47,6 +54,7 @@ def create_rss_feed():
         enabled=True )
     db.session.add(provider)
     db.session.commit()
+    cache.invalidate('rssfeeds')
     flash('RSS feed created successfully', 'success')
     return redirect(url_for('rssfeeds.dashboard'))
 
@@ -61,43 +69,25 @@ def update_rss_feed(provider_id):
     provider.access_token_secret = request.form.get('provider-access-token')
     provider.description = request.form.get('description')
     db.session.commit()
+    cache.invalidate('rssfeeds')
     flash('RSS feed updated successfully', 'success')
     return redirect(url_for('rssfeeds.dashboard'))
 
 # Get keywords for a RSS feed
 @rssfeeds_bp.route('/<int:provider_id>/keywords', methods=['GET'])
 def get_provider_keywords(provider_id):
-    provider = FeedProvider.query.get_or_404(provider_id)
-    keywords = SearchKeyword.query.all()
-    selected_keywords = [k.keyword for k in provider.keywords]
-    return {
-        'keywords': [{'id': k.id, 'keyword': k.keyword, 'selected': k.keyword in selected_keywords} 
-                    for k in keywords]
-    }
+    FeedProvider.query.get_or_404(provider_id)
+    return {'keywords': keyword_choices('rss', provider_id)}
 
 # Update keywords for a RSS feed
 @rssfeeds_bp.route('/<int:provider_id>/keywords', methods=['POST'])
 def update_provider_keywords(provider_id):
-    provider = FeedProvider.query.get_or_404(provider_id)
+    FeedProvider.query.get_or_404(provider_id)
     selected_keywords = request.form.getlist('keywords[]')
-    
-    # Clear existing relationships
-    db.session.query(keyword_feed_providers).filter_by(feed_provider_id=provider_id).delete()
-
-    # Create new relationships
-    for keyword in selected_keywords:
-        keyword_obj = SearchKeyword.query.filter_by(keyword=keyword).first()
-        if keyword_obj:
-            db.session.execute(
-                keyword_feed_providers.insert().values(
-                    feed_provider_id=provider_id,
-                    keyword_id=keyword_obj.id
-                )
-            )
-    
+    set_keywords('rss', provider_id, keyword_ids_by_name(selected_keywords))
     db.session.commit()
     flash('Keywords updated successfully', 'success')
-    return redirect(url_for('news_provider.dashboard'))
+    return redirect(url_for('rssfeeds.dashboard'))
 
 # Delete a news provider
 @rssfeeds_bp.route('/<int:provider_id>', methods=['DELETE'])
@@ -105,5 +95,6 @@ def delete_news_provider(provider_id):
     provider = FeedProvider.query.get_or_404(provider_id)
     db.session.delete(provider)
     db.session.commit()
+    cache.invalidate('rssfeeds')
     flash('News provider deleted successfully', 'success')
     return redirect(url_for('news_provider.dashboard'))
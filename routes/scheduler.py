@@ -1,10 +1,18 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
 from data.db import db
-from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
-from models.provider import SearchKeyword, MediaProvider, NewsProvider
-from models.news import News
+from data.pagination import estimate_count, keyset_page
+from flask import Blueprint, abort, flash, jsonify, redirect, render_template, request, url_for
+from models.provider import FeedProvider, SearchKeyword, MediaProvider, NewsProvider
+from models.news import News, NewsSummary, filter_news
+from models.schedule import SCHEDULED_POST_STATUSES, ScheduledPost
 
 scheduler_bp = Blueprint('scheduler', __name__, url_prefix='/scheduler')
 
+NEWS_PAGE_SIZE = 50
+MAX_CALENDAR_DAYS = 120
+
 @scheduler_bp.route('/', methods=['GET'])
 def dashboard():
     return render_template('calendar.html')
@@ -15,5 +23,129 @@ def planner():
 
 @scheduler_bp.route('/news', methods=['GET'])
 def news_dashboard():
-    news = News.query.all()
-    return render_template('news.html', news=news)
+    limit = min(request.args.get('limit', NEWS_PAGE_SIZE, type=int), 200)
+    query = filter_news(News.query, request.args)
+
+    page = query.options(
+        db.load_only(News.id, News.title, News.url, News.source, News.published_at,
+                     News.provider_id, News.feed_id, News.keyword_id, News.processed),
+        db.joinedload(News.summaries).load_only(NewsSummary.title, NewsSummary.summary,
+                                                NewsSummary.created_at),
+    )
+    try:
+        news, next_cursor = keyset_page(page, [News.published_at, News.id],
+                                        cursor=request.args.get('cursor'), limit=limit)
+    except ValueError:
+        abort(400, "Invalid cursor")
+    total, exact = estimate_count(query.with_entities(News.id))
+
+    filters = {k: v for k, v in request.args.items() if k != 'cursor' and v}
+    return render_template(
+        'news.html',
+        news=news,
+        next_cursor=next_cursor,
+        total=total,
+        total_exact=exact,
+        filters=filters,
+        providers=NewsProvider.query.with_entities(NewsProvider.id, NewsProvider.provider_name).all(),
+        feeds=FeedProvider.query.with_entities(FeedProvider.id, FeedProvider.provider_name).all(),
+        keywords=SearchKeyword.query.with_entities(SearchKeyword.id, SearchKeyword.keyword).all(),
+    )
+
+
+def parse_day(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        abort(400, f"Invalid {name}, expected YYYY-MM-DD")
+
+
+# Get the scheduled posts of a date range grouped by day
+@scheduler_bp.route('/posts', methods=['GET'])
+def list_posts():
+    """
+    Return the posts scheduled between two days, inclusive, grouped by day.
+
+    Query args:
+        start (str): First day, YYYY-MM-DD.
+        end (str): Last day, YYYY-MM-DD, at most ``MAX_CALENDAR_DAYS`` after start.
+
+    Returns:
+        dict: ``{'days': {'YYYY-MM-DD': [post, ...]}}`` with posts in time order.
+    """
+    start = parse_day(request.args.get('start'), 'start')
+    end = parse_day(request.args.get('end'), 'end') + timedelta(days=1)
+    if end <= start or (end - start).days > MAX_CALENDAR_DAYS:
+        abort(400, f"The range must cover 1 to {MAX_CALENDAR_DAYS} days")
+
+    rows = (db.session.query(ScheduledPost.id, ScheduledPost.scheduled_at, ScheduledPost.status,
+                             ScheduledPost.news_id, db.func.coalesce(ScheduledPost.title, News.title),
+                             MediaProvider.provider_name, MediaProvider.media_name)
+            .join(News, News.id == ScheduledPost.news_id)
+            .join(MediaProvider, MediaProvider.id == ScheduledPost.media_provider_id)
+            .filter(ScheduledPost.scheduled_at >= start, ScheduledPost.scheduled_at < end)
+            .order_by(ScheduledPost.scheduled_at)
+            .all())
+
+    days = defaultdict(list)
+    for id, scheduled_at, status, news_id, title, provider_name, media_name in rows:
+        days[scheduled_at.strftime('%Y-%m-%d')].append({
+            'id': id,
+            'news_id': news_id,
+            'title': title,
+            'platform': provider_name,
+            'media': media_name,
+            'time': scheduled_at.strftime('%H:%M'),
+            'status': status,
+        })
+    return jsonify({'days': days})
+
+# Schedule a news item on a media provider
+@scheduler_bp.route('/posts', methods=['POST'])
+def create_post():
+    news_id = request.form.get('news_id', type=int)
+    media_provider_id = request.form.get('media_provider_id', type=int)
+    scheduled_at = request.form.get('scheduled_at')
+    if not news_id or not media_provider_id or not scheduled_at:
+        abort(400, "Missing required fields")
+    try:
+        scheduled_at = datetime.fromisoformat(scheduled_at)
+    except ValueError:
+        abort(400, "Invalid scheduled_at, expected an ISO date and time")
+
+    News.query.get_or_404(news_id)
+    MediaProvider.query.get_or_404(media_provider_id)
+    post = ScheduledPost(
+        news_id=news_id,
+        media_provider_id=media_provider_id,
+        scheduled_at=scheduled_at,
+        title=request.form.get('title'),
+        content=request.form.get('content'),
+    )
+    db.session.add(post)
+    db.session.commit()
+    return jsonify({"status": "success", "id": post.id}), 201
+
+# Reschedule or change the status of a post
+@scheduler_bp.route('/posts/<int:post_id>', methods=['PATCH', 'POST', 'PUT'])
+def update_post(post_id):
+    post = ScheduledPost.query.get_or_404(post_id)
+    if request.form.get('scheduled_at'):
+        try:
+            post.scheduled_at = datetime.fromisoformat(request.form['scheduled_at'])
+        except ValueError:
+            abort(400, "Invalid scheduled_at, expected an ISO date and time")
+    if request.form.get('status'):
+        if request.form['status'] not in SCHEDULED_POST_STATUSES:
+            abort(400, "Invalid status")
+        post.status = request.form['status']
+    db.session.commit()
+    return jsonify({"status": "success"})
+
+# Delete a scheduled post
+@scheduler_bp.route('/posts/<int:post_id>', methods=['DELETE'])
+def delete_post(post_id):
+    post = ScheduledPost.query.get_or_404(post_id)
+    db.session.delete(post)
+    db.session.commit()
+    return jsonify({"status": "success"})
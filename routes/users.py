@@ -1,14 +1,14 @@
 from data.db import db
+from extensions import cache, identity_cache
 from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
 from flask_login import login_required
 from models.user import User
 
+from .cards import render_cards
+
 users_bp = Blueprint('users', __name__, url_prefix='/users')
 
-# Get all news providers
-@users_bp.route('/', methods=['GET'])
-@login_required
-def dashboard():
+def user_cards():
     users = User.query.all()
     cards = []
     for user in users:
@@ -26,8 +26,13 @@ def dashboard():
             }
         }
         cards.append(card)
-        print(card)
-    return render_template('users.html', cards=cards)
+    return cards
+
+# Get all news providers
+@users_bp.route('/', methods=['GET'])
+@login_required
+def dashboard():
+    return render_template('users.html', cards_html=render_cards('users', user_cards))
 
 @users_bp.route('/', methods=['POST'])
 @login_required
@@ -50,11 +55,12 @@ def create_user():
         enabled=True )
     db.session.add(provider)
     db.session.commit()
+    cache.invalidate('users')
     flash('News provider created successfully', 'success')
     return redirect(url_for('users.dashboard'))
 
 
-@users_bp.route('/<int:provider_id>', methods=['PATCH', 'POST', 'PUT'])
+@users_bp.route('/<int:user_id>', methods=['PATCH', 'POST', 'PUT'])
 @login_required
 def update_user(user_id):
     user = User.query.get_or_404(user_id)
@@ -67,6 +73,8 @@ def update_user(user_id):
     user.comments = request.form.get('comments')
 
     db.session.commit()
+    cache.invalidate('users')
+    identity_cache.invalidate('identity')
     flash('User updated successfully', 'success')
     return redirect(url_for('users.dashboard'))
 
@@ -76,5 +84,7 @@ def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
     db.session.commit()
+    cache.invalidate('users')
+    identity_cache.invalidate('identity')
     flash('User deleted successfully', 'success')
     return redirect(url_for('users.dashboard'))
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from shared.politeness import HOST_CONCURRENCY, next_backoff
+
+FRONTIER_PREFIX = 'contentoire:frontier:'
+# Seconds between two fetches from the same host, across all workers
+DOMAIN_DELAY = float(os.environ.get('FRONTIER_DOMAIN_DELAY', 2))
+VISIBILITY_TIMEOUT = int(os.environ.get('FRONTIER_VISIBILITY_TIMEOUT', 120))
+MAX_ATTEMPTS = int(os.environ.get('FRONTIER_MAX_ATTEMPTS', 3))
+# Expired leases returned to their domain queue by each lease call
+RECLAIM_BATCH = 100
+
+# Return expired leases to their domain queues, then pop the URL of the host that has
+# been waiting longest and is allowed to be fetched again. An expired lease counts as a
+# failed attempt, so a URL that kills its worker every time is dead-lettered after
+# MAX_ATTEMPTS. A host with HOST_CONCURRENCY leases out leaves the ready set until one of
+# them is released.
+# KEYS: ready, inflight, next_fetch, delays, active, dead
+# ARGV: now, deadline, default delay, lease, prefix, reclaim batch, host concurrency, max attempts
+LEASE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local prefix = ARGV[5]
+for _, expired in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now, 'LIMIT', 0, tonumber(ARGV[6]))) do
+  local lease = redis.call('HMGET', prefix .. 'lease:' .. expired, 'host', 'item')
+  if lease[1] then
+    if redis.call('HINCRBY', KEYS[5], lease[1], -1) <= 0 then
+      redis.call('HDEL', KEYS[5], lease[1])
+    end
+    local item = cjson.decode(lease[2])
+    item['attempts'] = (tonumber(item['attempts']) or 0) + 1
+    if item['attempts'] >= tonumber(ARGV[8]) then
+      redis.call('RPUSH', KEYS[6], cjson.encode(item))
+    else
+      redis.call('LPUSH', prefix .. 'domain:' .. lease[1], cjson.encode(item))
+    end
+    local queue_length = redis.call('LLEN', prefix .. 'domain:' .. lease[1])
+    local active = tonumber(redis.call('HGET', KEYS[5], lease[1]) or 0)
+    if queue_length > 0 and active < tonumber(ARGV[7]) then
+      local next_fetch = tonumber(redis.call('HGET', KEYS[3], lease[1]) or now)
+      redis.call('ZADD', KEYS[1], math.max(next_fetch, now), lease[1])
+    end
+  end
+  redis.call('DEL', prefix .. 'lease:' .. expired)
+  redis.call('ZREM', KEYS[2], expired)
+end
+
+while true do
+  local hosts = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, 1)
+  if #hosts == 0 then
+    return false
+  end
+  local host = hosts[1]
+  local queue = prefix .. 'domain:' .. host
+  local item = redis.call('LPOP', queue)
+  if item then
+    local next_fetch = now + tonumber(redis.call('HGET', KEYS[4], host) or ARGV[3])
+    redis.call('HSET', KEYS[3], host, next_fetch)
+    local active = redis.call('HINCRBY', KEYS[5], host, 1)
+    if redis.call('LLEN', queue) > 0 and active < tonumber(ARGV[7]) then
+      redis.call('ZADD', KEYS[1], next_fetch, host)
+    else
+      redis.call('ZREM', KEYS[1], host)
+    end
+    redis.call('HSET', prefix .. 'lease:' .. ARGV[4], 'host', host, 'item', item)
+    redis.call('ZADD', KEYS[2], tonumber(ARGV[2]), ARGV[4])
+    return {host, item}
+  end
+  redis.call('ZREM', KEYS[1], host)
+end
+"""
+
+# Drop a lease, optionally putting a new version of its URL back in the domain queue and
+# holding the host back for some seconds. Returns 0 when the lease had already expired.
+# KEYS: ready, inflight, next_fetch, active   ARGV: lease, prefix, now, item, hold, at front
+RELEASE_SCRIPT = """
+local prefix = ARGV[2]
+local now = tonumber(ARGV[3])
+local host = redis.call('HGET', prefix .. 'lease:' .. ARGV[1], 'host')
+if not host then
+  return 0
+end
+redis.call('DEL', prefix .. 'lease:' .. ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+if redis.call('HINCRBY', KEYS[4], host, -1) <= 0 then
+  redis.call('HDEL', KEYS[4], host)
+end
+local next_fetch = tonumber(redis.call('HGET', KEYS[3], host) or now)
+if tonumber(ARGV[5]) > 0 then
+  next_fetch = math.max(next_fetch, now + tonumber(ARGV[5]))
+  redis.call('HSET', KEYS[3], host, next_fetch)
+end
+local queue = prefix .. 'domain:' .. host
+if ARGV[4] ~= '' then
+  redis.call(ARGV[6] == '1' and 'LPUSH' or 'RPUSH', queue, ARGV[4])
+end
+if redis.call('LLEN', queue) > 0 then
+  redis.call('ZADD', KEYS[1], math.max(next_fetch, now), host)
+end
+return 1
+"""
+
+# KEYS: ready, next_fetch, active   ARGV: host, item, now, prefix, host concurrency
+PUSH_SCRIPT = """
+local queue = ARGV[4] .. 'domain:' .. ARGV[1]
+redis.call('RPUSH', queue, ARGV[2])
+if tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or 0) < tonumber(ARGV[5]) then
+  local next_fetch = tonumber(redis.call('HGET', KEYS[2], ARGV[1]) or ARGV[3])
+  redis.call('ZADD', KEYS[1], 'NX', math.max(next_fetch, tonumber(ARGV[3])), ARGV[1])
+end
+return redis.call('LLEN', queue)
+"""
+
+
+def normalize_url(url):
+    """Lowercase scheme and host and drop the fragment, so trivially different URLs dedup."""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, ''))
+
+
+@dataclass
+class FrontierItem:
+    url: str
+    news_id: Optional[int] = None
+    attempts: int = 0
+    lease: Optional[str] = None
+
+    @property
+    def host(self):
+        return urlsplit(self.url).netloc.lower()
+
+
+class Frontier:
+    """
+    Shared frontier of article URLs to extract, stored in Redis.
+
+    URLs wait in one queue per host. A lease hands out the URL of the host that has waited
+    longest among those whose delay has passed, so any number of extraction workers on any
+    number of nodes spread their load across hosts. The delay of a host is
+    ``DOMAIN_DELAY`` unless set from its robots.txt crawl delay, it is extended while the
+    host is throttling us, and a host never has more than ``HOST_CONCURRENCY`` URLs leased.
+    A leased URL not acknowledged within its visibility timeout goes back to its queue, as
+    a failed attempt.
+    URLs are deduplicated on their normalized form for as long as the frontier keeps its
+    seen set.
+    """
+
+    def __init__(self, client=None, prefix=FRONTIER_PREFIX, domain_delay=DOMAIN_DELAY,
+                 host_concurrency=HOST_CONCURRENCY):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+        self.client = client
+        self.prefix = prefix
+        self.domain_delay = domain_delay
+        self.host_concurrency = host_concurrency
+        self.ready = prefix + 'ready'
+        self.inflight = prefix + 'inflight'
+        self.next_fetch = prefix + 'next_fetch'
+        self.delays = prefix + 'delays'
+        self.active = prefix + 'active'
+        self.backoff = prefix + 'backoff'
+        self.seen = prefix + 'seen'
+        self.dead = prefix + 'dead'
+        self._lease = client.register_script(LEASE_SCRIPT)
+        self._release_lease = client.register_script(RELEASE_SCRIPT)
+        self._push = client.register_script(PUSH_SCRIPT)
+
+    @staticmethod
+    def _payload(item):
+        return json.dumps({'url': item.url, 'news_id': item.news_id, 'attempts': item.attempts})
+
+    def _enqueue(self, item):
+        self._push(keys=[self.ready, self.next_fetch, self.active],
+                   args=[item.host, self._payload(item), time.time(), self.prefix, self.host_concurrency])
+
+    def add(self, url, news_id=None):
+        """
+        Queue a URL unless it was queued before.
+
+        Returns:
+            bool: False when the URL is a duplicate.
+        """
+        url = normalize_url(url)
+        fingerprint = hashlib.sha1(url.encode()).hexdigest()
+        if not self.client.sadd(self.seen, fingerprint):
+            return False
+        self._enqueue(FrontierItem(url, news_id))
+        return True
+
+    def lease(self, visibility_timeout=VISIBILITY_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+        """Take the next URL to fetch, or None when no host is ready."""
+        now = time.time()
+        lease = secrets.token_hex(8)
+        result = self._lease(keys=[self.ready, self.inflight, self.next_fetch, self.delays, self.active, self.dead],
+                             args=[now, now + visibility_timeout, self.domain_delay, lease, self.prefix,
+                                   RECLAIM_BATCH, self.host_concurrency, max_attempts])
+        if not result:
+            return None
+        data = json.loads(result[1])
+        return FrontierItem(data['url'], data.get('news_id'), data.get('attempts', 0), lease)
+
+    def _release(self, item, requeue=False, hold=0, at_front=False):
+        """Drop a lease; False when it had expired and the URL was handed out again."""
+        return bool(self._release_lease(
+            keys=[self.ready, self.inflight, self.next_fetch, self.active],
+            args=[item.lease, self.prefix, time.time(), self._payload(item) if requeue else '', hold,
+                  '1' if at_front else '0'],
+        ))
+
+    def ack(self, item):
+        # Each success halves the backoff of a host that was throttling us
+        backoff = self.client.hget(self.backoff, item.host)
+        if backoff is not None:
+            if float(backoff) / 2 < 1:
+                self.client.hdel(self.backoff, item.host)
+            else:
+                self.client.hset(self.backoff, item.host, float(backoff) / 2)
+        return self._release(item)
+
+    def retry(self, item, max_attempts=MAX_ATTEMPTS):
+        """
+        Put a failed URL back at the end of its host queue, or dead-letter it.
+
+        Returns:
+            bool: True when the URL was dead-lettered after ``max_attempts`` failures.
+        """
+        item.attempts += 1
+        dead = item.attempts >= max_attempts
+        if not self._release(item, requeue=not dead):
+            return False
+        if dead:
+            self.client.rpush(self.dead, self._payload(item))
+        return dead
+
+    def throttle(self, item, retry_after=None):
+        """
+        Put back a URL whose host answered 429 or 403 and hold the host back for every node.
+
+        The hold doubles on each throttled response, or follows the host's Retry-After.
+        It does not count as a failed attempt.
+
+        Returns:
+            float: Seconds the host is held back.
+        """
+        previous = float(self.client.hget(self.backoff, item.host) or 0)
+        backoff = next_backoff(previous, retry_after)
+        self.client.hset(self.backoff, item.host, backoff)
+        self._release(item, requeue=True, hold=backoff, at_front=True)
+        return backoff
+
+    def set_delay(self, host, seconds):
+        """Seconds between two fetches of ``host``, e.g. its robots.txt crawl delay."""
+        self.client.hset(self.delays, host, max(self.domain_delay, seconds))
+
+    def stats(self):
+        pipe = self.client.pipeline()
+        pipe.zcard(self.ready)
+        pipe.zcard(self.inflight)
+        pipe.llen(self.dead)
+        pipe.scard(self.seen)
+        ready, inflight, dead, seen = pipe.execute()
+        queued = sum(self.client.llen(key) for key in self.client.scan_iter(self.prefix + 'domain:*'))
+        backoff = {(host.decode() if isinstance(host, bytes) else host): float(seconds)
+                   for host, seconds in self.client.hgetall(self.backoff).items()}
+        return {'hosts_ready': ready, 'queued': queued, 'inflight': inflight, 'dead': dead, 'seen': seen,
+                'backoff': backoff}
@@ -0,0 +1,70 @@
+"""Dataclass mirrors of the job messages in shared/tasks.proto."""
+import json
+from dataclasses import asdict, dataclass, fields
+from typing import Optional
+
+# Pipeline order, also the proto Stage enum without STAGE_UNSPECIFIED
+STAGES = ('ingest', 'extract', 'summarize', 'hashtag', 'image', 'publish')
+
+
+@dataclass
+class IngestTask:
+    kind: str  # 'news' or 'rss'
+    source_id: int
+
+    stage = 'ingest'
+
+
+@dataclass
+class ExtractTask:
+    news_id: int
+    url: str
+
+    stage = 'extract'
+
+
+@dataclass
+class SummarizeTask:
+    news_id: int
+
+    stage = 'summarize'
+
+
+@dataclass
+class HashtagTask:
+    news_id: int
+
+    stage = 'hashtag'
+
+
+@dataclass
+class ImageTask:
+    news_id: int
+    prompt: str
+    width: int = 512
+    height: int = 512
+    style: Optional[str] = None
+
+    stage = 'image'
+
+
+@dataclass
+class PublishTask:
+    scheduled_post_id: int
+
+    stage = 'publish'
+
+
+JOB_TYPES = {task.stage: task for task in (IngestTask, ExtractTask, SummarizeTask, HashtagTask, ImageTask, PublishTask)}
+
+
+def encode_task(task):
+    """Serialize a task to the proto3 JSON form of its message."""
+    return json.dumps(asdict(task), separators=(',', ':'))
+
+
+def decode_task(stage, payload):
+    """Build the task of ``stage`` from its JSON form, ignoring fields added after this code."""
+    task_type = JOB_TYPES[stage]
+    data = json.loads(payload)
+    return task_type(**{field.name: data[field.name] for field in fields(task_type) if field.name in data})
@@ -0,0 +1,133 @@
+import atexit
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+# Workers and gunicorn processes share metrics through files in this directory. It must be
+# set before prometheus_client is imported, which picks the storage at import time.
+if os.environ.get('METRICS_DIR') and not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['METRICS_DIR'], exist_ok=True)
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = os.environ['METRICS_DIR']
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    pushadd_to_gateway,
+)
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+PUSHGATEWAY_URL = os.environ.get('PUSHGATEWAY_URL')
+
+ARTICLES_INGESTED = Counter('contentoire_articles_ingested_total',
+                            'New articles stored', ['provider'])
+PROVIDER_REQUEST_SECONDS = Histogram('contentoire_provider_request_seconds',
+                                     'News API and feed request latency', ['provider'])
+PROVIDER_ERRORS = Counter('contentoire_provider_errors_total',
+                          'Failed news API and feed requests', ['provider', 'reason'])
+SELENIUM_PAGE_SECONDS = Histogram('contentoire_selenium_page_seconds',
+                                  'Time to load an article page in Selenium', ['outcome'],
+                                  buckets=(1, 2.5, 5, 7.5, 10, 15, 20, 30, 60))
+SUMMARIZER_QUEUE_DEPTH = Gauge('contentoire_summarizer_queue_depth',
+                               'News waiting for a summary', multiprocess_mode='mostrecent')
+SUMMARIZER_TOKENS = Counter('contentoire_summarizer_tokens_total', 'Tokens generated by the summarizer')
+SUMMARIZER_TOKENS_PER_SECOND = Gauge('contentoire_summarizer_tokens_per_second',
+                                     'Generation speed of the last summary', multiprocess_mode='mostrecent')
+SUMMARIZER_SECONDS = Histogram('contentoire_summarizer_seconds', 'Time to summarize one article',
+                               buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300))
+POSTS_PUBLISHED = Counter('contentoire_posts_published_total',
+                          'Publish attempts of scheduled posts', ['platform', 'outcome'])
+DB_TRANSACTION_SECONDS = Histogram('contentoire_db_transaction_seconds',
+                                   'Database transaction duration', ['process', 'outcome'],
+                                   buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+HTTP_REQUEST_SECONDS = Histogram('contentoire_http_request_seconds', 'Web request latency',
+                                 ['endpoint', 'method', 'status'])
+
+# Label of DB_TRANSACTION_SECONDS, set by init_worker()
+process_name = 'web'
+
+
+def init_worker(job):
+    """
+    Label this process' metrics with ``job`` and push them when the process exits.
+
+    With ``METRICS_DIR`` set, the values are also kept on disk and served by the web
+    app's ``/metrics`` endpoint. With ``PUSHGATEWAY_URL`` set, they are pushed to the
+    Prometheus pushgateway under ``job``. Either way they outlive the process.
+    """
+    global process_name
+    process_name = job
+    if PUSHGATEWAY_URL:
+        atexit.register(push, job)
+
+
+def push(job):
+    try:
+        pushadd_to_gateway(PUSHGATEWAY_URL, job=job, registry=REGISTRY)
+    except Exception as e:
+        logger.warning('Could not push metrics of %s to %s: %s', job, PUSHGATEWAY_URL, e)
+
+
+def exposition():
+    """Return the metrics of every process in Prometheus text format, with its content type."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Drop the live gauges of a finished process, called by gunicorn when a worker exits."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+
+@contextmanager
+def provider_request(provider):
+    """Time a news API or feed request and count it as an error when it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        PROVIDER_ERRORS.labels(provider, type(e).__name__).inc()
+        raise
+    finally:
+        PROVIDER_REQUEST_SECONDS.labels(provider).observe(time.perf_counter() - start)
+
+
+def record_response(provider, response):
+    """Count an HTTP error status returned by a provider."""
+    if response.status_code >= 400:
+        PROVIDER_ERRORS.labels(provider, str(response.status_code)).inc()
+
+
+@event.listens_for(Engine, 'begin')
+def _start_transaction(conn):
+    conn.info['transaction_start'] = time.perf_counter()
+
+
+def _finish_transaction(conn, outcome):
+    start = conn.info.pop('transaction_start', None)
+    if start is not None:
+        DB_TRANSACTION_SECONDS.labels(process_name, outcome).observe(time.perf_counter() - start)
+
+
+@event.listens_for(Engine, 'commit')
+def _commit_transaction(conn):
+    _finish_transaction(conn, 'commit')
+
+
+@event.listens_for(Engine, 'rollback')
+def _rollback_transaction(conn):
+    _finish_transaction(conn, 'rollback')
@@ -0,0 +1,306 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from shared.politeness import parse_retry_after
+
+# Posts a minute per account, below each platform's posting limits; ``posts_per_minute`` in
+# the media provider's parameters overrides them
+POSTS_PER_MINUTE = {
+    'reddit': 1,
+    'instagram': 0.5,
+    'tiktok': 0.5,
+    'facebook': 5,
+    'twitter': 1,
+    'linkedin': 2,
+}
+# Recent posts of the account searched for one an earlier attempt may have published
+RECENT_POSTS = 25
+
+
+class PublishError(Exception):
+    """The platform refused the post, publishing it again would fail the same way."""
+
+
+class RetryableError(PublishError):
+    """
+    The post may succeed later: rate limited, platform error or network failure.
+
+    ``maybe_published`` is set when the platform may have accepted the post anyway, e.g.
+    the response to it timed out or was a 5xx.
+    """
+
+    def __init__(self, message, retry_after=None, maybe_published=False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.maybe_published = maybe_published
+
+
+@dataclass
+class PublishResult:
+    external_id: str
+    url: Optional[str] = None
+
+
+def compose(post, limit, link=True, link_length=None):
+    """
+    Title, text and link of a post in at most ``limit`` characters, cutting the text first.
+
+    ``link_length`` is the length the platform counts for a link, e.g. 23 on X.
+    """
+    tail = f"\n\n{post.link}" if link and post.link else ''
+    tail_length = (2 + link_length) if tail and link_length else len(tail)
+    head = post.title
+    room = limit - tail_length - len(head) - 2
+    text = post.text
+    if room <= 0:
+        head, text = head[:limit - tail_length - 1] + '…', ''
+    elif len(text) > room:
+        text = text[:room - 1].rsplit(' ', 1)[0] + '…'
+    return '\n\n'.join(part for part in (head, text) if part) + tail
+
+
+def same_post(post, text):
+    """Whether a post found on the platform is ``post``, by its opening words."""
+    ours = ' '.join(post.title.split())[:80].casefold()
+    return bool(ours) and ours in ' '.join((text or '').split()).casefold()
+
+
+class PlatformAdapter:
+    """
+    Publishes posts to one media platform account.
+
+    Subclasses implement ``publish``, and ``find`` when the platform lists recent posts,
+    which the publisher calls before retrying a post whose earlier attempt may have gone
+    through. Without ``can_find`` such a post is not retried, since it could be published
+    twice. Posts carry their idempotency key for the platforms that honour one; the
+    account's rate limit is applied by the publisher. ``api_url`` in the media provider's
+    parameters points the adapter at another server, e.g. ``benchmarks/platform_stub.py``.
+    """
+    api_url = None
+    can_find = True
+
+    def __init__(self, account, client):
+        self.account = account
+        self.params = account.params
+        self.client = client
+        self.api_url = self.params.get('api_url', self.api_url).rstrip('/')
+
+    @property
+    def token(self):
+        return self.params.get('access_token') or self.account.client_secret
+
+    def headers(self):
+        return {'Authorization': f'Bearer {self.token}'}
+
+    def param(self, name):
+        if not self.params.get(name):
+            raise PublishError(f"{self.account.platform} media provider needs '{name}' in its parameters")
+        return self.params[name]
+
+    async def request(self, method, path, key=None, headers=None, **kwargs):
+        headers = {**self.headers(), **(headers or {})}
+        if key:
+            headers['Idempotency-Key'] = key
+        url = path if path.startswith('http') else self.api_url + path
+        # Only the requests carrying a post's key create something on the platform
+        creates = key is not None
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.TransportError as e:
+            sent = not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+            raise RetryableError(f"{type(e).__name__}: {e}", maybe_published=creates and sent) from e
+        if response.status_code == 429:
+            raise RetryableError("Rate limited (HTTP 429)", parse_retry_after(response.headers.get('Retry-After')))
+        if response.status_code >= 500:
+            raise RetryableError(f"HTTP {response.status_code}: {response.text[:200]}", maybe_published=creates)
+        if response.status_code >= 400:
+            raise PublishError(f"HTTP {response.status_code}: {response.text[:500]}")
+        return response
+
+    async def publish(self, post):
+        raise NotImplementedError
+
+    async def find(self, post):
+        return None
+
+
+class RedditAdapter(PlatformAdapter):
+    """Link post to ``subreddit``, as the script app's ``username`` and ``password``."""
+    api_url = 'https://oauth.reddit.com'
+    token_url = 'https://www.reddit.com/api/v1/access_token'
+    _token = None
+
+    @property
+    def token(self):
+        return self._token
+
+    def headers(self):
+        return {'Authorization': f'Bearer {self._token}', 'User-Agent': 'contentoire/1.0'}
+
+    async def authorize(self):
+        if self._token:
+            return
+        token_url = self.params.get('token_url') or (
+            self.api_url + '/api/v1/access_token' if 'api_url' in self.params else self.token_url)
+        try:
+            response = await self.client.post(token_url, auth=(self.account.client_id, self.account.client_secret),
+                                              data={'grant_type': 'password', 'username': self.param('username'),
+                                                    'password': self.param('password')},
+                                              headers={'User-Agent': 'contentoire/1.0'})
+        except httpx.TransportError as e:
+            raise RetryableError(f"{type(e).__name__}: {e}") from e
+        if response.status_code != 200 or 'access_token' not in response.json():
+            raise PublishError(f"Reddit login failed: HTTP {response.status_code} {response.text[:200]}")
+        self._token = response.json()['access_token']
+
+    async def publish(self, post):
+        await self.authorize()
+        data = {'sr': self.param('subreddit'), 'title': post.title[:300], 'api_type': 'json'}
+        if post.link:
+            data.update(kind='link', url=post.link, resubmit='true')
+        else:
+            data.update(kind='self', text=post.text)
+        body = (await self.request('POST', '/api/submit', key=post.key, data=data)).json().get('json', {})
+        if body.get('errors'):
+            raise PublishError(f"Reddit refused the post: {body['errors']}")
+        return PublishResult(body['data']['name'], body['data'].get('url'))
+
+    async def find(self, post):
+        await self.authorize()
+        response = await self.request('GET', f"/user/{self.param('username')}/submitted",
+                                      params={'limit': RECENT_POSTS, 'sort': 'new'})
+        for child in response.json().get('data', {}).get('children', []):
+            data = child.get('data', {})
+            if (post.link and data.get('url') == post.link) or same_post(post, data.get('title')):
+                return PublishResult(data['name'], data.get('url'))
+        return None
+
+
+class FacebookAdapter(PlatformAdapter):
+    """Post on the page ``page_id`` with its page ``access_token``."""
+    api_url = 'https://graph.facebook.com/v19.0'
+
+    async def publish(self, post):
+        data = {'message': compose(post, 60000, link=False)}
+        if post.link:
+            data['link'] = post.link
+        body = (await self.request('POST', f"/{self.param('page_id')}/feed", key=post.key, data=data)).json()
+        return PublishResult(body['id'], f"https://www.facebook.com/{body['id']}")
+
+    async def find(self, post):
+        response = await self.request('GET', f"/{self.param('page_id')}/feed",
+                                      params={'fields': 'id,message,permalink_url', 'limit': RECENT_POSTS})
+        for item in response.json().get('data', []):
+            if same_post(post, item.get('message')):
+                return PublishResult(item['id'], item.get('permalink_url'))
+        return None
+
+
+class InstagramAdapter(PlatformAdapter):
+    """Image post of the business account ``ig_user_id``; needs the article's image."""
+    api_url = 'https://graph.facebook.com/v19.0'
+
+    async def publish(self, post):
+        if not post.image_url:
+            raise PublishError("Instagram posts need an image, set PUBLIC_IMAGE_URL and generate one")
+        user = self.param('ig_user_id')
+        container = (await self.request('POST', f'/{user}/media', key=post.key, data={
+            'image_url': post.image_url, 'caption': compose(post, 2200)})).json()
+        body = (await self.request('POST', f'/{user}/media_publish', key=post.key,
+                                   data={'creation_id': container['id']})).json()
+        return PublishResult(body['id'])
+
+    async def find(self, post):
+        response = await self.request('GET', f"/{self.param('ig_user_id')}/media",
+                                      params={'fields': 'id,caption,permalink', 'limit': RECENT_POSTS})
+        for item in response.json().get('data', []):
+            if same_post(post, item.get('caption')):
+                return PublishResult(item['id'], item.get('permalink'))
+        return None
+
+
+class TwitterAdapter(PlatformAdapter):
+    """Post on X with a user ``access_token``; ``user_id`` enables the duplicate check."""
+    api_url = 'https://api.twitter.com/2'
+
+    @property
+    def can_find(self):
+        return bool(self.params.get('user_id'))
+
+    async def publish(self, post):
+        body = (await self.request('POST', '/tweets', key=post.key,
+                                   json={'text': compose(post, 280, link_length=23)})).json()
+        tweet_id = body['data']['id']
+        return PublishResult(tweet_id, f'https://x.com/i/web/status/{tweet_id}')
+
+    async def find(self, post):
+        if not self.params.get('user_id'):
+            return None
+        response = await self.request('GET', f"/users/{self.params['user_id']}/tweets", params={'max_results': 10})
+        for tweet in response.json().get('data', []):
+            if same_post(post, tweet.get('text')):
+                return PublishResult(tweet['id'], f"https://x.com/i/web/status/{tweet['id']}")
+        return None
+
+
+class LinkedInAdapter(PlatformAdapter):
+    """Article share by ``author``, a person or organization URN."""
+    api_url = 'https://api.linkedin.com/rest'
+
+    def headers(self):
+        return {**super().headers(), 'LinkedIn-Version': self.params.get('version', '202405'),
+                'X-Restli-Protocol-Version': '2.0.0'}
+
+    async def publish(self, post):
+        body = {
+            'author': self.param('author'),
+            'commentary': compose(post, 3000, link=False),
+            'visibility': 'PUBLIC',
+            'distribution': {'feedDistribution': 'MAIN_FEED', 'targetEntities': [], 'thirdPartyDistributionChannels': []},
+            'lifecycleState': 'PUBLISHED',
+            'isReshareDisabledByAuthor': False,
+        }
+        if post.link:
+            body['content'] = {'article': {'source': post.link, 'title': post.title[:400]}}
+        response = await self.request('POST', '/posts', key=post.key, json=body)
+        urn = response.headers.get('x-restli-id', '')
+        return PublishResult(urn, f'https://www.linkedin.com/feed/update/{urn}' if urn else None)
+
+    async def find(self, post):
+        response = await self.request('GET', '/posts', params={'q': 'author', 'author': self.param('author'),
+                                                                'count': RECENT_POSTS})
+        for item in response.json().get('elements', []):
+            if same_post(post, item.get('commentary')):
+                return PublishResult(item['id'], f"https://www.linkedin.com/feed/update/{item['id']}")
+        return None
+
+
+class TikTokAdapter(PlatformAdapter):
+    """Photo post pulled from the article's image; TikTok has no text-only posts."""
+    api_url = 'https://open.tiktokapis.com/v2'
+    can_find = False  # a publish_id is only known from the response
+
+    async def publish(self, post):
+        if not post.image_url:
+            raise PublishError("TikTok posts need an image, set PUBLIC_IMAGE_URL and generate one")
+        body = (await self.request('POST', '/post/publish/content/init/', key=post.key, json={
+            'post_info': {'title': post.title[:90], 'description': compose(post, 4000)},
+            'source_info': {'source': 'PULL_FROM_URL', 'photo_images': [post.image_url], 'photo_cover_index': 0},
+            'post_mode': 'DIRECT_POST',
+            'media_type': 'PHOTO',
+        })).json()
+        if body.get('error', {}).get('code', 'ok') != 'ok':
+            raise PublishError(f"TikTok refused the post: {body['error']}")
+        return PublishResult(body['data']['publish_id'])
+
+
+ADAPTERS = {
+    'reddit': RedditAdapter,
+    'instagram': InstagramAdapter,
+    'tiktok': TikTokAdapter,
+    'facebook': FacebookAdapter,
+    'twitter': TwitterAdapter,
+    'linkedin': LinkedInAdapter,
+}
@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+from urllib import robotparser
+from urllib.parse import urlsplit
+
+import requests
+
+# Token matched against the User-agent lines of robots.txt
+ROBOTS_AGENT = os.environ.get('ROBOTS_USER_AGENT', 'Contentoire')
+ROBOTS_TTL = int(os.environ.get('ROBOTS_TTL', 86400))
+ROBOTS_TIMEOUT = 10
+# Fetches running at once against one host, and seconds between two fetch starts
+HOST_CONCURRENCY = int(os.environ.get('POLITENESS_HOST_CONCURRENCY', 1))
+HOST_DELAY = float(os.environ.get('POLITENESS_HOST_DELAY', 2))
+# Backoff after a 429 or 403, doubled on each throttled response and halved on each success
+BACKOFF_INITIAL = 30
+BACKOFF_MAX = int(os.environ.get('POLITENESS_BACKOFF_MAX', 3600))
+THROTTLE_STATUSES = (403, 429)
+# Pages of a host that must wait longer than this are given up for the run
+MAX_WAIT = int(os.environ.get('POLITENESS_MAX_WAIT', 300))
+
+
+class HostThrottled(Exception):
+    """The host answered with a throttling status code."""
+
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}" + (f", retry after {retry_after:.0f}s" if retry_after else ""))
+        self.status = status
+        self.retry_after = retry_after
+
+
+class Skipped(Exception):
+    """A page that was not fetched because its host stayed blocked."""
+
+
+class RobotsDisallowed(Skipped):
+    """A page that robots.txt does not let us fetch."""
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower()
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header, given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def next_backoff(previous, retry_after=None):
+    if retry_after:
+        return min(max(retry_after, previous), BACKOFF_MAX)
+    return min(max(previous * 2, BACKOFF_INITIAL), BACKOFF_MAX)
+
+
+class RobotsCache:
+    """
+    robots.txt rules and crawl delays per host, fetched once per ``ROBOTS_TTL``.
+
+    With a Redis client the robots.txt bodies are shared by every process and node.
+    A missing robots.txt allows everything; one answering 401 or 403 forbids everything.
+    """
+
+    def __init__(self, client=None, prefix='contentoire:robots:', ttl=ROBOTS_TTL, agent=ROBOTS_AGENT):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.agent = agent
+        self._parsers = {}
+        self._lock = threading.Lock()
+
+    def _download(self, scheme, host):
+        try:
+            response = requests.get(f'{scheme}://{host}/robots.txt', timeout=ROBOTS_TIMEOUT,
+                                    headers={'User-Agent': self.agent})
+        except requests.RequestException:
+            return ''  # unreachable: try the pages themselves
+        if response.status_code in (401, 403):
+            return 'User-agent: *\nDisallow: /'
+        if response.status_code >= 400:
+            return ''
+        return response.text
+
+    def _robots_txt(self, scheme, host):
+        key = self.prefix + host
+        if self.client is not None:
+            cached = self.client.get(key)
+            if cached is not None:
+                return cached.decode() if isinstance(cached, bytes) else cached
+        body = self._download(scheme, host)
+        if self.client is not None:
+            self.client.setex(key, self.ttl, body)
+        return body
+
+    def parser(self, url):
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        with self._lock:
+            cached = self._parsers.get(host)
+        if cached and cached[0] > time.time():
+            return cached[1]
+        parser = robotparser.RobotFileParser()
+        parser.parse(self._robots_txt(parts.scheme or 'https', host).splitlines())
+        with self._lock:
+            self._parsers[host] = (time.time() + self.ttl, parser)
+        return parser
+
+    def allowed(self, url):
+        return self.parser(url).can_fetch(self.agent, url)
+
+    def crawl_delay(self, url):
+        parser = self.parser(url)
+        delay = parser.crawl_delay(self.agent)
+        if delay is None and parser.request_rate(self.agent):
+            rate = parser.request_rate(self.agent)
+            delay = rate.seconds / rate.requests
+        return float(delay) if delay else None
+
+
+class HostState:
+    def __init__(self):
+        self.active = 0
+        self.next_start = 0.0
+        self.backoff = 0.0
+        self.delay = None
+
+
+class Politeness:
+    """Per-host concurrency, delay and backoff state of the fetches of one process."""
+
+    def __init__(self, robots=None, concurrency=HOST_CONCURRENCY, delay=HOST_DELAY):
+        self.robots = robots or RobotsCache()
+        self.concurrency = concurrency
+        self.delay = delay
+        self.hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, url):
+        host = host_of(url)
+        with self._lock:
+            state = self.hosts.get(host)
+            if state is None:
+                state = self.hosts[host] = HostState()
+        if state.delay is None:
+            state.delay = max(self.delay, self.robots.crawl_delay(url) or 0)
+        return state
+
+    def wait_time(self, url):
+        """Seconds before a fetch of ``url`` may start, or None while the host is at its concurrency limit."""
+        state = self.host(url)
+        if state.active >= self.concurrency:
+            return None
+        return max(0.0, state.next_start - time.time())
+
+    def start(self, url):
+        state = self.host(url)
+        state.active += 1
+        state.next_start = time.time() + state.delay
+
+    def finish(self, url, error=None):
+        state = self.host(url)
+        state.active -= 1
+        if isinstance(error, HostThrottled):
+            state.backoff = next_backoff(state.backoff, error.retry_after)
+            state.next_start = max(state.next_start, time.time() + state.backoff)
+        else:
+            state.backoff /= 2
+
+
+class FetchScheduler:
+    """
+    Run ``fetch(url)`` over many pages on a thread pool, politely.
+
+    Pages are taken round-robin across hosts: each host gets its own concurrency limit,
+    its delay between fetches (the larger of ``HOST_DELAY`` and its robots.txt crawl
+    delay) and a growing backoff after a throttling response, after which the page is
+    tried again. Other hosts keep being fetched meanwhile. Pages disallowed by robots.txt,
+    and pages of a host blocked for more than ``MAX_WAIT`` seconds, are reported as
+    RobotsDisallowed and Skipped errors instead.
+    """
+
+    def __init__(self, fetch, workers=2, politeness=None, max_wait=MAX_WAIT, retries=1):
+        self.fetch = fetch
+        self.workers = workers
+        self.politeness = politeness or Politeness()
+        self.max_wait = max_wait
+        self.retries = retries
+
+    def _fetch(self, url):
+        try:
+            return self.fetch(url), None
+        except Exception as e:
+            return None, e
+
+    def run(self, items, url=lambda item: item):
+        """
+        Fetch every item and yield ``(item, content, error)`` as fetches complete.
+
+        ``url`` gives the page URL of an item. ``error`` is None on success.
+        """
+        queues = OrderedDict()
+        for item in items:
+            queues.setdefault(host_of(url(item)), deque()).append(item)
+        retried = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while queues or running:
+                sleep = 1.0
+                for host in list(queues):
+                    if len(running) >= self.workers:
+                        break
+                    item = queues[host][0]
+                    page = url(item)
+                    if not self.politeness.robots.allowed(page):
+                        queues[host].popleft()
+                        yield item, None, RobotsDisallowed(f"Disallowed by robots.txt: {page}")
+                    else:
+                        wait_time = self.politeness.wait_time(page)
+                        if wait_time is None:
+                            continue
+                        if wait_time > self.max_wait:
+                            # Backing off for too long: give up on this host for the run
+                            for skipped in queues.pop(host):
+                                yield skipped, None, Skipped(f"{host} is backing off")
+                            continue
+                        if wait_time > 0:
+                            sleep = min(sleep, wait_time)
+                            continue
+                        queues[host].popleft()
+                        self.politeness.start(page)
+                        running[executor.submit(self._fetch, page)] = item
+                    if not queues[host]:
+                        del queues[host]
+                    else:
+                        # Round-robin: the host goes to the back of the line
+                        queues.move_to_end(host)
+                if not running:
+                    if queues:
+                        time.sleep(sleep)
+                    continue
+                done, _ = wait(running, timeout=sleep, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = running.pop(future)
+                    page = url(item)
+                    content, error = future.result()
+                    self.politeness.finish(page, error)
+                    if isinstance(error, HostThrottled) and retried.get(id(item), 0) < self.retries:
+                        retried[id(item)] = retried.get(id(item), 0) + 1
+                        queues.setdefault(host_of(page), deque()).appendleft(item)
+                        continue
+                    yield item, content, error
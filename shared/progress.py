@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'contentoire:progress'
+
+# Event types published by the pipeline
+RUN_STARTED = 'run_started'
+RUN_FINISHED = 'run_finished'
+FEED_FETCHED = 'feed_fetched'
+ARTICLE_EXTRACTED = 'article_extracted'
+ARTICLES_STORED = 'articles_stored'
+SUMMARY_WRITTEN = 'summary_written'
+FAILURE = 'failure'
+
+
+class Subscription:
+    def __init__(self, get, close):
+        self._get = get
+        self._close = close
+
+    def get(self, timeout=None):
+        """Wait up to ``timeout`` seconds for the next event, None if there was none."""
+        return self._get(timeout)
+
+    def close(self):
+        self._close()
+
+
+class InProcessBroker:
+    """Fan-out to subscribers of the same process, used when Redis is not reachable."""
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                pass  # a stalled dashboard must not block the pipeline
+
+    def subscribe(self):
+        subscriber = queue.Queue(self.maxsize)
+        with self._lock:
+            self._subscribers.add(subscriber)
+
+        def get(timeout):
+            try:
+                return subscriber.get(timeout=timeout)
+            except queue.Empty:
+                return None
+
+        def close():
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+        return Subscription(get, close)
+
+
+class RedisBroker:
+    """Cross-process fan-out through Redis pub/sub, so cron workers reach the web app."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def publish(self, event):
+        self.client.publish(CHANNEL, json.dumps(event))
+
+    def subscribe(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(CHANNEL)
+
+        def get(timeout):
+            message = pubsub.get_message(timeout=timeout or 0)
+            return json.loads(message['data']) if message else None
+
+        return Subscription(get, pubsub.close)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+_redis_retry_at = 0.0
+_redis_backoff = 0.0
+# Delay before Redis is tried again after failing, doubling up to the maximum
+REDIS_RETRY_SECONDS = (5, 300)
+
+
+def get_broker():
+    """
+    Return the Redis broker when ``REDIS_URL`` answers, the in-process one otherwise.
+
+    While on the in-process broker Redis is tried again after a backoff, so a Redis that
+    was down when the process started is picked up once it is back.
+    """
+    global _broker, _redis_retry_at, _redis_backoff
+    with _broker_lock:
+        if isinstance(_broker, RedisBroker) or (_broker is not None and time.monotonic() < _redis_retry_at):
+            return _broker
+        url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+        try:
+            import redis
+
+            client = redis.Redis.from_url(url, socket_connect_timeout=1)
+            client.ping()
+        except Exception as e:
+            _redis_backoff = min(_redis_backoff * 2, REDIS_RETRY_SECONDS[1]) or REDIS_RETRY_SECONDS[0]
+            _redis_retry_at = time.monotonic() + _redis_backoff
+            if _broker is None:
+                logger.info('Progress events stay in-process, Redis unavailable: %s', e)
+                _broker = InProcessBroker()
+            return _broker
+        if _broker is not None:
+            logger.info('Redis is back, progress events go through it again')
+        _broker = RedisBroker(client)
+        return _broker
+
+
+def publish(event_type, source, **fields):
+    """
+    Publish a progress event; failures are logged and never interrupt the caller.
+
+    Args:
+        event_type (str): One of the event type constants of this module.
+        source (str): The publishing worker, e.g. 'rssfeeds' or 'summarizer'.
+        **fields: Event details such as the feed, URL or counts. Must be JSON serializable.
+    """
+    event = {'type': event_type, 'source': source, 'time': time.time(), 'pid': os.getpid(), **fields}
+    try:
+        get_broker().publish(event)
+    except Exception as e:
+        logger.warning('Could not publish progress event %s: %s', event_type, e)
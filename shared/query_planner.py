@@ -0,0 +1,170 @@
+import os
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+# Longest query string each provider accepts, NewsData.io's depends on the plan
+QUERY_LENGTHS = {
+    'newsapi': int(os.environ.get('NEWSAPI_QUERY_LENGTH', 500)),
+    'newsdata': int(os.environ.get('NEWSDATA_QUERY_LENGTH', 100)),
+    'worldnews': int(os.environ.get('WORLDNEWS_QUERY_LENGTH', 100)),
+}
+# Articles fetched per keyword of a combined query, as many as one query per keyword got
+ARTICLES_PER_KEYWORD = 20
+OPERATORS = re.compile(r'["()]|\b(AND|OR|NOT)\b|(^|\s)[-+]')
+# Endings the provider's own stemming matches, e.g. 'election' finds 'elections'
+SUFFIXES = ('', 's', 'es')
+
+
+@dataclass
+class QueryPlan:
+    """One provider query covering several keywords that share the same filters."""
+    query: str
+    keywords: List = field(default_factory=list)
+    filters: Dict = field(default_factory=dict)
+    per_keyword: int = ARTICLES_PER_KEYWORD
+
+    @property
+    def target(self):
+        """Articles to fetch for the query, so each keyword gets as many as before."""
+        return self.per_keyword * len(self.keywords)
+
+
+def is_boolean(keyword):
+    """Keywords written with their own operators are sent alone, never combined."""
+    return bool(OPERATORS.search(keyword))
+
+
+def term(keyword):
+    keyword = ' '.join(keyword.split())
+    return f'"{keyword}"' if ' ' in keyword else keyword
+
+
+def plan_queries(keywords, max_length, filters=(), per_keyword=ARTICLES_PER_KEYWORD):
+    """
+    Pack keywords into as few OR queries as fit in ``max_length`` characters.
+
+    Keywords are grouped by the values of their ``filters`` attributes (e.g. language or
+    region), which a query applies to all its terms. Within a group, terms are packed
+    first-fit, longest first. A keyword too long to share a query, or that uses boolean
+    operators itself, gets a query of its own.
+
+    Args:
+        keywords (list): SearchKeyword objects
+        max_length (int): Longest query the provider accepts
+        filters (tuple): SearchKeyword attributes sent as request parameters
+        per_keyword (int): Articles one query per keyword used to fetch
+
+    Returns:
+        list: QueryPlan objects
+    """
+    groups = {}
+    for keyword in keywords:
+        if not keyword.keyword or not keyword.keyword.strip():
+            continue
+        key = tuple(getattr(keyword, name) for name in filters)
+        groups.setdefault(key, []).append(keyword)
+
+    plans = []
+    for key, members in groups.items():
+        group_filters = dict(zip(filters, key))
+        open_plans = []
+        for keyword in sorted(members, key=lambda k: len(term(k.keyword)), reverse=True):
+            if is_boolean(keyword.keyword):
+                plans.append(QueryPlan(keyword.keyword, [keyword], group_filters, per_keyword))
+                continue
+            text = term(keyword.keyword)
+            for plan in open_plans:
+                if len(plan.query) + len(' OR ') + len(text) <= max_length:
+                    plan.query = f'{plan.query} OR {text}'
+                    plan.keywords.append(keyword)
+                    break
+            else:
+                open_plans.append(QueryPlan(text, [keyword], group_filters, per_keyword))
+        plans.extend(open_plans)
+    return plans
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton finding every keyword in a text in a single pass.
+
+    Matching is case insensitive, starts at a word boundary and allows a plural ending,
+    like the providers' own search.
+    """
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for keyword in keywords:
+            self._add(' '.join(keyword.keyword.casefold().split()), keyword)
+        self._build()
+
+    def _add(self, pattern, keyword):
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].append((len(pattern), keyword))
+
+    def _build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    @staticmethod
+    def _bounded(text, start, end):
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        for suffix in SUFFIXES:
+            stop = end + len(suffix)
+            if text.startswith(suffix, end) and (stop == len(text) or not text[stop].isalnum()):
+                return True
+        return False
+
+    def counts(self, text):
+        """Occurrences of each keyword in ``text``, keyed by keyword."""
+        text = ' '.join((text or '').casefold().split())
+        found = {}
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, keyword in self.output[state]:
+                if self._bounded(text, position + 1 - length, position + 1):
+                    found[keyword] = found.get(keyword, 0) + 1
+        return found
+
+
+def attribute(plan, matcher, title, *texts):
+    """
+    The keywords of ``plan`` an article matches, best match first.
+
+    Matches in the title count three times. An article the provider matched on
+    something we cannot see (synonyms, stemming) goes to the query's first keyword.
+    """
+    scores = {}
+    for keyword, count in matcher.counts(title).items():
+        scores[keyword] = scores.get(keyword, 0) + 3 * count
+    for text in texts:
+        for keyword, count in matcher.counts(text).items():
+            scores[keyword] = scores.get(keyword, 0) + count
+    matched = sorted((keyword for keyword in plan.keywords if keyword in scores),
+                     key=lambda keyword: scores[keyword], reverse=True)
+    return matched or plan.keywords[:1]
@@ -0,0 +1,23 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations, so waiting callers are served in order."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """Take a token, possibly ahead of time; returns the seconds to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        await asyncio.sleep(self.reserve())
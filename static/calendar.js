@@ -9,6 +9,11 @@ document.addEventListener('DOMContentLoaded', function() {
     renderCalendar(currentMonth, 'currentMonth');
     renderCalendar(nextMonth, 'nextMonth');
 
+    // One request covers the three visible months
+    const start = new Date(previousMonth.getFullYear(), previousMonth.getMonth(), 1);
+    const end = new Date(nextMonth.getFullYear(), nextMonth.getMonth() + 1, 0);
+    loadPosts(start, end);
+
     // Handle tab switching
     document.querySelectorAll('.tab-btn').forEach(button => {
         button.addEventListener('click', function() {
@@ -22,6 +27,41 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+function formatDate(year, month, day) {
+    return `${year}-${String(month + 1).padStart(2, '0')}-${String(day).padStart(2, '0')}`;
+}
+
+function loadPosts(start, end) {
+    const params = new URLSearchParams({
+        start: formatDate(start.getFullYear(), start.getMonth(), start.getDate()),
+        end: formatDate(end.getFullYear(), end.getMonth(), end.getDate()),
+    });
+    fetch(`/contentoire/scheduler/posts?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            Object.entries(data.days).forEach(([day, posts]) => {
+                const cell = document.querySelector(`td[data-date="${day}"]`);
+                if (!cell) {
+                    return;
+                }
+                const list = document.createElement('div');
+                list.className = 'calendar-posts';
+                posts.forEach(post => {
+                    const item = document.createElement('div');
+                    item.className = `calendar-post calendar-post-${post.status}`;
+                    item.title = `${post.time} ${post.media}: ${post.title}`;
+                    const icon = document.createElement('i');
+                    icon.className = `fab fa-${post.platform}`;
+                    item.appendChild(icon);
+                    item.appendChild(document.createTextNode(` ${post.time}`));
+                    list.appendChild(item);
+                });
+                cell.appendChild(list);
+            });
+        })
+        .catch(error => console.error('Failed to load scheduled posts:', error));
+}
+
 function renderCalendar(date, containerId) {
     const container = document.getElementById(containerId);
     const year = date.getFullYear();
@@ -71,7 +111,7 @@ function generateCalendarRows(year, month, daysInMonth, firstDay) {
     // Add all days of the month
     while (day <= daysInMonth) {
         const isToday = isCurrentMonth && day === today.getDate();
-        currentRow += `<td class="${isToday ? 'today' : ''}">${day}</td>`;
+        currentRow += `<td class="${isToday ? 'today' : ''}" data-date="${formatDate(year, month, day)}">${day}</td>`;
         cellsInRow++;
         
         // If we've reached 7 cells, close the row and start a new one
@@ -0,0 +1,46 @@
+const PROGRESS_LOG_SIZE = 50;
+const PROGRESS_EVENTS = ['run_started', 'run_finished', 'feed_fetched', 'article_extracted',
+                         'articles_stored', 'summary_written', 'failure'];
+
+document.addEventListener('DOMContentLoaded', function() {
+    const status = document.getElementById('progressStatus');
+    const source = new EventSource('/contentoire/events/progress');
+
+    source.onopen = () => { status.textContent = 'live'; };
+    source.onerror = () => { status.textContent = 'reconnecting...'; };
+
+    PROGRESS_EVENTS.forEach(type => {
+        source.addEventListener(type, message => showProgress(JSON.parse(message.data)));
+    });
+});
+
+function describeProgress(event) {
+    switch (event.type) {
+        case 'run_started': return `${event.source} started`;
+        case 'run_finished': return `${event.source} finished`;
+        case 'feed_fetched': return `${event.feed}: ${event.entries} entries`;
+        case 'article_extracted': return `Extracted ${event.url}`;
+        case 'articles_stored': return `${event.provider || event.feed}: ${event.count} new articles`;
+        case 'summary_written': return `Summarized news #${event.news_id}`;
+        case 'failure': return `${event.source} failed: ${event.error}`;
+        default: return event.type;
+    }
+}
+
+function showProgress(event) {
+    const counter = document.getElementById(`count-${event.type}`);
+    if (counter) {
+        counter.textContent = Number(counter.textContent) + (event.type === 'articles_stored' ? event.count : 1);
+    }
+
+    const item = document.createElement('li');
+    item.className = `progress-event progress-${event.type}`;
+    const time = new Date(event.time * 1000).toLocaleTimeString();
+    item.textContent = `${time} ${describeProgress(event)}`;
+
+    const log = document.getElementById('progressLog');
+    log.prepend(item);
+    while (log.children.length > PROGRESS_LOG_SIZE) {
+        log.lastChild.remove();
+    }
+}
@@ -0,0 +1,42 @@
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+# Add the project root to the Python path, as the workers do
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+from data.bootstrap import create_worker_app  # noqa: E402
+from data.db import db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Worker app on a scratch SQLite database, inside an app context."""
+    monkeypatch.setenv('CONTENTOIRE_DATABASE_URI', f"sqlite:///{tmp_path / 'contentoire.db'}")
+    app = create_worker_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def serve():
+    """Serve a ``BaseHTTPRequestHandler`` class on a free local port; returns the base URL."""
+    servers = []
+
+    def start(handler):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_address[1]}'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,141 @@
+import asyncio
+from typing import List
+
+import pytest
+from temporalio import activity
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+
+from pubsub.workflows.article_pipeline import ArticlePipelineInput, ArticlePipelineWorkflow
+
+TASK_QUEUE = 'test-article-pipeline'
+NEWS_ID = 7
+
+
+@activity.defn(name='extract_article')
+async def extract_article(news_id: int) -> bool:
+    return True
+
+
+@activity.defn(name='summarize_article')
+async def summarize_article(news_id: int) -> str:
+    return f'Title {news_id}'
+
+
+@activity.defn(name='generate_hashtags')
+async def generate_hashtags(news_id: int) -> List[str]:
+    return ['#news']
+
+
+@activity.defn(name='generate_article_image')
+async def generate_article_image(news_id: int) -> str:
+    return f'images/{news_id}.png'
+
+
+def mocked(**overrides):
+    """The pipeline's activities by name, with ``overrides`` replacing some of them."""
+    activities = {
+        'extract_article': extract_article,
+        'summarize_article': summarize_article,
+        'generate_hashtags': generate_hashtags,
+        'generate_article_image': generate_article_image,
+    }
+    activities.update(overrides)
+    return list(activities.values())
+
+
+async def run_pipeline(activities, generate_image=True):
+    try:
+        env = await WorkflowEnvironment.start_time_skipping()
+    except RuntimeError as e:
+        # The test server is downloaded on first use
+        pytest.skip(f'Temporal test server unavailable: {e}')
+    async with env:
+        async with Worker(env.client, task_queue=TASK_QUEUE, workflows=[ArticlePipelineWorkflow],
+                          activities=activities):
+            return await env.client.execute_workflow(
+                ArticlePipelineWorkflow.run, ArticlePipelineInput(NEWS_ID, generate_image=generate_image),
+                id=f'article-{NEWS_ID}', task_queue=TASK_QUEUE)
+
+
+def test_hashtags_and_image_start_after_the_summary_in_parallel():
+    async def scenario():
+        events = []
+        both_started = asyncio.Event()
+
+        @activity.defn(name='summarize_article')
+        async def summarize(news_id: int) -> str:
+            await asyncio.sleep(0.2)
+            events.append('summarized')
+            return 'Parallel title'
+
+        def waiting_for_the_other(name, value):
+            @activity.defn(name=name)
+            async def step(news_id: int):
+                events.append(name)
+                if len(events) == 3:
+                    both_started.set()
+                # Only returns if the two steps were started together
+                await asyncio.wait_for(both_started.wait(), 10)
+                return value
+            return step
+
+        result = await run_pipeline(mocked(
+            summarize_article=summarize,
+            generate_hashtags=waiting_for_the_other('generate_hashtags', ['#a', '#b']),
+            generate_article_image=waiting_for_the_other('generate_article_image', 'images/7.png'),
+        ))
+        return result, events
+
+    result, events = asyncio.run(scenario())
+    assert events[0] == 'summarized'
+    assert sorted(events[1:]) == ['generate_article_image', 'generate_hashtags']
+    assert result.extracted is True
+    assert result.summary_title == 'Parallel title'
+    assert result.hashtags == ['#a', '#b']
+    assert result.image_path == 'images/7.png'
+    assert result.failures == []
+
+
+def test_failed_activity_is_retried():
+    attempts = []
+
+    @activity.defn(name='extract_article')
+    async def flaky_extract(news_id: int) -> bool:
+        attempts.append(activity.info().attempt)
+        if len(attempts) < 3:
+            raise RuntimeError('page did not load')
+        return True
+
+    result = asyncio.run(run_pipeline(mocked(extract_article=flaky_extract)))
+    # The retry backoff (10 s, then 20 s) is skipped by the test server
+    assert attempts == [1, 2, 3]
+    assert result.extracted is True
+    assert result.failures == []
+
+
+def test_step_exhausting_its_retries_does_not_fail_the_others():
+    @activity.defn(name='extract_article')
+    async def broken_extract(news_id: int) -> bool:
+        raise RuntimeError('blocked by the site')
+
+    result = asyncio.run(run_pipeline(mocked(extract_article=broken_extract), generate_image=False))
+    assert result.extracted is False
+    assert result.summary_title == f'Title {NEWS_ID}'
+    assert len(result.failures) == 1
+    assert result.failures[0].startswith('extract_article:')
+
+
+def test_silent_activity_times_out():
+    @activity.defn(name='generate_article_image')
+    async def stuck_image(news_id: int) -> str:
+        # Never heartbeats, so every attempt hits HEARTBEAT_TIMEOUT
+        await asyncio.sleep(24 * 3600)
+        return 'never'
+
+    result = asyncio.run(run_pipeline(mocked(generate_article_image=stuck_image)))
+    assert result.image_path is None
+    assert result.summary_title == f'Title {NEWS_ID}'
+    assert result.hashtags == ['#news']
+    assert len(result.failures) == 1
+    assert result.failures[0].startswith('generate_article_image:')
@@ -0,0 +1,140 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from data.db import db
+from data.publishing import claim, published
+from models.news import News
+from models.provider import MediaProvider
+from models.schedule import ScheduledPost
+from workers.dispatcher import Dispatcher
+
+
+class RecordingPublisher:
+    """Records the posts handed over and marks them published; posts of ``held`` accounts wait for ``release``."""
+
+    def __init__(self, held=()):
+        self.held = set(held)
+        self.release = asyncio.Event()
+        self.sent = []
+
+    async def publish_post(self, post):
+        if post.account.id in self.held:
+            await self.release.wait()
+        self.sent.append(post.id)
+        published(post, f'external-{post.id}')
+        db.session.commit()
+        return 'published'
+
+
+@pytest.fixture
+def accounts(app):
+    providers = [MediaProvider(media_name=name, provider_name='facebook', client_id=name, client_secret='secret')
+                 for name in ('slow', 'fast')]
+    news = News(title='Rates held steady', summary='The central bank kept its rate at 4%.',
+                url='https://news.test/rates')
+    db.session.add_all([*providers, news])
+    db.session.commit()
+    return providers
+
+
+def schedule_post(account, minutes=-1):
+    news = News.query.first()
+    post = ScheduledPost(news_id=news.id, media=account, scheduled_at=datetime.now() + timedelta(minutes=minutes))
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+
+async def settle(dispatcher):
+    """Dispatch what is due and wait for it, as one turn of ``run`` does."""
+    dispatcher.dispatch(datetime.now())
+    await asyncio.gather(*dispatcher.tasks)
+
+
+def test_rescheduled_post_leaves_a_stale_entry_that_is_skipped(accounts):
+    kept, moved = schedule_post(accounts[0]), schedule_post(accounts[0])
+
+    async def scenario():
+        publisher = RecordingPublisher()
+        dispatcher = Dispatcher(publisher)
+        dispatcher.refresh()
+        moved.scheduled_at = datetime.now() + timedelta(minutes=30)
+        db.session.commit()
+        dispatcher.refresh()
+        assert len(dispatcher.heap) == 3
+        await settle(dispatcher)
+        return publisher, dispatcher
+
+    publisher, dispatcher = asyncio.run(scenario())
+    assert publisher.sent == [kept.id]
+    # Only the new entry of the moved post is left, the old one was dropped when popped
+    assert dispatcher.heap == [(dispatcher.due[moved.id], moved.id)]
+    db.session.refresh(moved)
+    assert moved.status == 'scheduled'
+
+
+def test_post_moved_to_now_is_published_after_a_refresh(accounts):
+    post = schedule_post(accounts[0], minutes=30)
+
+    async def scenario():
+        publisher = RecordingPublisher()
+        dispatcher = Dispatcher(publisher)
+        dispatcher.refresh()
+        await settle(dispatcher)
+        assert publisher.sent == []
+        post.scheduled_at = datetime.now() - timedelta(seconds=1)
+        db.session.commit()
+        dispatcher.refresh()
+        await settle(dispatcher)
+        return publisher
+
+    assert asyncio.run(scenario()).sent == [post.id]
+    db.session.refresh(post)
+    assert post.status == 'published'
+
+
+def test_restart_reloads_overdue_and_abandoned_posts(accounts):
+    overdue = schedule_post(accounts[0], minutes=-90)
+    abandoned = schedule_post(accounts[1], minutes=-5)
+    later = schedule_post(accounts[1], minutes=120)
+    # A publisher claimed the post and died, its lease has run out
+    assert [post.id for post in claim(post_ids=[abandoned.id], lease_seconds=0)] == [abandoned.id]
+
+    async def scenario():
+        publisher = RecordingPublisher()
+        dispatcher = Dispatcher(publisher)
+        dispatcher.refresh()
+        assert later.id not in dispatcher.due
+        await settle(dispatcher)
+        return publisher
+
+    assert sorted(asyncio.run(scenario()).sent) == sorted([overdue.id, abandoned.id])
+    db.session.refresh(abandoned)
+    assert (abandoned.status, abandoned.attempts) == ('published', 2)
+
+
+def test_slow_account_does_not_hold_up_the_others(accounts):
+    slow, fast = accounts
+    slow_posts = [schedule_post(slow) for _ in range(3)]
+    fast_post = schedule_post(fast)
+
+    async def scenario():
+        publisher = RecordingPublisher(held={slow.id})
+        dispatcher = Dispatcher(publisher, max_posts=2, per_account=1)
+        dispatcher.refresh()
+        dispatcher.dispatch(datetime.now())
+        await asyncio.sleep(0.1)
+        # One post of the slow account is out, the others wait unclaimed
+        sent_while_held = list(publisher.sent)
+        assert ScheduledPost.query.filter_by(status='publishing').count() == 1
+        publisher.release.set()
+        while dispatcher.tasks or dispatcher.heap:
+            await asyncio.sleep(0.01)
+            dispatcher.dispatch(datetime.now())
+        return sent_while_held, publisher.sent
+
+    sent_while_held, sent = asyncio.run(scenario())
+    assert sent_while_held == [fast_post.id]
+    assert sorted(sent) == sorted([fast_post.id] + [post.id for post in slow_posts])
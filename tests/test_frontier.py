@@ -0,0 +1,125 @@
+import json
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+
+from shared import frontier as frontier_module
+from shared.frontier import Frontier
+
+DELAY = 2
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """The frontier's clock, moved forward by hand."""
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(frontier_module, 'time', SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def frontier(clock):
+    return Frontier(client=fakeredis.FakeRedis(), domain_delay=DELAY, host_concurrency=1)
+
+
+def dead_letters(frontier):
+    return [json.loads(payload) for payload in frontier.client.lrange(frontier.dead, 0, -1)]
+
+
+def test_normalized_duplicates_are_queued_once(frontier):
+    assert frontier.add('https://News.test/a#comments', news_id=1)
+    assert not frontier.add('HTTPS://news.test/a')
+    assert frontier.add('https://news.test/b')
+    assert frontier.stats()['queued'] == 2
+
+
+def test_host_waits_its_delay_and_one_lease_at_a_time(frontier, clock):
+    for path in ('a', 'b'):
+        frontier.add(f'https://slow.test/{path}')
+    frontier.add('https://other.test/a')
+
+    first = frontier.lease()
+    second = frontier.lease()
+    assert {first.host, second.host} == {'slow.test', 'other.test'}
+    assert frontier.lease() is None
+
+    slow = first if first.host == 'slow.test' else second
+    frontier.ack(slow)
+    # Released, but its delay has not passed yet
+    assert frontier.lease() is None
+    clock.value += DELAY
+    assert frontier.lease().url == 'https://slow.test/b'
+
+
+def test_crawl_delay_replaces_the_default(frontier, clock):
+    frontier.set_delay('slow.test', 10)
+    for path in ('a', 'b'):
+        frontier.add(f'https://slow.test/{path}')
+    frontier.ack(frontier.lease())
+    clock.value += DELAY
+    assert frontier.lease() is None
+    clock.value += 10 - DELAY
+    assert frontier.lease().url == 'https://slow.test/b'
+
+
+def test_expired_lease_is_handed_out_again_as_a_failed_attempt(frontier, clock):
+    frontier.add('https://news.test/a', news_id=7)
+    item = frontier.lease(visibility_timeout=30)
+    assert item.attempts == 0
+
+    clock.value += 31
+    again = frontier.lease()
+    assert (again.url, again.news_id, again.attempts) == (item.url, 7, 1)
+    # The first worker's lease is gone, its late ack changes nothing
+    assert not frontier.ack(item)
+    assert frontier.ack(again)
+
+
+def test_url_whose_leases_keep_expiring_is_dead_lettered(frontier, clock):
+    frontier.add('https://news.test/crash', news_id=7)
+    for attempt in range(frontier_module.MAX_ATTEMPTS):
+        item = frontier.lease(visibility_timeout=30)
+        assert item.attempts == attempt
+        clock.value += 31
+    assert frontier.lease() is None
+    assert dead_letters(frontier) == [{'url': 'https://news.test/crash', 'news_id': 7,
+                                       'attempts': frontier_module.MAX_ATTEMPTS}]
+    assert frontier.stats()['queued'] == 0
+
+
+def test_failed_url_is_retried_then_dead_lettered(frontier, clock):
+    frontier.add('https://news.test/broken')
+    for attempt in range(1, frontier_module.MAX_ATTEMPTS):
+        assert frontier.retry(frontier.lease()) is False
+        clock.value += DELAY
+    assert frontier.retry(frontier.lease()) is True
+    assert [item['attempts'] for item in dead_letters(frontier)] == [frontier_module.MAX_ATTEMPTS]
+    assert frontier.lease() is None
+
+
+def test_throttled_host_is_held_back_with_a_growing_backoff(frontier, clock):
+    frontier.add('https://busy.test/a')
+    item = frontier.lease()
+    first = frontier.throttle(item)
+    assert first > DELAY
+    clock.value += first - 1
+    assert frontier.lease() is None
+    clock.value += 1
+    item = frontier.lease()
+    # Throttling is not a failed attempt
+    assert (item.url, item.attempts) == ('https://busy.test/a', 0)
+    assert frontier.throttle(item) == 2 * first
+
+    clock.value += 2 * first
+    frontier.ack(frontier.lease())
+    assert frontier.stats()['backoff'] == {'busy.test': first}
+
+
+def test_retry_after_sets_the_hold(frontier, clock):
+    frontier.add('https://busy.test/a')
+    assert frontier.throttle(frontier.lease(), retry_after=120) == 120
+    clock.value += 119
+    assert frontier.lease() is None
+    clock.value += 1
+    assert frontier.lease() is not None
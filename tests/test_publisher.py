@@ -0,0 +1,148 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.platform_stub import StubPlatforms, make_handler
+from data.db import db
+from data.publishing import claim
+from models.news import News
+from models.provider import MediaProvider
+from models.schedule import ScheduledPost
+from workers.publisher import Publisher
+
+
+@pytest.fixture
+def stub(serve):
+    platforms = StubPlatforms(fail_rate=0, lost_rate=0, per_minute=0, idempotency=False)
+    platforms.url = serve(make_handler(platforms))
+    return platforms
+
+
+def schedule_post(stub, platform, **params):
+    provider = MediaProvider(media_name=platform, provider_name=platform, client_id=f'{platform}-id',
+                             client_secret='secret',
+                             parameters=json.dumps({'api_url': f'{stub.url}/{platform}', 'posts_per_minute': 600,
+                                                    **params}))
+    news = News(title='Rates held steady', summary='The central bank kept its rate at 4%.',
+                url='https://news.test/rates')
+    db.session.add_all([provider, news])
+    db.session.flush()
+    post = ScheduledPost(news_id=news.id, media=provider, scheduled_at=datetime.now() - timedelta(minutes=1))
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+
+def publish_due():
+    async def run():
+        publisher = Publisher()
+        try:
+            return await publisher.publish(claim())
+        finally:
+            await publisher.close()
+
+    return asyncio.run(run())
+
+
+def make_due(post):
+    """Skip the retry backoff."""
+    post.available_at = datetime.now() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_retry_finds_the_post_of_a_lost_response(app, stub):
+    post = schedule_post(stub, 'facebook', page_id='page')
+    stub.lost_rate = 1  # stored by the platform, but the response never arrives
+    assert publish_due() == ['retry']
+    db.session.refresh(post)
+    assert (post.status, post.attempts) == ('scheduled', 1)
+
+    stub.lost_rate = 0
+    make_due(post)
+    assert publish_due() == ['published']
+    db.session.refresh(post)
+    stored = stub.posts['facebook']
+    assert len(stored) == 1
+    assert post.external_id == stored[0]['id']
+    assert stub.summary()['facebook']['duplicates'] == 0
+
+
+def test_retry_sends_the_same_idempotency_key(app, stub, monkeypatch):
+    # The account's listing does not show the earlier tweet yet, the key dedupes it
+    async def not_listed_yet(self, post):
+        return None
+
+    monkeypatch.setattr('shared.platforms.TwitterAdapter.find', not_listed_yet)
+    stub.idempotency = True
+    post = schedule_post(stub, 'twitter', user_id='42')
+    stub.lost_rate = 1
+    assert publish_due() == ['retry']
+
+    stub.lost_rate = 0
+    make_due(post)
+    assert publish_due() == ['published']
+    db.session.refresh(post)
+    stored = stub.posts['twitter']
+    assert len(stored) == 1
+    assert stored[0]['key'] == post.idempotency_key
+    assert post.external_id == stored[0]['id']
+
+
+def test_rate_limited_post_is_retried_after_retry_after(app, stub):
+    stub.per_minute = 1
+    first = schedule_post(stub, 'linkedin', author='urn:li:organization:1')
+    second = schedule_post(stub, 'linkedin', author='urn:li:organization:1')
+    assert sorted(publish_due()) == ['published', 'retry']
+    db.session.refresh(first)
+    db.session.refresh(second)
+    retried = first if first.status == 'scheduled' else second
+    assert retried.available_at > datetime.now() + timedelta(seconds=50)
+    assert 'HTTP 429' in retried.last_error
+
+
+def test_lease_outlasts_the_wait_for_the_rate_limit(app, stub):
+    # Two seconds between posts to the account, one second of lease
+    posts = [schedule_post(stub, 'facebook', page_id='page', posts_per_minute=30) for _ in range(2)]
+    for post in posts[1:]:
+        post.media = posts[0].media
+    db.session.commit()
+
+    async def run():
+        publisher = Publisher()
+        try:
+            sending = asyncio.create_task(publisher.publish(claim(lease_seconds=1)))
+            await asyncio.sleep(1.5)
+            stolen = claim()
+            return await sending, stolen
+        finally:
+            await publisher.close()
+
+    outcomes, stolen = asyncio.run(run())
+    assert outcomes == ['published', 'published']
+    assert stolen == []
+    assert len(stub.posts['facebook']) == 2
+
+
+@pytest.mark.parametrize('platform', ['tiktok', 'twitter'])
+def test_lost_response_without_lookup_is_not_retried(app, stub, monkeypatch, platform):
+    # TikTok cannot list pending posts, X only can with user_id
+    monkeypatch.setattr('data.publishing.image_url', lambda news_id: f'https://images.test/{news_id}.png')
+    post = schedule_post(stub, platform)
+    stub.lost_rate = 1
+    assert publish_due() == ['failed']
+    db.session.refresh(post)
+    assert post.status == 'failed'
+    assert 'may have been published' in post.last_error
+    assert len(stub.posts[platform]) == 1
+    assert claim() == []
+
+
+def test_refused_post_is_retried_on_a_platform_without_lookup(app, stub, monkeypatch):
+    # A 429 stored nothing and is still retried, only the lost answers are left to an editor
+    monkeypatch.setattr('data.publishing.image_url', lambda news_id: f'https://images.test/{news_id}.png')
+    stub.per_minute = 1
+    schedule_post(stub, 'tiktok')
+    schedule_post(stub, 'tiktok')
+    assert sorted(publish_due()) == ['published', 'retry']
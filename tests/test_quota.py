@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from data.db import db
+from data.quota import ProviderBudget, QuotaExceeded
+from models.provider import NewsProvider
+from models.quota import ProviderQuota
+
+DAILY_LIMIT = 100
+
+
+@pytest.fixture
+def provider(app):
+    provider = NewsProvider(provider_name='News API', endpoint='https://newsapi.test', description='News API',
+                            logo='newsapi.png', access_token_secret='key')
+    db.session.add(provider)
+    db.session.commit()
+    return provider
+
+
+def test_rate_limit_reset_does_not_reset_the_daily_quota(provider, monkeypatch):
+    budget = ProviderBudget(provider)
+    budget.quota.used = 10
+    db.session.commit()
+    headers = {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '60'}
+    budget.check(200, headers, {'status': 'ok', 'articles': []}, 'articles')
+
+    # The next run starts after the rate limit window, the same day
+    later = datetime.utcnow() + timedelta(minutes=2)
+    monkeypatch.setattr('data.quota.utcnow', lambda: later)
+    budget = ProviderBudget(provider)
+    assert budget.quota.used == 11
+    assert budget.quota.reset_at is None
+    assert budget.remaining == DAILY_LIMIT - 11
+
+
+def test_rate_limited_call_waits_for_the_window_only(provider):
+    budget = ProviderBudget(provider)
+    with pytest.raises(QuotaExceeded):
+        budget.check(429, {'RateLimit-Reset': '60'}, {'status': 'error', 'code': 'rateLimited', 'message': 'Slow down'})
+
+    quota = ProviderQuota.query.one()
+    assert quota.exhausted_until < datetime.utcnow() + timedelta(seconds=61)
+    assert quota.reported_remaining is None
+    assert ProviderBudget(provider).budget == 0
+
+    quota.exhausted_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert ProviderBudget(provider).remaining == DAILY_LIMIT - 1
+
+
+def test_daily_quota_exceeded_lasts_until_midnight(provider):
+    budget = ProviderBudget(provider)
+    with pytest.raises(QuotaExceeded):
+        budget.check(429, {}, {'status': 'error', 'code': 'rateLimited', 'message': 'Daily limit reached'})
+
+    quota = ProviderQuota.query.one()
+    assert quota.exhausted_until.date() == datetime.utcnow().date() + timedelta(days=1)
+    assert ProviderBudget(provider).remaining == 0
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from telegram import Bot
+
+from benchmarks.telegram_stub import StubApi, make_handler
+from data.db import db
+from models.approval import ApprovalRequest
+from models.news import News
+from models.provider import MediaProvider
+from models.schedule import ScheduledPost
+from workers.telegram_bot import ApprovalBot, RateLimiter
+
+CHAT_ID = 1
+
+
+@pytest.fixture
+def articles(app):
+    db.session.add(MediaProvider(media_name='Page', provider_name='facebook', client_id='id', client_secret='secret'))
+    news = [News(title=f'Article {i}', summary=f'Summary {i}', url=f'https://news.test/{i}', processed=datetime.now())
+            for i in range(3)]
+    db.session.add_all(news)
+    db.session.commit()
+    return news
+
+
+def start_stub(serve, chat_interval=0.0):
+    api = StubApi(chat_interval=chat_interval, global_rate=30, press=None, press_delay=0)
+    return api, serve(make_handler(api)) + '/bot'
+
+
+async def deliver_presses(service):
+    """Hand the presses queued in the stub to the bot, as its ``listen`` loop does."""
+    updates = await service.bot.get_updates(timeout=0, allowed_updates=['callback_query'])
+    for update in updates:
+        await service.handle(update.callback_query)
+    if updates:
+        await service.bot.get_updates(offset=updates[-1].update_id + 1, timeout=0)
+
+
+def test_callbacks_schedule_and_reject(app, articles, serve):
+    api, url = start_stub(serve)
+
+    async def scenario():
+        async with Bot(token='test', base_url=url) as bot:
+            service = ApprovalBot(bot, [CHAT_ID], limiter=RateLimiter(global_rate=100, chat_rate=100))
+            assert await service.push_batch() == 3
+            requests = {r.news_id: r for r in ApprovalRequest.query}
+            for news, action in zip(articles, ('now', 'hour', 'reject')):
+                request = requests[news.id]
+                assert api.press_button(CHAT_ID, request.message_id, f'{action}:{request.id}')
+            await deliver_presses(service)
+
+    before = datetime.now()
+    asyncio.run(scenario())
+
+    statuses = {r.news_id: r.status for r in ApprovalRequest.query}
+    assert [statuses[news.id] for news in articles] == ['scheduled', 'scheduled', 'rejected']
+    posts = {p.news_id: p for p in ScheduledPost.query}
+    assert set(posts) == {articles[0].id, articles[1].id}
+    assert posts[articles[0].id].scheduled_at < before + timedelta(minutes=1)
+    assert posts[articles[1].id].scheduled_at > before + timedelta(minutes=59)
+    assert api.stats['callbacks_answered'] == 3
+    assert api.stats['edits'] == 3
+
+
+def test_repeated_press_changes_nothing(app, articles, serve):
+    api, url = start_stub(serve)
+
+    async def scenario():
+        async with Bot(token='test', base_url=url) as bot:
+            service = ApprovalBot(bot, [CHAT_ID], limiter=RateLimiter(global_rate=100, chat_rate=100), batch_size=1)
+            await service.push_batch()
+            request = ApprovalRequest.query.one()
+            api.press_button(CHAT_ID, request.message_id, f'now:{request.id}')
+            api.press_button(CHAT_ID, request.message_id, f'now:{request.id}')
+            await deliver_presses(service)
+
+    asyncio.run(scenario())
+    assert ScheduledPost.query.count() == 1
+    assert api.stats['callbacks_answered'] == 2
+
+
+def test_flood_limit_retry_after_is_honoured(app, articles, serve):
+    # The stub allows one message a second per chat, the bot's own limits are lifted to hit it
+    api, url = start_stub(serve, chat_interval=1.0)
+
+    async def scenario():
+        async with Bot(token='test', base_url=url) as bot:
+            service = ApprovalBot(bot, [CHAT_ID], limiter=RateLimiter(global_rate=100, chat_rate=100), batch_size=2)
+            return await service.push_batch()
+
+    started = time.monotonic()
+    assert asyncio.run(scenario()) == 2
+    assert api.stats['flood_429'] >= 1
+    assert api.stats['sent'] == 2
+    assert time.monotonic() - started >= 0.8
+    assert ApprovalRequest.query.filter(ApprovalRequest.message_id.isnot(None)).count() == 2
+
+
+def test_first_answer_decides_for_every_chat(app, articles, serve):
+    api, url = start_stub(serve)
+    other_chat = -3
+
+    async def scenario():
+        async with Bot(token='test', base_url=url) as bot:
+            service = ApprovalBot(bot, [CHAT_ID, other_chat], limiter=RateLimiter(global_rate=100, chat_rate=100,
+                                                                                    group_rate=100), batch_size=1)
+            assert await service.push_batch() == 2
+            first, second = (ApprovalRequest.query.filter_by(chat_id=chat_id).one()
+                             for chat_id in (CHAT_ID, other_chat))
+            api.press_button(CHAT_ID, first.message_id, f'now:{first.id}')
+            api.press_button(other_chat, second.message_id, f'morning:{second.id}')
+            await deliver_presses(service)
+            # Each chat moves on to the next article
+            assert await service.push_batch() == 2
+            return second.id, second.message_id
+
+    second_id, second_message_id = asyncio.run(scenario())
+    assert ScheduledPost.query.filter_by(news_id=articles[0].id).count() == 1
+    second = db.session.get(ApprovalRequest, second_id)
+    assert (second.status, second.decided_by) == ('scheduled', 'editor')
+    markup = api.messages[other_chat, second_message_id]['reply_markup']
+    assert markup['inline_keyboard'][0][0]['callback_data'] == f'status:{second_id}'
+    assert {r.news_id for r in ApprovalRequest.query} == {news.id for news in articles[:2]}
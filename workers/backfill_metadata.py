@@ -0,0 +1,75 @@
+import os
+import sys
+
+# Add the parent directory (project root) to the Python path
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+from data.bootstrap import create_worker_app
+from data.db import db
+from models.news import News, parse_published_date, parse_legacy_options
+
+# Summaries of the summerized_news table, written by phi-2 before summaries were versioned
+LEGACY_SUMMARY_MODEL = 'microsoft/phi-2'
+LEGACY_PROMPT_VERSION = 0
+
+app = create_worker_app()
+
+with app.app_context():
+    # Only rows that still carry the legacy options string and have no structured metadata yet
+    query = (News.query
+             .filter(News.options.isnot(None), News.guid.is_(None), News.source.is_(None),
+                     News.sentiment.is_(None), ~News.categories.any(), ~News.tags.any())
+             .order_by(News.id))
+
+    updated = 0
+    last_id = 0
+    try:
+        while True:
+            batch = query.filter(News.id > last_id).limit(500).all()
+            if not batch:
+                break
+            for news in batch:
+                metadata = parse_legacy_options(news)
+                news.guid = metadata.pop('guid', None)
+                news.set_metadata(**metadata)
+                updated += 1
+            last_id = batch[-1].id
+            db.session.commit()
+
+        # Sort key for the keyset-paginated news listing
+        last_id = 0
+        while True:
+            batch = (News.query
+                     .filter(News.published_at.is_(None), News.id > last_id)
+                     .order_by(News.id)
+                     .limit(500)
+                     .all())
+            if not batch:
+                break
+            for news in batch:
+                news.published_at = parse_published_date(news.published_date) or news.add_date
+            last_id = batch[-1].id
+            db.session.commit()
+
+        # Summaries of the old summerized_news table, keyed by news ID; copied once. Dated
+        # with their article, so they never pass for newer than a versioned summary
+        copied = 0
+        if db.inspect(db.engine).has_table('summerized_news'):
+            copied = db.session.execute(db.text("""
+                INSERT INTO news_summaries (news_id, title, summary, model, prompt_version, created_at)
+                SELECT legacy.id, legacy.title, legacy.summary, :model, :prompt_version, news.add_date
+                FROM summerized_news AS legacy
+                JOIN news ON news.id = legacy.id
+                WHERE legacy.summary IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM news_summaries
+                                  WHERE news_summaries.news_id = legacy.id
+                                    AND news_summaries.model = :model
+                                    AND news_summaries.prompt_version = :prompt_version)
+            """), {'model': LEGACY_SUMMARY_MODEL, 'prompt_version': LEGACY_PROMPT_VERSION}).rowcount
+            db.session.commit()
+    except Exception as e:
+        print("Exception when backfilling metadata: %s\n" % e)
+        exit(1)
+
+    print(f"Backfilled metadata for {updated} articles, copied {copied} legacy summaries")
+    exit(0)
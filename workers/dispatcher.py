@@ -0,0 +1,206 @@
+import os
+import sys
+
+# Add the parent directory (project root) to the Python path
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+import asyncio
+import heapq
+import logging
+import signal
+from datetime import datetime, timedelta
+
+from data.bootstrap import create_worker_app
+from data.db import db
+from data.publishing import changed, claim, waiting
+from shared import metrics
+from workers.publisher import Publisher
+
+logger = logging.getLogger('dispatcher')
+
+# Posts scheduled this far ahead are held in memory, later ones are loaded as time passes
+WINDOW = timedelta(minutes=int(os.environ.get('DISPATCHER_WINDOW_MINUTES', 60)))
+# Delay before a post created or rescheduled elsewhere is seen
+REFRESH_SECONDS = int(os.environ.get('DISPATCHER_REFRESH_SECONDS', 15))
+MAX_POSTS = 40  # posts claimed at once; the others wait unclaimed so their leases do not run out
+# Posts of one account claimed at once, so an account waiting for its rate limit keeps the
+# other slots free. The others wait in the dispatcher until one of them is done.
+POSTS_PER_ACCOUNT = 2
+# Changes committed while a refresh ran can carry an earlier timestamp
+CHANGE_OVERLAP = timedelta(seconds=2)
+
+
+class Dispatcher:
+    """
+    Hands scheduled posts to the publisher when they are due.
+
+    The posts due within ``window`` are held in a heap ordered by due time, and the
+    dispatcher sleeps until the first one is due. Every ``refresh`` seconds it loads the
+    posts that entered the window and the posts changed since its last look (new,
+    rescheduled, published elsewhere or sent back for a retry). Both are indexed queries
+    on a handful of rows, however many posts are queued. A post whose due time changed
+    keeps its old heap entry, which is skipped when popped. Nothing is kept that the
+    database does not hold, so a restart reloads the window and carries on, including
+    the posts whose publisher died while holding them.
+
+    Each due post is claimed and published on its own, at most ``max_posts`` at once and
+    ``per_account`` per media provider account. A due post whose account is busy is set
+    aside until one of that account's posts is done, so a slow account never holds up the
+    posts of the others.
+    """
+
+    def __init__(self, publisher, window=WINDOW, refresh=REFRESH_SECONDS, max_posts=MAX_POSTS,
+                 per_account=POSTS_PER_ACCOUNT):
+        self.publisher = publisher
+        self.window = window
+        self.refresh_interval = timedelta(seconds=refresh)
+        self.slots = asyncio.Semaphore(max_posts)
+        self.per_account = per_account
+        self.heap = []
+        self.due = {}  # post ID -> due time of its live heap entry
+        self.accounts = {}  # post ID -> media provider ID
+        self.busy = {}  # media provider ID -> posts of the account being published
+        self.blocked = {}  # media provider ID -> heap entries set aside while the account is busy
+        self.inflight = set()
+        self.tasks = set()
+        self.loaded_until = None
+        self.changes_since = None
+        self.next_refresh = None
+        self.stopping = False
+        self.wake = asyncio.Event()
+
+    def schedule(self, post_id, due, account_id):
+        if due is None:
+            self.due.pop(post_id, None)
+            self.accounts.pop(post_id, None)
+            return
+        self.accounts[post_id] = account_id
+        if self.due.get(post_id) != due:
+            self.due[post_id] = due
+            heapq.heappush(self.heap, (due, post_id))
+
+    def refresh(self):
+        now = datetime.now()
+        horizon = now + self.window
+        # The first load also picks up the posts that fell due while nothing was running
+        rows = waiting(horizon, after=self.loaded_until)
+        if self.changes_since is not None:
+            rows += changed(self.changes_since - CHANGE_OVERLAP)
+        db.session.commit()
+        for post_id, due, account_id in rows:
+            if post_id not in self.inflight:
+                self.schedule(post_id, due, account_id)
+        self.loaded_until = horizon
+        self.changes_since = now
+        self.next_refresh = now + self.refresh_interval
+        # Stale entries pile up when posts are rescheduled often
+        if len(self.heap) > 2 * len(self.due) + 1000:
+            self.heap = [(due, post_id) for post_id, due in self.due.items()]
+            heapq.heapify(self.heap)
+
+    def pop_due(self, now):
+        due_ids = []
+        while self.heap and self.heap[0][0] <= now:
+            due, post_id = heapq.heappop(self.heap)
+            if self.due.get(post_id) != due:
+                continue
+            account_id = self.accounts.get(post_id)
+            if self.busy.get(account_id, 0) >= self.per_account:
+                # Still live: back in the heap once the account is free, skipped if changed meanwhile
+                self.blocked.setdefault(account_id, []).append((due, post_id))
+                continue
+            del self.due[post_id]
+            self.busy[account_id] = self.busy.get(account_id, 0) + 1
+            due_ids.append(post_id)
+        return due_ids
+
+    def release(self, post_id):
+        account_id = self.accounts.pop(post_id, None)
+        self.busy[account_id] -= 1
+        if not self.busy[account_id]:
+            del self.busy[account_id]
+        for entry in self.blocked.pop(account_id, []):
+            heapq.heappush(self.heap, entry)
+
+    async def publish(self, post_id):
+        started = datetime.now()
+        try:
+            async with self.slots:
+                if self.stopping:
+                    return
+                # Claimed only once a slot is free, and only if still due
+                for post in claim(post_ids=[post_id], due=True):
+                    await self.publisher.publish_post(post)
+        except Exception as e:
+            db.session.rollback()
+            logger.error('Error publishing post %s: %s', post_id, e)
+        finally:
+            self.inflight.discard(post_id)
+            self.release(post_id)
+            # Refreshes that ran meanwhile skipped this post, so look again from its start:
+            # a post sent back for a retry returns to the heap
+            if self.changes_since is not None:
+                self.changes_since = min(self.changes_since, started)
+            self.next_refresh = datetime.now()
+            self.wake.set()
+
+    def dispatch(self, now):
+        due_ids = self.pop_due(now)
+        self.inflight.update(due_ids)
+        for post_id in due_ids:
+            task = asyncio.create_task(self.publish(post_id))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        if due_ids:
+            logger.info('%d posts due, %d waiting in the next %s', len(due_ids), len(self.due), self.window)
+
+    def seconds_to_wake(self, now):
+        wake = self.next_refresh
+        if self.heap:
+            wake = min(wake, self.heap[0][0])
+        return max(0.0, (wake - now).total_seconds())
+
+    async def run(self):
+        while not self.stopping:
+            now = datetime.now()
+            if self.next_refresh is None or now >= self.next_refresh:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error('Error loading scheduled posts: %s', e)
+                    self.next_refresh = now + self.refresh_interval
+            self.dispatch(datetime.now())
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.seconds_to_wake(datetime.now()))
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+        # Posts being published are finished, the others keep waiting in the database
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def stop(self):
+        self.stopping = True
+        self.wake.set()
+
+
+async def main():
+    publisher = Publisher()
+    dispatcher = Dispatcher(publisher)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, dispatcher.stop)
+    logger.info('Dispatching posts due in the next %s', WINDOW)
+    try:
+        await dispatcher.run()
+    finally:
+        await publisher.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    app = create_worker_app()
+    metrics.init_worker('dispatcher')
+    with app.app_context():
+        asyncio.run(main())
@@ -0,0 +1,163 @@
+import json
+import shutil
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from shared import metrics
+from shared.politeness import THROTTLE_STATUSES, HostThrottled, parse_retry_after
+
+# Stored as the article text when its page could not be extracted
+CONTENT_NOT_LOADED = "[Content could not be loaded]"
+VIDEO_MARKERS = ['/video/', '/videos/', 'youtube.com', 'youtu.be', 'vimeo.com']
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+PAGE_TIMEOUT = 15
+MIN_CONTENT_LENGTH = 100
+
+# Common article selectors - add more as needed
+ARTICLE_SELECTORS = [
+    'article',
+    'main',
+    '[role="main"]',
+    '.article-content',
+    '.post-content',
+    '.entry-content',
+    '#content',
+    '#main-content',
+    'div[class*="content"]',
+    'div[class*="article"]'
+]
+UNWANTED_ELEMENTS = ['script', 'style', 'nav', 'footer', 'header', 'iframe']
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def is_video_url(url):
+    return any(video in url for video in VIDEO_MARKERS)
+
+
+def chrome_options(user_data_dir):
+    options = Options()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--disable-extensions')
+    options.add_argument('--disable-software-rasterizer')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    options.add_experimental_option('useAutomationExtension', False)
+    # Set a modern user agent
+    options.add_argument(f'user-agent={USER_AGENT}')
+    options.add_argument(f'--user-data-dir={user_data_dir}')
+    # Network events, to read the status code of the page
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+def document_response(driver):
+    """Status code and lowercased headers of the loaded page, from Chrome's performance log."""
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        # Redirects have no responseReceived event, so the first document is the page itself
+        if message.get('method') == 'Network.responseReceived' and message['params'].get('type') == 'Document':
+            response = message['params']['response']
+            return response.get('status'), {k.lower(): v for k, v in response.get('headers', {}).items()}
+    return None, {}
+
+
+def html_to_text(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup(UNWANTED_ELEMENTS):
+        element.decompose()
+    text = soup.get_text(separator='\n', strip=True)
+    return '\n'.join([line for line in text.split('\n') if line.strip()])
+
+
+def article_text(driver):
+    """The text of the largest article-like element, or of the whole page as a fallback."""
+    article_element = None
+    for selector in ARTICLE_SELECTORS:
+        try:
+            elements = driver.find_elements(By.CSS_SELECTOR, selector)
+            if elements:
+                # Find the largest element that might contain the article
+                article_element = max(elements, key=lambda e: len(e.text))
+                if len(article_element.text) > 500:  # Minimum content length
+                    break
+        except Exception:
+            continue
+
+    if article_element:
+        content = html_to_text(article_element.get_attribute('innerHTML'))
+        if len(content) >= MIN_CONTENT_LENGTH:
+            return content
+        print("  Content extraction warning: Article content too short, trying full page")
+    else:
+        print("  Content extraction warning: No article content found")
+    return html_to_text(driver.page_source)
+
+
+def extract_article(url, max_retries=1):
+    """
+    Load an article page in headless Chrome and return its main text.
+
+    Raises:
+        ExtractionError: When no attempt produced enough text.
+        HostThrottled: When the site answered 429 or 403, without further attempts.
+    """
+    for attempt in range(max_retries):
+        user_data_dir = tempfile.mkdtemp()
+        driver = None
+        page_start = None
+        try:
+            print(f"  Loading {url} (attempt {attempt + 1}/{max_retries})...")
+            driver = webdriver.Chrome(options=chrome_options(user_data_dir))
+            driver.set_page_load_timeout(PAGE_TIMEOUT)
+            driver.set_script_timeout(PAGE_TIMEOUT)
+
+            # Set additional CDP parameters
+            driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": USER_AGENT})
+            driver.execute_cdp_cmd('Network.enable', {})
+
+            page_start = time.perf_counter()
+            driver.get(url)
+            status, headers = document_response(driver)
+            if status in THROTTLE_STATUSES:
+                raise HostThrottled(status, parse_retry_after(headers.get('retry-after')))
+            # Wait for content to load
+            WebDriverWait(driver, PAGE_TIMEOUT).until(
+                lambda d: d.execute_script('return document.readyState') == 'complete'
+            )
+            metrics.SELENIUM_PAGE_SECONDS.labels('loaded').observe(time.perf_counter() - page_start)
+            page_start = None
+
+            content = article_text(driver)
+            if len(content) < MIN_CONTENT_LENGTH:
+                raise ExtractionError("Insufficient content extracted")
+            return content
+
+        except HostThrottled:
+            metrics.SELENIUM_PAGE_SECONDS.labels('throttled').observe(time.perf_counter() - page_start)
+            raise
+        except Exception as e:
+            if page_start is not None:
+                metrics.SELENIUM_PAGE_SECONDS.labels('failed').observe(time.perf_counter() - page_start)
+            error_msg = str(e).split('\n')[0]
+            print(f"  Attempt {attempt + 1} failed: {error_msg}")
+            if attempt == max_retries - 1:
+                raise ExtractionError(error_msg) from e
+        finally:
+            if driver:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+            shutil.rmtree(user_data_dir, ignore_errors=True)
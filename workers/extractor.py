@@ -0,0 +1,132 @@
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+# Add the parent directory (project root) to the Python path
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+from data.bootstrap import create_worker_app
+from data.db import db
+from data.jobs import enqueue_summary
+from models.news import News
+from shared import progress
+from shared.frontier import Frontier
+from shared.politeness import ROBOTS_TTL, HostThrottled, RobotsCache
+from workers.extraction import CONTENT_NOT_LOADED, ExtractionError, extract_article
+
+logger = logging.getLogger('extractor')
+
+IDLE_SECONDS = (0.5, 5)  # poll delay when no host is ready, doubling up to the maximum
+
+
+def store_text(news_id, text):
+    """Store the extracted text and queue the summary in one transaction."""
+    news = db.session.get(News, news_id)
+    if news is None:
+        return
+    news.news_text = text
+    enqueue_summary(news)
+    db.session.commit()
+
+
+class Robots:
+    """robots.txt of the leased hosts, shared through Redis, with crawl delays applied to the frontier."""
+
+    def __init__(self, frontier):
+        self.frontier = frontier
+        self.cache = RobotsCache(frontier.client)
+        self.delays_set = {}
+
+    def allowed(self, item):
+        if self.delays_set.get(item.host, 0) < time.time():
+            self.frontier.set_delay(item.host, self.cache.crawl_delay(item.url) or 0)
+            self.delays_set[item.host] = time.time() + ROBOTS_TTL
+        return self.cache.allowed(item.url)
+
+
+def extract(frontier, robots, item):
+    """Extract one leased URL. A URL that keeps failing is summarized from its feed text."""
+    if not robots.allowed(item):
+        logger.info('Disallowed by robots.txt: %s', item.url)
+        if item.news_id:
+            store_text(item.news_id, '')
+        frontier.ack(item)
+        return
+    try:
+        text = extract_article(item.url)
+    except HostThrottled as e:
+        backoff = frontier.throttle(item, e.retry_after)
+        logger.warning('%s is throttling us (%s), holding it back %.0fs', item.host, e, backoff)
+        return
+    except ExtractionError as e:
+        dead = frontier.retry(item)
+        logger.warning('Extraction of %s failed (attempt %d%s): %s', item.url, item.attempts,
+                       ', giving up' if dead else '', e)
+        progress.publish(progress.FAILURE, 'extractor', url=item.url, error=str(e))
+        if dead and item.news_id:
+            store_text(item.news_id, CONTENT_NOT_LOADED)
+        return
+    if item.news_id:
+        store_text(item.news_id, text)
+    if not frontier.ack(item):
+        logger.warning('Lease of %s expired before it was extracted', item.url)
+    progress.publish(progress.ARTICLE_EXTRACTED, 'extractor', url=item.url, news_id=item.news_id)
+
+
+def work():
+    """Extraction process: lease URLs from the frontier until SIGTERM."""
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent stops workers with SIGTERM
+
+    app = create_worker_app()
+    frontier = Frontier()
+    robots = Robots(frontier)
+    idle = IDLE_SECONDS[0]
+    with app.app_context():
+        while not stopping:
+            item = frontier.lease()
+            if item is None:
+                time.sleep(idle)
+                idle = min(idle * 2, IDLE_SECONDS[1])
+                continue
+            idle = IDLE_SECONDS[0]
+            try:
+                extract(frontier, robots, item)
+            except Exception as e:
+                db.session.rollback()
+                logger.error('Error extracting %s: %s', item.url, e)
+                try:
+                    # Counts as a failed attempt, so a URL that always breaks is dead-lettered
+                    if frontier.retry(item) and item.news_id:
+                        store_text(item.news_id, CONTENT_NOT_LOADED)
+                except Exception as e:
+                    # The lease expires and the next lease call puts the URL back as a failed attempt
+                    logger.error('Error putting back %s: %s', item.url, e)
+
+
+def main(count):
+    processes = []
+    for i in range(count):
+        process = multiprocessing.Process(target=work, name=f'extractor-{i + 1}')
+        process.start()
+        processes.append(process)
+        logger.info('Started %s (pid %s)', process.name, process.pid)
+
+    def stop(signum, frame):
+        for process in processes:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(processName)s: %(message)s')
+    # Each process drives its own headless browser
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else int(os.environ.get('EXTRACTOR_PROCESSES', 2)))
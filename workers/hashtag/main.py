@@ -0,0 +1,93 @@
+import os
+import re
+import sys
+from collections import Counter
+
+# Add the parent directory (project root) to the Python path
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from data.bootstrap import create_worker_app
+from data.db import db
+from models.news import News, NewsTag
+
+HASHTAG_LIMIT = 5
+SPACY_MODEL = os.environ.get('SPACY_MODEL', 'en_core_web_sm')
+STOPWORDS = set("""
+a about after all also an and are as at be been but by can could for from has have how in into is it
+its more new not of on or over says than that the their this to up was were what when which who will
+with would you your
+""".split())
+
+nlp = None
+
+
+def load_nlp():
+    """spaCy for named entities when its model is installed, plain word counts otherwise."""
+    global nlp
+    if nlp is None:
+        try:
+            import spacy
+
+            nlp = spacy.load(SPACY_MODEL, disable=['parser', 'lemmatizer'])
+        except (ImportError, OSError):
+            nlp = False
+    return nlp
+
+
+def to_hashtag(phrase):
+    words = re.findall(r'[A-Za-z0-9]+', phrase)
+    if not words:
+        return None
+    return '#' + ''.join(word if word.isupper() else word.capitalize() for word in words)
+
+
+def generate_hashtags(title, text, limit=HASHTAG_LIMIT):
+    """
+    Pick hashtags for an article from its named entities, or its most frequent words.
+
+    Returns:
+        list: Up to ``limit`` hashtags such as '#ClimateChange', most relevant first.
+    """
+    content = f"{title or ''}\n{(text or '')[:5000]}"
+    candidates = Counter()
+    pipeline = load_nlp()
+    if pipeline:
+        for entity in pipeline(content).ents:
+            if entity.label_ in ('PERSON', 'ORG', 'GPE', 'LOC', 'EVENT', 'PRODUCT', 'NORP', 'WORK_OF_ART'):
+                # Entities of the title weigh more
+                candidates[entity.text] += 3 if entity.start_char < len(title or '') else 1
+    if not candidates:
+        for word in re.findall(r"[A-Za-z][A-Za-z0-9'-]{2,}", content):
+            if word.lower() not in STOPWORDS:
+                candidates[word.lower()] += 1
+
+    hashtags = []
+    for phrase, _ in candidates.most_common():
+        hashtag = to_hashtag(phrase)
+        if hashtag and hashtag.lower() not in (h.lower() for h in hashtags):
+            hashtags.append(hashtag)
+        if len(hashtags) == limit:
+            break
+    return hashtags
+
+
+def store_hashtags(news_id):
+    """Generate hashtags for a news item and store them as '#' tags. The caller commits."""
+    news = db.session.get(News, news_id)
+    if news is None:
+        return []
+    latest = news.latest_summary
+    hashtags = generate_hashtags(latest.title if latest else news.title, news.news_text or news.summary)
+    existing = {tag.tag for tag in news.tags}
+    for hashtag in hashtags:
+        if hashtag not in existing:
+            news.tags.append(NewsTag(tag=hashtag))
+    return hashtags
+
+
+if __name__ == "__main__":
+    app = create_worker_app()
+    with app.app_context():
+        for news_id in [int(arg) for arg in sys.argv[1:]]:
+            print(f"{news_id}: {' '.join(store_hashtags(news_id))}")
+        db.session.commit()
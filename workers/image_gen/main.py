@@ -0,0 +1,78 @@
+import base64
+import io
+import os
+import sys
+
+# Add the parent directory (project root) to the Python path
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from data.bootstrap import create_worker_app
+from data.db import basedir, db
+from models.news import News
+from shared.types.image_generation import ImageGenerationResponse
+
+IMAGE_MODEL = os.environ.get('IMAGE_MODEL', 'stabilityai/sd-turbo')
+IMAGE_DIR = os.environ.get('NEWS_IMAGE_DIR', os.path.join(basedir, 'data', 'images'))
+INFERENCE_STEPS = int(os.environ.get('IMAGE_INFERENCE_STEPS', 4))
+
+pipe = None
+
+
+def load_model():
+    """Load the diffusion pipeline on first use, on the GPU when there is one."""
+    global pipe
+    if pipe is None:
+        import torch
+        from diffusers import AutoPipelineForText2Image
+
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        dtype = torch.float16 if device == 'cuda' else torch.float32
+        pipe = AutoPipelineForText2Image.from_pretrained(IMAGE_MODEL, torch_dtype=dtype).to(device)
+    return pipe
+
+
+def generate_image(prompt, width=512, height=512, style=None):
+    """
+    Generate an image for a prompt.
+
+    Returns:
+        ImageGenerationResponse: The PNG image, base64 encoded.
+    """
+    full_prompt = f"{prompt}, {style}" if style else prompt
+    image = load_model()(full_prompt, width=width, height=height, num_inference_steps=INFERENCE_STEPS,
+                         guidance_scale=0.0).images[0]
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return ImageGenerationResponse(image_data=base64.b64encode(buffer.getvalue()).decode('ascii'),
+                                   width=width, height=height, prompt=full_prompt)
+
+
+def article_prompt(news):
+    latest = news.latest_summary
+    subject = latest.title if latest else news.title
+    return f"Editorial illustration for a news article: {subject}"
+
+
+def store_article_image(news_id, width=512, height=512, style=None):
+    """
+    Generate the illustration of a news item and save it as ``NEWS_IMAGE_DIR/<news_id>.png``.
+
+    Returns:
+        str: The image path, or None when the news item no longer exists.
+    """
+    news = db.session.get(News, news_id)
+    if news is None:
+        return None
+    response = generate_image(article_prompt(news), width, height, style)
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+    path = os.path.join(IMAGE_DIR, f'{news_id}.png')
+    with open(path, 'wb') as f:
+        f.write(base64.b64decode(response.image_data))
+    return path
+
+
+if __name__ == "__main__":
+    app = create_worker_app()
+    with app.app_context():
+        for news_id in [int(arg) for arg in sys.argv[1:]]:
+            print(f"{news_id}: {store_article_image(news_id)}")
@@ -0,0 +1,219 @@
+import logging
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the parent directory (project root) to the Python path
+ROOT = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+sys.path.append(ROOT)
+
+from data.bootstrap import create_worker_app
+from data.db import db
+from models.ingestion import IngestionSchedule, sync_schedules
+from models.provider import FeedProvider, NewsProvider
+
+logger = logging.getLogger('ingestion')
+
+# NewsProvider.provider_name -> worker script fetching it
+PROVIDER_SCRIPTS = {
+    'News API': 'workers/providers/newsapi.py',
+    'Currents API': 'workers/providers/currentsapi.py',
+    'NewsData.io': 'workers/providers/newsdata.py',
+    'World News API': 'workers/providers/worldnews.py',
+}
+RSS_SCRIPT = 'workers/rssfeeds.py'
+
+MAX_CONCURRENCY = int(os.environ.get('INGESTION_MAX_CONCURRENCY', 3))
+# Runs allowed at once per source kind; every feed run drives its own headless browser
+KIND_CONCURRENCY = {
+    'news': int(os.environ.get('INGESTION_NEWS_CONCURRENCY', 2)),
+    'rss': int(os.environ.get('INGESTION_RSS_CONCURRENCY', 1)),
+}
+RUN_TIMEOUT = int(os.environ.get('INGESTION_RUN_TIMEOUT', 3600))
+# Schedules are re-read at least this often so interval changes apply without a restart
+POLL_SECONDS = int(os.environ.get('INGESTION_POLL_SECONDS', 30))
+# How often running processes are checked for completion
+REAP_SECONDS = 2
+
+
+def worker_command(kind, source_id):
+    """The worker command line fetching a source, or None when the source cannot run."""
+    if kind == 'rss':
+        feed = db.session.get(FeedProvider, source_id)
+        if feed and feed.enabled:
+            return [sys.executable, RSS_SCRIPT, str(feed.id)]
+        return None
+    provider = db.session.get(NewsProvider, source_id)
+    if not provider or not provider.enabled:
+        return None
+    script = PROVIDER_SCRIPTS.get(provider.provider_name)
+    if script is None:
+        logger.warning('No worker for news provider %s', provider.provider_name)
+        return None
+    return [sys.executable, script]
+
+
+def handle_ingest(task):
+    """Job handler of the ingest stage, see workers/pipeline.py."""
+    command = worker_command(task.kind, task.source_id)
+    if command is not None:
+        subprocess.run(command, cwd=ROOT, timeout=RUN_TIMEOUT, check=True)
+    return []
+
+
+class ExternalRun:
+    """
+    A run started by a previous scheduler process that is still alive.
+
+    It is not a child of this process, so its exit code cannot be read: ``poll`` returns
+    -1 once it is gone, and the run is recorded as finished with an unknown outcome.
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+
+    def poll(self):
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return -1
+        except PermissionError:
+            pass
+        return None
+
+    def kill(self):
+        os.kill(self.pid, signal.SIGKILL)
+
+    def wait(self, timeout=None):
+        pass
+
+
+class IngestionScheduler:
+    """
+    Run the ingestion workers as subprocesses, each source on its own interval.
+
+    Due times, intervals and last-run state live in ``IngestionSchedule`` rows, so they
+    survive restarts and can be edited from the admin API. A source whose previous run is
+    still going when it is due again skips that slot instead of running twice.
+    """
+
+    def __init__(self):
+        self.running = {}  # schedule id -> (process, monotonic start, kind)
+        self.stopping = False
+
+    def next_run(self, now, schedule):
+        return now + schedule.interval + timedelta(seconds=random.uniform(0, schedule.jitter_seconds or 0))
+
+    def running_count(self, kind):
+        return sum(1 for _, _, running_kind in self.running.values() if running_kind == kind)
+
+    def recover(self):
+        """Adopt runs left by a previous scheduler process and mark dead ones as interrupted."""
+        for schedule in IngestionSchedule.query.filter_by(status='running'):
+            run = ExternalRun(schedule.pid) if schedule.pid else None
+            if run is not None and run.poll() is None:
+                logger.info('Adopting running %s source %s (pid %s)', schedule.kind, schedule.source_id, schedule.pid)
+                self.running[schedule.id] = (run, time.monotonic(), schedule.kind)
+            else:
+                schedule.status = 'interrupted'
+                schedule.pid = None
+        db.session.commit()
+
+    def reap(self):
+        for schedule_id, (process, started, _) in list(self.running.items()):
+            exit_code = process.poll()
+            if exit_code is None:
+                if time.monotonic() - started < RUN_TIMEOUT:
+                    continue
+                process.kill()
+                process.wait()
+                status = 'timed_out'
+            elif isinstance(process, ExternalRun):
+                status, exit_code = 'finished', None
+            else:
+                status = 'succeeded' if exit_code == 0 else 'failed'
+
+            del self.running[schedule_id]
+            schedule = db.session.get(IngestionSchedule, schedule_id)
+            schedule.status = status
+            schedule.pid = None
+            schedule.last_exit_code = exit_code
+            schedule.last_finished_at = datetime.now()
+            logger.info('%s source %s %s', schedule.kind, schedule.source_id, status)
+        db.session.commit()
+
+    def launch_due(self):
+        now = datetime.now()
+        sync_schedules()
+        due = (IngestionSchedule.query
+               .filter(IngestionSchedule.enabled.is_(True), IngestionSchedule.next_run_at <= now)
+               .order_by(IngestionSchedule.next_run_at)
+               .all())
+        for schedule in due:
+            if schedule.id in self.running:
+                # The previous run is still fetching: skip this slot rather than overlap
+                schedule.skipped_runs += 1
+                schedule.next_run_at = self.next_run(now, schedule)
+                logger.info('Skipping %s source %s, previous run still going', schedule.kind, schedule.source_id)
+                continue
+            if len(self.running) >= MAX_CONCURRENCY or self.running_count(schedule.kind) >= KIND_CONCURRENCY[schedule.kind]:
+                continue  # stays due and starts once a slot frees up
+
+            command = worker_command(schedule.kind, schedule.source_id)
+            if command is None:
+                schedule.next_run_at = self.next_run(now, schedule)
+                continue
+            process = subprocess.Popen(command, cwd=ROOT)
+            self.running[schedule.id] = (process, time.monotonic(), schedule.kind)
+            schedule.status = 'running'
+            schedule.pid = process.pid
+            schedule.last_started_at = now
+            schedule.next_run_at = self.next_run(now, schedule)
+            logger.info('Started %s source %s (pid %s)', schedule.kind, schedule.source_id, process.pid)
+        db.session.commit()
+
+    def sleep_seconds(self):
+        next_run_at = (db.session.query(db.func.min(IngestionSchedule.next_run_at))
+                       .filter(IngestionSchedule.enabled.is_(True))
+                       .scalar())
+        seconds = POLL_SECONDS
+        if next_run_at is not None:
+            seconds = min(seconds, (next_run_at - datetime.now()).total_seconds())
+        if self.running:
+            seconds = min(seconds, REAP_SECONDS)
+        return max(seconds, 1)
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+
+    def run_forever(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.recover()
+        while not self.stopping:
+            self.reap()
+            self.launch_due()
+            time.sleep(self.sleep_seconds())
+
+        logger.info('Stopping, waiting for %d running workers', len(self.running))
+        for process, _, _ in self.running.values():
+            if isinstance(process, subprocess.Popen):
+                process.terminate()
+        for process, _, _ in self.running.values():
+            if isinstance(process, subprocess.Popen):
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        self.reap()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    app = create_worker_app()
+    with app.app_context():
+        IngestionScheduler().run_forever()
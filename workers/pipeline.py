@@ -0,0 +1,129 @@
+import importlib
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+# Add the parent directory (project root) to the Python path
+ROOT = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+sys.path.append(ROOT)
+
+from data import jobs
+from data.bootstrap import create_worker_app
+from data.db import db
+from shared.job_types import STAGES
+
+logger = logging.getLogger('pipeline')
+
+# Stage -> "module:function" handling one task and returning the follow-up tasks to queue
+HANDLERS = {
+    'ingest': 'workers.ingestion:handle_ingest',
+    'summarize': 'workers.summarizer.main:handle_summarize',
+}
+# Seconds a claimed job stays invisible to other consumers, renewed before each job
+VISIBILITY_TIMEOUTS = {
+    'ingest': 3600,
+    'extract': 300,
+    'summarize': 900,
+    'hashtag': 300,
+    'image': 900,
+    'publish': 300,
+}
+BATCH_SIZE = int(os.environ.get('PIPELINE_BATCH_SIZE', 10))
+IDLE_SECONDS = (1, 10)  # poll delay when the stage is empty, doubling up to the maximum
+
+
+def load_handler(stage):
+    module, function = HANDLERS[stage].split(':')
+    return getattr(importlib.import_module(module), function)
+
+
+def process(job, handler, visibility_timeout):
+    """Run one claimed job, then queue its follow-ups and acknowledge it in one transaction."""
+    held = jobs.extend(job, visibility_timeout)
+    db.session.commit()
+    if not held:
+        # Claimed by another consumer while the earlier jobs of the batch ran
+        logger.warning('Lease of %s job %s expired before it started, skipped', job.stage, job.id)
+        return
+    try:
+        follow_ups = handler(job.task) or []
+        for task in follow_ups:
+            jobs.enqueue(task, priority=job.priority)
+        if not jobs.ack(job):
+            # The lease expired and the job was handed to another consumer: keep its result
+            logger.warning('Lease of %s job %s expired before it finished', job.stage, job.id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        dead = jobs.fail(job, e)
+        db.session.commit()
+        logger.error('%s job %s failed (attempt %d/%d%s): %s', job.stage, job.id, job.attempts,
+                     job.max_attempts, ', dead-lettered' if dead else '', e)
+
+
+def consume(stage):
+    """Consumer process: claim jobs of ``stage`` in batches until SIGTERM."""
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent stops consumers with SIGTERM
+
+    app = create_worker_app()
+    handler = load_handler(stage)
+    visibility_timeout = VISIBILITY_TIMEOUTS[stage]
+    idle = IDLE_SECONDS[0]
+    with app.app_context():
+        while not stopping:
+            batch = jobs.dequeue(stage, limit=BATCH_SIZE, visibility_timeout=visibility_timeout)
+            if not batch:
+                time.sleep(idle)
+                idle = min(idle * 2, IDLE_SECONDS[1])
+                continue
+            idle = IDLE_SECONDS[0]
+            for job in batch:
+                if stopping:
+                    # Unprocessed jobs become visible again once their lease expires
+                    break
+                process(job, handler, visibility_timeout)
+
+
+def parse_consumers(specs):
+    """Parse ``stage=count`` items, e.g. ``['ingest=2', 'summarize=1']``."""
+    consumers = {}
+    for spec in specs:
+        stage, _, count = spec.partition('=')
+        if stage not in STAGES:
+            raise SystemExit(f"Unknown stage {stage}, expected one of {', '.join(STAGES)}")
+        if stage not in HANDLERS:
+            raise SystemExit(f"Stage {stage} has no job handler yet")
+        consumers[stage] = int(count or 1)
+    return consumers
+
+
+def main(consumers):
+    processes = []
+    for stage, count in consumers.items():
+        for i in range(count):
+            process = multiprocessing.Process(target=consume, args=(stage,), name=f'{stage}-{i + 1}')
+            process.start()
+            processes.append(process)
+            logger.info('Started %s consumer %s (pid %s)', stage, process.name, process.pid)
+
+    def stop(signum, frame):
+        for process in processes:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(processName)s: %(message)s')
+    # Consumer counts per stage from the command line or PIPELINE_CONSUMERS, e.g. "summarize=2".
+    # Only summarize jobs are queued by the ingestion workers, ingest jobs only when enqueued by hand
+    specs = sys.argv[1:] or os.environ.get('PIPELINE_CONSUMERS', 'summarize=1').split(',')
+    main(parse_consumers(specs))
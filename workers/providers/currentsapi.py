@@ -7,12 +7,17 @@ sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(
 from datetime import datetime, timedelta
 
 import requests
+from data.bootstrap import create_worker_app
 from data.db import db
+from data.jobs import enqueue_summary
+from data.quota import ProviderBudget, ProviderError, QuotaExceeded, known_urls
 from models.news import News
 from models.provider import NewsProvider
-from wsgi import create_app
+from shared import metrics, progress
+from shared.query_planner import QueryPlan
 
-app = create_app()
+app = create_worker_app()
+metrics.init_worker('currentsapi')
 
 with app.app_context():
     newsapi_provider = NewsProvider.query.filter_by(provider_name='Currents API').first()
@@ -20,8 +25,19 @@ with app.app_context():
         print("Currents API provider not available")
         exit(1)
 
+    # Currents API has no OR queries: one query per keyword, most productive first
+    budget = ProviderBudget(newsapi_provider)
+    plans = budget.order([QueryPlan(keyword.keyword, [keyword]) for keyword in newsapi_provider.keywords])
+    print(f"Quota: {budget.remaining} requests left, {budget.budget} for this run")
+    progress.publish(progress.RUN_STARTED, 'currentsapi', keywords=len(newsapi_provider.keywords),
+                     budget=budget.budget)
+
     try:
-        for keyword in newsapi_provider.keywords:
+        for plan in plans:
+            keyword = plan.keywords[0]
+            if not budget.allow():
+                print("Request budget of this run used, the remaining keywords wait for the next run")
+                break
             print(f"Searching for keyword: {keyword.keyword}")
 
             # Get the request parameters
@@ -38,24 +54,40 @@ with app.app_context():
                 params['country'] = keyword.region
 
             # Make the API call
-            response = requests.get(f"{newsapi_provider.endpoint}", params=params)
-            print(params)
-            print(newsapi_provider.endpoint)
-            print(response)
+            with metrics.provider_request(newsapi_provider.provider_name):
+                response = requests.get(f"{newsapi_provider.endpoint}", params=params)
+            metrics.record_response(newsapi_provider.provider_name, response)
+            print(f"  HTTP {response.status_code}")
+
+            try:
+                result = budget.check_response(response, 'news')
+            except QuotaExceeded:
+                raise
+            except ProviderError as e:
+                print(f"  Currents API error: {e}")
+                progress.publish(progress.FAILURE, 'currentsapi', provider=newsapi_provider.provider_name, error=str(e))
+                continue
 
-            # pprint(response.json())
+            # pprint(result)
             # Print response details
             print("\nResponse Details:")
-            print(f"  Retrieved {len(response.json()['news'])} articles")
+            print(f"  Retrieved {len(result['news'])} articles")
+
+            # Already stored articles cost a call but bring nothing new
+            seen = known_urls(news['url'] for news in result['news'])
+            stored = 0
             
             # Print news articles
             # print("\nNews Articles:")
-            for news in response.json()['news']:
+            for news in result['news']:
                 # print(f"  Title: {news['title']}")
                 # print(f"  Authors: {news['author']}")
                 # print(f"  URL: {news['url']}")
                 # print(f"  Published Date: {news['published']}")
                 # print(f"  Summary: {news['description']}")
+                if news['url'] in seen:
+                    continue
+                seen.add(news['url'])
 
                 new_news = News(
                     title=news['title'],
@@ -65,16 +97,30 @@ with app.app_context():
                     summary=news['description'] if news['description'] else '',
                     authors=news['author'] if news['author'] else None,
                     news_text=news['description'] if news['description'] else '',
-                    options=f"category:{', '.join(news['category'])}" if news['category'] else None,
                     provider_id=newsapi_provider.id,
                     keyword_id=keyword.id
                 )
+                new_news.set_metadata(categories=news['category'])
                 db.session.add(new_news)
+                enqueue_summary(new_news)
                 db.session.commit()
+                stored += 1
+
+            budget.record_yield(plan, 1, {keyword.id: stored})
+            metrics.ARTICLES_INGESTED.labels(newsapi_provider.provider_name).inc(stored)
+            progress.publish(progress.ARTICLES_STORED, 'currentsapi', provider=newsapi_provider.provider_name,
+                             keyword=keyword.keyword, count=stored)
+
+    except QuotaExceeded as e:
+        # Not a failure of the worker: the next runs resume after the reset
+        progress.publish(progress.FAILURE, 'currentsapi', provider=newsapi_provider.provider_name, error=str(e))
+        print(f"Currents API quota exhausted until {budget.quota.exhausted_until} UTC: {e}")
 
     except Exception as e:
+        progress.publish(progress.FAILURE, 'currentsapi', provider=newsapi_provider.provider_name, error=str(e))
         print("Exception when calling News API: %s\n" % e)
         exit(1)
 
+    progress.publish(progress.RUN_FINISHED, 'currentsapi')
     print("News list retrieved successfully")
     exit(0)
@@ -7,12 +7,19 @@ sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(
 from datetime import datetime, timedelta
 
 import requests
+from data.bootstrap import create_worker_app
 from data.db import db
+from data.jobs import enqueue_summary
+from data.quota import ProviderBudget, ProviderError, QuotaExceeded, known_urls
 from models.news import News
 from models.provider import NewsProvider
-from wsgi import create_app
+from shared import metrics, progress
+from shared.query_planner import QUERY_LENGTHS, KeywordMatcher, attribute, plan_queries
 
-app = create_app()
+MAX_PAGE_SIZE = 100
+
+app = create_worker_app()
+metrics.init_worker('newsapi')
 
 with app.app_context():
     newsapi_provider = NewsProvider.query.filter_by(provider_name='News API').first()
@@ -20,39 +27,81 @@ with app.app_context():
         print("News API provider not available")
         exit(1)
 
+    # Keywords sharing a language go out as one OR query, and the returned articles are
+    # attributed back to the keywords they mention. The queries that brought the most new
+    # articles go first, as far as the quota allows.
+    budget = ProviderBudget(newsapi_provider)
+    plans = budget.order(plan_queries(newsapi_provider.keywords, QUERY_LENGTHS['newsapi'], filters=('language',)))
+    matcher = KeywordMatcher(newsapi_provider.keywords)
+    print(f"Quota: {budget.remaining} requests left, {budget.budget} for this run")
+    progress.publish(progress.RUN_STARTED, 'newsapi', keywords=len(newsapi_provider.keywords), queries=len(plans),
+                     budget=budget.budget)
+
     try:
-        for keyword in newsapi_provider.keywords:
-            print(f"Searching for keyword: {keyword.keyword}")
+        for plan in plans:
+            if not budget.allow():
+                print("Request budget of this run used, the remaining keywords wait for the next run")
+                break
+            print(f"Searching for keywords: {', '.join(keyword.keyword for keyword in plan.keywords)}")
 
             # Get the request parameters
             params = {}
-            params['q'] = keyword.keyword
-            params['pageSize'] = 20
+            params['q'] = plan.query
+            params['pageSize'] = min(plan.target, MAX_PAGE_SIZE)
             params['from'] = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
             params['sortBy'] = 'publishedAt'
             params['apiKey'] = newsapi_provider.access_token_secret
-            params['language'] = keyword.language if keyword.language else 'en'
-
-            # Make the API call
-            response = requests.get(f"{newsapi_provider.endpoint}", params=params)
-            print(params)
-            print(newsapi_provider.endpoint)
-            print(response)
-
-            # Print response details
-            print("\nResponse Details:")
-            print(f"  Retrieved {len(response.json()['articles'])} articles")
-            print(f"  Total available: {response.json()['totalResults']}")
+            params['language'] = plan.filters['language'] if plan.filters['language'] else 'en'
+
+            articles = []
+            calls = budget.calls
+            params['page'] = 1
+            while True:
+                # Make the API call
+                with metrics.provider_request(newsapi_provider.provider_name):
+                    response = requests.get(f"{newsapi_provider.endpoint}", params=params)
+                metrics.record_response(newsapi_provider.provider_name, response)
+                print(f"  Page {params['page']}: HTTP {response.status_code}")
+
+                try:
+                    result = budget.check_response(response, 'articles')
+                except QuotaExceeded:
+                    raise
+                except ProviderError as e:
+                    # e.g. a page past the plan's result limit: keep what was fetched
+                    print(f"  News API error: {e}")
+                    progress.publish(progress.FAILURE, 'newsapi', provider=newsapi_provider.provider_name, error=str(e))
+                    break
+
+                # Print response details
+                print("\nResponse Details:")
+                print(f"  Retrieved {len(result['articles'])} articles")
+                print(f"  Total available: {result.get('totalResults')}")
+                articles += result['articles']
+                # Further pages only while the keywords have not all had their share
+                if (len(articles) >= plan.target or len(result['articles']) < params['pageSize']
+                        or len(articles) >= result.get('totalResults', 0) or not budget.allow()):
+                    break
+                params['page'] += 1
+
+            # Already stored articles cost a call but bring nothing new
+            seen = known_urls(news['url'] for news in articles)
+            new_by_keyword = {}
+            stored = 0
             
             # Print news articles
             # print("\nNews Articles:")
-            for news in response.json()['articles']:
+            for news in articles:
                 # print(f"  Title: {news['title']}")
                 # print(f"  Authors: {news['author']}")
                 # print(f"  URL: {news['url']}")
                 # print(f"  Published Date: {news['publishedAt']}")
                 # print(f"  Summary: {news['description']}")
+                if news['url'] in seen:
+                    continue
+                seen.add(news['url'])
 
+                keywords = attribute(plan, matcher, news['title'], news['description'], news['content'])
                 new_news = News(
                     title=news['title'],
                     url=news['url'],
@@ -61,16 +110,33 @@ with app.app_context():
                     summary=news['description'] if news['description'] else '',
                     authors=news['author'] if news['author'] else None,
                     news_text=news['content'] if news['content'] else '',
-                    options=f"source:{news['source']['name']}" if news['source']['name'] else None,
                     provider_id=newsapi_provider.id,
-                    keyword_id=keyword.id
+                    keyword_id=keywords[0].id,
+                    keywords=keywords,
                 )
+                new_news.set_metadata(source=news['source']['name'])
                 db.session.add(new_news)
+                enqueue_summary(new_news)
                 db.session.commit()
+                stored += 1
+                for keyword in keywords:
+                    new_by_keyword[keyword.id] = new_by_keyword.get(keyword.id, 0) + 1
+
+            budget.record_yield(plan, budget.calls - calls, new_by_keyword)
+            metrics.ARTICLES_INGESTED.labels(newsapi_provider.provider_name).inc(stored)
+            progress.publish(progress.ARTICLES_STORED, 'newsapi', provider=newsapi_provider.provider_name,
+                             keyword=plan.query, count=stored)
+
+    except QuotaExceeded as e:
+        # Not a failure of the worker: the next runs resume after the reset
+        progress.publish(progress.FAILURE, 'newsapi', provider=newsapi_provider.provider_name, error=str(e))
+        print(f"News API quota exhausted until {budget.quota.exhausted_until} UTC: {e}")
 
     except Exception as e:
+        progress.publish(progress.FAILURE, 'newsapi', provider=newsapi_provider.provider_name, error=str(e))
         print("Exception when calling News API: %s\n" % e)
         exit(1)
 
+    progress.publish(progress.RUN_FINISHED, 'newsapi')
     print("News list retrieved successfully")
     exit(0)
@@ -5,12 +5,20 @@ import sys
 sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
 
 import requests
+from data.bootstrap import create_worker_app
 from data.db import db
+from data.jobs import enqueue_summary
+from data.quota import ProviderBudget, ProviderError, QuotaExceeded, known_urls
 from models.news import News
 from models.provider import NewsProvider
-from wsgi import create_app
+from shared import metrics, progress
+from shared.query_planner import QUERY_LENGTHS, KeywordMatcher, attribute, plan_queries
 
-app = create_app()
+# Articles per NewsData.io page, which one query per keyword used to get
+PAGE_SIZE = 10
+
+app = create_worker_app()
+metrics.init_worker('newsdata')
 
 with app.app_context():
     newsapi_provider = NewsProvider.query.filter_by(provider_name='NewsData.io').first()
@@ -18,35 +26,72 @@ with app.app_context():
         print("NewsData.io provider not available")
         exit(1)
 
+    # Keywords sharing their filters go out as one OR query, and the returned articles are
+    # attributed back to the keywords they mention. The queries that brought the most new
+    # articles go first, as far as the quota allows.
+    budget = ProviderBudget(newsapi_provider)
+    plans = budget.order(plan_queries(newsapi_provider.keywords, QUERY_LENGTHS['newsdata'],
+                                      filters=('language', 'region', 'category'), per_keyword=PAGE_SIZE))
+    matcher = KeywordMatcher(newsapi_provider.keywords)
+    print(f"Quota: {budget.remaining} requests left, {budget.budget} for this run")
+    progress.publish(progress.RUN_STARTED, 'newsdata', keywords=len(newsapi_provider.keywords), queries=len(plans),
+                     budget=budget.budget)
+
     try:
-        for keyword in newsapi_provider.keywords:
-            print(f"Searching for keyword: {keyword.keyword}")
+        for plan in plans:
+            if not budget.allow():
+                print("Request budget of this run used, the remaining keywords wait for the next run")
+                break
+            print(f"Searching for keywords: {', '.join(keyword.keyword for keyword in plan.keywords)}")
 
             # Get the request parameters
             params = {}
-            params['q'] = keyword.keyword
+            params['q'] = plan.query
             params['removeduplicate'] = 1
             params['apikey'] = newsapi_provider.access_token_secret
 
-            if keyword.language:
-                params['language'] = keyword.language
-            if keyword.region:
-                params['country'] = keyword.region
-            if keyword.category:
-                params['category'] = keyword.category
-
-            # Make the API call
-            response = requests.get(f"{newsapi_provider.endpoint}", params=params)
-
-            # pprint(response.json())
-            # Print response details
-            print("\nResponse Details:")
-            print(f"  Retrieved {len(response.json()['results'])} articles")
-            print(f"  Total available: {response.json()['totalResults']}")
+            if plan.filters['language']:
+                params['language'] = plan.filters['language']
+            if plan.filters['region']:
+                params['country'] = plan.filters['region']
+            if plan.filters['category']:
+                params['category'] = plan.filters['category']
+
+            articles = []
+            calls = budget.calls
+            while True:
+                # Make the API call
+                with metrics.provider_request(newsapi_provider.provider_name):
+                    response = requests.get(f"{newsapi_provider.endpoint}", params=params)
+                metrics.record_response(newsapi_provider.provider_name, response)
+                try:
+                    result = budget.check_response(response, 'results')
+                except QuotaExceeded:
+                    raise
+                except ProviderError as e:
+                    print(f"  NewsData.io error: {e}")
+                    progress.publish(progress.FAILURE, 'newsdata', provider=newsapi_provider.provider_name, error=str(e))
+                    break
+
+                # pprint(result)
+                # Print response details
+                print("\nResponse Details:")
+                print(f"  Retrieved {len(result['results'])} articles")
+                print(f"  Total available: {result.get('totalResults')}")
+                articles += result['results']
+                # Further pages only while the keywords have not all had their share
+                if len(articles) >= plan.target or not result.get('nextPage') or not budget.allow():
+                    break
+                params['page'] = result['nextPage']
+
+            # Already stored articles cost a call but bring nothing new
+            seen = known_urls(news['link'] for news in articles)
+            new_by_keyword = {}
+            stored = 0
             
             # Print news articles
             # print("\nNews Articles:")
-            for news in response.json()['results']:
+            for news in articles:
                 # print(f"  Title: {news['title']}")
                 # print(f"  Authors: {news['creator']}")
                 # print(f"  URL: {news['link']}")
@@ -55,7 +100,11 @@ with app.app_context():
                 # print(f"  Sentiment: {news['sentiment']}")
                 # print(f"  Summary: {news['description']}")
                 # print(f"  Keywords: {news['keywords']}")
+                if news['link'] in seen:
+                    continue
+                seen.add(news['link'])
 
+                keywords = attribute(plan, matcher, news['title'], news['description'])
                 new_news = News(
                     title=news['title'],
                     url=news['link'],
@@ -64,16 +113,37 @@ with app.app_context():
                     summary=news['description'] if news['description'] else '',
                     authors=','.join(news['creator']) if news['creator'] else None,
                     news_text=news['description'] if news['description'] else '',
-                    options=','.join(news['keywords']) if news['keywords'] else None,
                     provider_id=newsapi_provider.id,
-                    keyword_id=keyword.id
+                    keyword_id=keywords[0].id,
+                    keywords=keywords,
+                )
+                new_news.set_metadata(
+                    source=news.get('source_id'),
+                    categories=news.get('category'),
+                    tags=news['keywords'],
                 )
                 db.session.add(new_news)
+                enqueue_summary(new_news)
                 db.session.commit()
+                stored += 1
+                for keyword in keywords:
+                    new_by_keyword[keyword.id] = new_by_keyword.get(keyword.id, 0) + 1
+
+            budget.record_yield(plan, budget.calls - calls, new_by_keyword)
+            metrics.ARTICLES_INGESTED.labels(newsapi_provider.provider_name).inc(stored)
+            progress.publish(progress.ARTICLES_STORED, 'newsdata', provider=newsapi_provider.provider_name,
+                             keyword=plan.query, count=stored)
+
+    except QuotaExceeded as e:
+        # Not a failure of the worker: the next runs resume after the reset
+        progress.publish(progress.FAILURE, 'newsdata', provider=newsapi_provider.provider_name, error=str(e))
+        print(f"NewsData.io quota exhausted until {budget.quota.exhausted_until} UTC: {e}")
 
     except Exception as e:
+        progress.publish(progress.FAILURE, 'newsdata', provider=newsapi_provider.provider_name, error=str(e))
         print("Exception when calling NewsData API: %s\n" % e)
         exit(1)
 
+    progress.publish(progress.RUN_FINISHED, 'newsdata')
     print("News list retrieved successfully")
     exit(0)
@@ -7,13 +7,20 @@ sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(
 from datetime import datetime, timedelta
 
 import worldnewsapi
+from data.bootstrap import create_worker_app
 from data.db import db
+from data.jobs import enqueue_summary
+from data.quota import ProviderBudget, ProviderError, QuotaExceeded, known_urls
 from models.news import News
 from models.provider import NewsProvider
+from shared import metrics, progress
+from shared.query_planner import QUERY_LENGTHS, KeywordMatcher, attribute, plan_queries
 from worldnewsapi.rest import ApiException
-from wsgi import create_app
 
-app = create_app()
+MAX_NUMBER = 100
+
+app = create_worker_app()
+metrics.init_worker('worldnews')
 
 with app.app_context():
     newsapi_provider = NewsProvider.query.filter_by(provider_name='World News API').first()
@@ -21,6 +28,17 @@ with app.app_context():
         print("World News API provider not available")
         exit(1)
 
+    # Keywords sharing their filters go out as one OR query, and the returned articles are
+    # attributed back to the keywords they mention. The queries that brought the most new
+    # articles go first, as far as the quota allows.
+    budget = ProviderBudget(newsapi_provider)
+    plans = budget.order(plan_queries(newsapi_provider.keywords, QUERY_LENGTHS['worldnews'],
+                                      filters=('language', 'region', 'category')))
+    matcher = KeywordMatcher(newsapi_provider.keywords)
+    print(f"Quota: {budget.remaining} points left, {budget.budget} requests for this run")
+    progress.publish(progress.RUN_STARTED, 'worldnews', keywords=len(newsapi_provider.keywords), queries=len(plans),
+                     budget=budget.budget)
+
     newsapi_configuration = worldnewsapi.Configuration(api_key={'apiKey': newsapi_provider.access_token_secret})
 
     try:
@@ -29,13 +47,16 @@ with app.app_context():
         api_client.configuration.debug = True
         newsapi_api_instance = worldnewsapi.NewsApi(api_client)
         
-        for keyword in newsapi_provider.keywords:
-            print(f"Searching for keyword: {keyword.keyword}")
+        for plan in plans:
+            if not budget.allow():
+                print("Request budget of this run used, the remaining keywords wait for the next run")
+                break
+            print(f"Searching for keywords: {', '.join(keyword.keyword for keyword in plan.keywords)}")
 
             # Get the request parameters
             params = {}
-            params['number'] = 20
-            params['text'] = keyword.keyword
+            params['number'] = min(plan.target, MAX_NUMBER)
+            params['text'] = plan.query
             # params['entities'] = 'LOC:British Columbia'
             params['earliest_publish_date'] = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
             params['min_sentiment'] = -0.1
@@ -43,26 +64,55 @@ with app.app_context():
             params['sort_direction'] = 'desc'
             params['sort'] = 'publish-time'
 
-            if keyword.language:
-                params['language'] = keyword.language
-            if keyword.region:
-                params['source_country'] = keyword.region
-            if keyword.category:
-                params['categories'] = keyword.category
+            if plan.filters['language']:
+                params['language'] = plan.filters['language']
+            if plan.filters['region']:
+                params['source_country'] = plan.filters['region']
+            if plan.filters['category']:
+                params['categories'] = plan.filters['category']
 
-            # Make the API call
-            response = newsapi_api_instance.search_news(**params)
-            
-            # Print response details
-            print("\nResponse Details:")
-            print(f"  Retrieved {len(response.news)} articles")
-            print(f"  Total available: {response.available}")
-            print(f"  Offset: {response.offset}")
-            print(f"  Number: {response.number}")
+            articles = []
+            calls = budget.calls
+            params['offset'] = 0
+            while True:
+                try:
+                    # Make the API call
+                    try:
+                        with metrics.provider_request(newsapi_provider.provider_name):
+                            api_response = newsapi_api_instance.search_news_with_http_info(**params)
+                    except ApiException as e:
+                        budget.check_exception(e)
+                    # The quota is reported in the X-API-Quota-Left header, in points
+                    budget.check(api_response.status_code, api_response.headers, None)
+                except QuotaExceeded:
+                    raise
+                except ProviderError as e:
+                    print(f"  World News API error: {e}")
+                    progress.publish(progress.FAILURE, 'worldnews', provider=newsapi_provider.provider_name, error=str(e))
+                    break
+                response = api_response.data
+                
+                # Print response details
+                print("\nResponse Details:")
+                print(f"  Retrieved {len(response.news)} articles")
+                print(f"  Total available: {response.available}")
+                print(f"  Offset: {response.offset}")
+                print(f"  Number: {response.number}")
+                articles += response.news
+                # Further pages only while the keywords have not all had their share
+                if (len(articles) >= plan.target or len(response.news) < params['number']
+                        or len(articles) >= response.available or not budget.allow()):
+                    break
+                params['offset'] += len(response.news)
+
+            # Already stored articles cost a call but bring nothing new
+            seen = known_urls(news.url for news in articles)
+            new_by_keyword = {}
+            stored = 0
             
             # Print news articles
             # print("\nNews Articles:")
-            for news in response.news:
+            for news in articles:
                 # print(f"  Title: {news.title}")
                 # print(f"  Authors: {news.authors}")
                 # print(f"  URL: {news.url}")
@@ -71,16 +121,14 @@ with app.app_context():
                 # print(f"  Sentiment: {news.sentiment}")
                 # # print(f"  Text: {news.text}")
                 # print(f"  Summary: {news.summary}")
+                if news.url in seen:
+                    continue
+                seen.add(news.url)
 
                 # Convert authors list to string
                 authors_str = ', '.join(news.authors) if news.authors else ''
                 
-                # Convert sentiment to string
-                sentiment_str = str(news.sentiment) if news.sentiment else ''
-                
-                # Create options string
-                options_str = f"sentiment:{sentiment_str};published_date:{news.publish_date}"
-                
+                keywords = attribute(plan, matcher, news.title, news.summary, news.text)
                 new_news = News(
                     title=news.title,
                     url=news.url,
@@ -89,14 +137,33 @@ with app.app_context():
                     summary=news.summary,
                     authors=authors_str,
                     news_text=news.text,
-                    options=options_str,
                     provider_id=newsapi_provider.id,
-                    keyword_id=keyword.id
+                    keyword_id=keywords[0].id,
+                    keywords=keywords,
+                )
+                new_news.set_metadata(
+                    sentiment=news.sentiment,
+                    categories=[news.category] if getattr(news, 'category', None) else None,
                 )
                 db.session.add(new_news)
+                enqueue_summary(new_news)
                 db.session.commit()
+                stored += 1
+                for keyword in keywords:
+                    new_by_keyword[keyword.id] = new_by_keyword.get(keyword.id, 0) + 1
+
+            budget.record_yield(plan, budget.calls - calls, new_by_keyword)
+            metrics.ARTICLES_INGESTED.labels(newsapi_provider.provider_name).inc(stored)
+            progress.publish(progress.ARTICLES_STORED, 'worldnews', provider=newsapi_provider.provider_name,
+                             keyword=plan.query, count=stored)
+
+    except QuotaExceeded as e:
+        # Not a failure of the worker: the next runs resume after the reset
+        progress.publish(progress.FAILURE, 'worldnews', provider=newsapi_provider.provider_name, error=str(e))
+        print(f"World News API quota exhausted until {budget.quota.exhausted_until} UTC: {e}")
 
     except ApiException as e:
+        progress.publish(progress.FAILURE, 'worldnews', provider=newsapi_provider.provider_name, error=str(e))
         print("Exception when calling World News API: %s\n" % e)
         print("Status: %s" % e.status)
         print("Reason: %s" % e.reason)
@@ -104,5 +171,6 @@ with app.app_context():
         print("Headers: %s" % e.headers)
         exit(1)
 
+    progress.publish(progress.RUN_FINISHED, 'worldnews')
     print("News list retrieved successfully")
     exit(0)
@@ -0,0 +1,178 @@
+import os
+import sys
+
+# Add the parent directory (project root) to the Python path
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+import argparse
+import asyncio
+import logging
+
+import httpx
+
+from data.bootstrap import create_worker_app
+from data.db import db
+from data.publishing import LEASE_SECONDS, claim, extend, failed, published
+from shared import metrics
+from shared.platforms import ADAPTERS, POSTS_PER_MINUTE, PublishError, RetryableError
+from shared.rate_limit import TokenBucket
+
+logger = logging.getLogger('publisher')
+
+# Posts being sent at once, over all platforms
+CONCURRENCY = int(os.environ.get('PUBLISH_CONCURRENCY', 8))
+REQUEST_TIMEOUT = 30
+
+
+class Publisher:
+    """
+    Sends claimed posts to their platforms concurrently.
+
+    Each media provider account has its own rate limit, so one article fans out to every
+    platform at once while posts to the same account are spaced out. A post waits for its
+    account's turn before taking one of the ``concurrency`` slots, and its lease is extended
+    to cover the wait, so no other publisher claims it meanwhile. A post whose earlier
+    attempt may have reached the platform (a timeout, a server error, a lease that ran out)
+    is first looked up among the account's recent posts, and only sent when it is not there.
+    """
+
+    def __init__(self, client=None, concurrency=CONCURRENCY):
+        self.client = client or httpx.AsyncClient(timeout=REQUEST_TIMEOUT)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.buckets = {}
+
+    def bucket(self, account):
+        # The same account configured twice shares its limit
+        key = (account.platform, account.client_id)
+        if key not in self.buckets:
+            try:
+                per_minute = float(account.params.get('posts_per_minute') or POSTS_PER_MINUTE[account.platform])
+            except (KeyError, TypeError, ValueError):
+                per_minute = 1
+            self.buckets[key] = TokenBucket(per_minute / 60)
+        return self.buckets[key]
+
+    def adapter(self, post):
+        account = post.account
+        adapter_class = ADAPTERS.get(account.platform)
+        if adapter_class is None:
+            raise PublishError(f"No publisher for platform '{account.platform}'")
+        return adapter_class(account, self.client)
+
+    async def wait_turn(self, post):
+        """
+        Wait until the post's account may post again, holding the post meanwhile.
+
+        Returns:
+            bool: False when the lease was lost and another publisher may hold the post.
+        """
+        wait = self.bucket(post.account).reserve()
+        if wait > 0:
+            held = extend(post, wait + LEASE_SECONDS)
+            db.session.commit()
+            if not held:
+                return False
+            await asyncio.sleep(wait)
+        return True
+
+    async def send(self, adapter, post):
+        if post.attempts > 1:
+            result = await adapter.find(post)
+            if result is not None:
+                logger.info('Post %s was already published by an earlier attempt', post.id)
+                return result
+        return await adapter.publish(post)
+
+    async def publish_post(self, post):
+        """Publish one claimed post and record the outcome. Returns its new status."""
+        platform = post.account.platform
+        if not await self.wait_turn(post):
+            outcome = 'lost'
+        else:
+            async with self.semaphore:
+                # Renewed once a slot is free, since other posts may have held them long
+                held = extend(post)
+                db.session.commit()
+                outcome = await self.attempt(post) if held else 'lost'
+        if outcome == 'lost':
+            logger.warning('Lease of post %s expired before it was sent, left to its new holder', post.id)
+        metrics.POSTS_PUBLISHED.labels(platform, outcome).inc()
+        logger.info('Post %s on %s: %s', post.id, platform, outcome)
+        return outcome
+
+    async def attempt(self, post):
+        adapter = None
+        try:
+            adapter = self.adapter(post)
+            result = await self.send(adapter, post)
+        except RetryableError as e:
+            if e.maybe_published and not adapter.can_find:
+                # Nothing to look it up by before a retry, so it is left to an editor
+                failed(post, f"{e}; the post may have been published, check the account before "
+                             f"scheduling it again", permanent=True)
+                outcome = 'failed'
+            else:
+                final = failed(post, e, retry_after=e.retry_after)
+                outcome = 'failed' if final else 'retry'
+        except PublishError as e:
+            failed(post, e, permanent=True)
+            outcome = 'failed'
+        except Exception as e:
+            # e.g. an unexpected answer: retried, after checking it did not go through
+            logger.exception('Unexpected error publishing post %s', post.id)
+            if adapter is not None and not adapter.can_find:
+                failed(post, f"{e}; the post may have been published, check the account before "
+                             f"scheduling it again", permanent=True)
+                outcome = 'failed'
+            else:
+                final = failed(post, e)
+                outcome = 'failed' if final else 'retry'
+        else:
+            if not published(post, result.external_id, result.url):
+                logger.warning('Lease of post %s expired while it was published', post.id)
+            outcome = 'published'
+        db.session.commit()
+        return outcome
+
+    async def publish(self, posts):
+        return await asyncio.gather(*(self.publish_post(post) for post in posts))
+
+    async def close(self):
+        await self.client.aclose()
+
+
+async def run(post_ids=None, news_id=None):
+    publisher = Publisher()
+    outcomes = []
+    try:
+        while True:
+            posts = claim(post_ids=post_ids, news_id=news_id)
+            if not posts:
+                break
+            outcomes.extend(await publisher.publish(posts))
+            if post_ids or news_id:
+                break
+    finally:
+        await publisher.close()
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish scheduled posts to their media platforms')
+    parser.add_argument('post_ids', nargs='*', type=int, help='posts to publish now, instead of the due ones')
+    parser.add_argument('--news', type=int, help='publish every post of this article now')
+    args = parser.parse_args()
+
+    app = create_worker_app()
+    metrics.init_worker('publisher')
+    with app.app_context():
+        outcomes = asyncio.run(run(args.post_ids, args.news))
+    print(f"Published {outcomes.count('published')}, retrying {outcomes.count('retry')}, "
+          f"failed {outcomes.count('failed')}, left to other publishers {outcomes.count('lost')}")
+    exit(0)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    main()
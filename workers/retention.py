@@ -0,0 +1,23 @@
+import os
+import sys
+
+# Add the parent directory (project root) to the Python path
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+from data.archive import ARCHIVE_DIR, RETENTION_DAYS, archive_news
+from data.bootstrap import create_worker_app
+
+app = create_worker_app()
+
+with app.app_context():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else RETENTION_DAYS
+    print(f"Archiving news older than {days} days to {ARCHIVE_DIR}")
+
+    try:
+        archived = archive_news(older_than_days=days)
+    except Exception as e:
+        print("Exception when archiving news: %s\n" % e)
+        exit(1)
+
+    print(f"Archived {archived} articles")
+    exit(0)
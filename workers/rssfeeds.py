@@ -1,219 +1,162 @@
 import os
 import re
 import sys
-import tempfile
-import shutil
-from datetime import datetime
 
 import feedparser
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
 
 # Add the parent directory (project root) to the Python path
 sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
 
+from data.bootstrap import create_worker_app
 from data.db import db
+from data.jobs import enqueue_summary
 from models.news import News
 from models.provider import FeedProvider
-from wsgi import create_app
+from shared import metrics, progress
+from shared.frontier import Frontier
+from shared.politeness import FetchScheduler, RobotsDisallowed
+from workers.extraction import CONTENT_NOT_LOADED, extract_article, is_video_url
 
-app = create_app()
+# 'inline' loads each article here, 'frontier' leaves it to the workers/extractor.py pool
+EXTRACTION = os.environ.get('RSS_EXTRACTION', 'inline')
+# Article pages loaded at once in inline mode, each in its own headless browser
+FETCH_WORKERS = int(os.environ.get('RSS_FETCH_WORKERS', 2))
 
-with app.app_context():
-    rss_providers = FeedProvider.query.filter_by(enabled=True).all()
-    content = ''
+
+def store_news(rss, entry, news_url, content):
+    """Store one feed entry and queue its summary, or its extraction in frontier mode."""
     summary = ''
-    news_url = ''
+    authors_str = ', '.join(entry.author) if entry.author else ''
+
+    if entry.content and entry.content[0] and 'value' in entry.content[0]:
+        summary = BeautifulSoup(entry.content[0]['value'], 'html.parser').get_text()
+
+    # print(f"  Title: {entry.title}")
+    # print(f"  Authors: {authors_str}")
+    # print(f"  URL: {news_url}")
+    # print(f"  Published Date: {entry.published}")
+    # print(f"  Summary: {summary}")
+    # print(f"  Content: ({len(content)}) {content[:2000]}")
+
+    new_news = News(
+        title=entry.title,
+        url=news_url,
+        published_date=entry.published,
+        summary=summary or '',
+        authors=authors_str,
+        news_text=content or '',
+        guid=entry.id or None,
+        feed_id =rss.id,
+    )
+    new_news.set_metadata(
+        source=entry.get('source', {}).get('title'),
+        categories=[tag.term for tag in entry.get('tags', [])],
+    )
+    db.session.add(new_news)
+    if frontier and news_url:
+        # Committed first so the extractor finds the article. It queues the
+        # summary once the text is in; a URL already in the frontier is
+        # summarized from the feed text.
+        db.session.commit()
+        if not frontier.add(news_url, news_id=new_news.id):
+            enqueue_summary(new_news)
+    else:
+        enqueue_summary(new_news)
+    db.session.commit()
+
+
+app = create_worker_app()
+metrics.init_worker('rssfeeds')
+frontier = Frontier() if EXTRACTION == 'frontier' else None
+# One scheduler for the whole run, so a host backing off stays skipped across feeds
+scheduler = FetchScheduler(extract_article, workers=FETCH_WORKERS)
+
+with app.app_context():
+    # Optional feed IDs on the command line restrict the run to those feeds
+    feed_ids = [int(arg) for arg in sys.argv[1:]]
+    query = FeedProvider.query.filter_by(enabled=True)
+    if feed_ids:
+        query = query.filter(FeedProvider.id.in_(feed_ids))
+    rss_providers = query.all()
+    progress.publish(progress.RUN_STARTED, 'rssfeeds', feeds=len(rss_providers))
     try:
         for rss in rss_providers:
             print(f"Searching for feed: {rss.provider_name}")
 
-            feeds = feedparser.parse(rss.endpoint)
+            with metrics.provider_request(rss.provider_name):
+                feeds = feedparser.parse(rss.endpoint)
+            if feeds.get('bozo') and not feeds.entries:
+                metrics.PROVIDER_ERRORS.labels(rss.provider_name, 'parse').inc()
             print("\nResponse Details:")
             print(f"  Retrieved {len(feeds.entries)} articles")
+            progress.publish(progress.FEED_FETCHED, 'rssfeeds', feed=rss.provider_name, entries=len(feeds.entries))
+            stored = 0
+            # (entry, url) of the articles to load, handed to the scheduler after the feed is read
+            pending = []
 
             # Print news articles
             # print("\nNews Articles:")
             
             for entry in feeds.entries:
+                news_url = ''
                 try:
                     if entry.id is not None:
-                        existing_news = News.query.filter_by(options=entry.id).first()
+                        existing_news = News.query.filter_by(guid=entry.id).first()
                         if existing_news:
                             print(f"Article with ID {entry.id} already exists in the database. Skipping.")
                             continue
 
-                    title = BeautifulSoup(entry.title or '', 'html.parser').get_text()
-
                     print(f"Found article: {entry.title}")
                     match = re.search(r'url=([^&]+)', entry.link)
                     if match:
                         news_url = match.group(1)
                         
                         # Skip video content
-                        if any(video in news_url for video in ['/video/', '/videos/', 'youtube.com', 'youtu.be', 'vimeo.com']):
+                        if is_video_url(news_url):
                             print(f"  Skipping video content: {news_url}")
                             continue
-                            
-                        options = Options()
-                        options.add_argument('--headless=new')
-                        options.add_argument('--no-sandbox')
-                        options.add_argument('--disable-dev-shm-usage')
-                        options.add_argument('--disable-gpu')
-                        options.add_argument('--disable-extensions')
-                        options.add_argument('--disable-software-rasterizer')
-                        options.add_argument('--disable-blink-features=AutomationControlled')
-                        options.add_experimental_option('excludeSwitches', ['enable-automation'])
-                        options.add_experimental_option('useAutomationExtension', False)
-                        
-                        # Set a modern user agent
-                        user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                        options.add_argument(f'user-agent={user_agent}')
-                        
-                        # Retry logic
-                        max_retries = 1
-                        for attempt in range(max_retries):
-                            user_data_dir = tempfile.mkdtemp()
-                            options.add_argument(f'--user-data-dir={user_data_dir}')
-                            driver = None
-                            try:
-                                print(f"  Loading {news_url} (attempt {attempt + 1}/{max_retries})...")
-                                driver = webdriver.Chrome(options=options)
-                                driver.set_page_load_timeout(15)
-                                driver.set_script_timeout(15)
-                                
-                                # Set additional CDP parameters
-                                driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": user_agent})
-                                driver.execute_cdp_cmd('Network.enable', {})
-                                
-                                # Try to get the page
-                                driver.get(news_url)
-                                
-                                # Wait for content to load
-                                WebDriverWait(driver, 15).until(
-                                    lambda d: d.execute_script('return document.readyState') == 'complete'
-                                )
-                                
-                                # Try to find and extract main article content
-                                try:
-                                    # Common article selectors - add more as needed
-                                    article_selectors = [
-                                        'article',
-                                        'main',
-                                        '[role="main"]',
-                                        '.article-content',
-                                        '.post-content',
-                                        '.entry-content',
-                                        '#content',
-                                        '#main-content',
-                                        'div[class*="content"]',
-                                        'div[class*="article"]'
-                                    ]
-                                    
-                                    # Try to find article content using different selectors
-                                    article_element = None
-                                    for selector in article_selectors:
-                                        try:
-                                            elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                            if elements:
-                                                # Find the largest element that might contain the article
-                                                article_element = max(elements, key=lambda e: len(e.text))
-                                                if len(article_element.text) > 500:  # Minimum content length
-                                                    break
-                                        except:
-                                            continue
-                                    
-                                    if article_element:
-                                        # Get the text content
-                                        html = article_element.get_attribute('innerHTML')
-                                        soup = BeautifulSoup(html, 'html.parser')
-                                        
-                                        # Remove script and style elements
-                                        for script in soup(['script', 'style', 'nav', 'footer', 'header', 'iframe']):
-                                            script.decompose()
-                                            
-                                        # Get clean text
-                                        text = soup.get_text(separator='\n', strip=True)
-                                        content = '\n'.join([line for line in text.split('\n') if line.strip()])
-                                        
-                                        if not content or len(content) < 100:  # If content is too short, try full page
-                                            raise Exception("Article content too short, trying full page")
-                                    else:
-                                        raise Exception("No article content found")
-                                        
-                                except Exception as e:
-                                    print(f"  Content extraction warning: {str(e).split('\n')[0]}")
-                                    # Fall back to full page extraction
-                                    html = driver.page_source
-                                    soup = BeautifulSoup(html, 'html.parser')
-                                    
-                                    # Remove unwanted elements
-                                    for element in soup(['script', 'style', 'nav', 'footer', 'header', 'iframe']):
-                                        element.decompose()
-                                    
-                                    text = soup.get_text(separator='\n', strip=True)
-                                    content = '\n'.join([line for line in text.split('\n') if line.strip()])
-                                
-                                if not content or len(content) < 100:
-                                    raise Exception("Insufficient content extracted")
-                                    
-                                break  # Success, exit retry loop
-                                
-                            except Exception as e:
-                                error_msg = str(e).split('\n')[0]
-                                print(f"  Attempt {attempt + 1} failed: {error_msg}")
-                                if attempt == max_retries - 1:  # Last attempt failed
-                                    print(f"  Failed to extract content from {news_url}")
-                                    content = "[Content could not be loaded]"
-                                    continue  # Skip to next article
-                            finally:
-                                if driver:
-                                    try:
-                                        driver.quit()
-                                    except:
-                                        pass
-                                try:
-                                    shutil.rmtree(user_data_dir, ignore_errors=True)
-                                except:
-                                    pass
-
-                    authors_str = ', '.join(entry.author) if entry.author else ''
-
-                    if entry.content and entry.content[0] and 'value' in entry.content[0]:
-                        summary = BeautifulSoup(entry.content[0]['value'], 'html.parser').get_text()
-
-                    # print(f"  Title: {entry.title}")
-                    # print(f"  Authors: {authors_str}")
-                    # print(f"  URL: {news_url}")
-                    # print(f"  Published Date: {entry.published}")
-                    # print(f"  Summary: {summary}")
-                    # print(f"  Content: ({len(content)}) {content[:2000]}")
-
-                    new_news = News(
-                        title=entry.title,
-                        url=news_url,
-                        published_date=entry.published,
-                        summary=summary or '',
-                        authors=authors_str,
-                        news_text=content or '',
-                        options=f"{entry.id or ''}",
-                        feed_id =rss.id,
-                    )
-                    db.session.add(new_news)
-                    db.session.commit()
+
+                        if not frontier:
+                            pending.append((entry, news_url))
+                            continue
+
+                    store_news(rss, entry, news_url, '')
+                    stored += 1
 
                 except Exception as e:
                     print(f"Error processing entry: {e}")
+                    progress.publish(progress.FAILURE, 'rssfeeds', feed=rss.provider_name, error=str(e))
+                    db.session.rollback()
                     continue
 
+            # Pages of different hosts load in parallel, each host at its own polite pace
+            for (entry, news_url), content, error in scheduler.run(pending, url=lambda item: item[1]):
+                if isinstance(error, RobotsDisallowed):
+                    print(f"  {error}")
+                    content = ''
+                elif error:
+                    print(f"  Failed to extract content from {news_url}: {error}")
+                    progress.publish(progress.FAILURE, 'rssfeeds', url=news_url, error=str(error))
+                    content = CONTENT_NOT_LOADED
+                else:
+                    progress.publish(progress.ARTICLE_EXTRACTED, 'rssfeeds', feed=rss.provider_name, url=news_url)
+                try:
+                    store_news(rss, entry, news_url, content)
+                    stored += 1
+                except Exception as e:
+                    print(f"Error processing entry: {e}")
+                    progress.publish(progress.FAILURE, 'rssfeeds', feed=rss.provider_name, error=str(e))
+                    db.session.rollback()
+
+            metrics.ARTICLES_INGESTED.labels(rss.provider_name).inc(stored)
+            progress.publish(progress.ARTICLES_STORED, 'rssfeeds', feed=rss.provider_name, count=stored)
+
     except Exception as e:
         print("Exception when calling RSS Feeds: %s\n" % e)
+        progress.publish(progress.FAILURE, 'rssfeeds', error=str(e))
         exit(1)
 
+    progress.publish(progress.RUN_FINISHED, 'rssfeeds')
     print("News list retrieved successfully")
     exit(0)
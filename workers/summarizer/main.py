@@ -1,5 +1,11 @@
 import os
-import sqlite3
+import sys
+import time
+
+# Add the parent directory (project root) to the Python path
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from datetime import datetime
 
 import torch
 from transformers import (
@@ -9,6 +15,12 @@ from transformers import (
     pipeline,
 )
 
+from data.bootstrap import create_worker_app
+from data.db import db
+from data.jobs import discard_summary
+from models.news import News, NewsSummary
+from shared import metrics, progress
+
 torch.cuda.empty_cache()  # Clear GPU memory if needed
 
 bnb_config = BitsAndBytesConfig(
@@ -22,19 +34,29 @@ bnb_config = BitsAndBytesConfig(
 # print("📊 CUDA device:", torch.cuda.get_device_name(0) if torch.cuda.is_available() else "None")
 
 model_id = "microsoft/phi-2"
-
-tokenizer = AutoTokenizer.from_pretrained(model_id)
-model = AutoModelForCausalLM.from_pretrained(
-    model_id,
-    quantization_config=bnb_config,
-    device_map="auto",
-    trust_remote_code=True
-)
-
-pipe = pipeline("text-generation", model=model, tokenizer=tokenizer)
+# Bump whenever the prompts below change so new summaries are stored as a new version
+PROMPT_VERSION = 1
+
+tokenizer = None
+pipe = None
+
+def load_model():
+    """Load the model on first use, so importing this module for its job handler is cheap."""
+    global tokenizer, pipe
+    if pipe is None:
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+        model = AutoModelForCausalLM.from_pretrained(
+            model_id,
+            quantization_config=bnb_config,
+            device_map="auto",
+            trust_remote_code=True
+        )
+        pipe = pipeline("text-generation", model=model, tokenizer=tokenizer)
 
 def summerize_news(title, summary, full_text):
+    load_model()
     output = ""
+    start = time.perf_counter()
     prompt = f"""For this article:
 Title: {title}
 Abstract: {summary}
@@ -59,31 +81,67 @@ Your task: Please generate a catchy title(under 200 characters)
     with torch.no_grad():
         output = pipe(prompt, max_new_tokens=200, do_sample=True, temperature=0.7, pad_token_id=tokenizer.eos_token_id)[0]['generated_text']
     new_title = output.split("=*=*=\n")[1]
-    return new_title, new_summary
 
-basedir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-db_path = '/' + os.path.join(basedir, 'data/contentoire.db')
-def load_news():
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    cursor.execute("CREATE TABLE IF NOT EXISTS summerized_news (id INTEGER PRIMARY KEY, title TEXT, summary TEXT)")
-    conn.commit()
-
-
-    cursor.execute("SELECT id, title, news_text, summary FROM news WHERE processed IS NULL")
-    rows = cursor.fetchall()
-
-    for row in rows:
-        id, title, news_text, summary = row
-        new_title, new_summary = summerize_news(title, summary, news_text)
+    elapsed = time.perf_counter() - start
+    tokens = len(tokenizer(new_summary).input_ids) + len(tokenizer(new_title).input_ids)
+    metrics.SUMMARIZER_SECONDS.observe(elapsed)
+    metrics.SUMMARIZER_TOKENS.inc(tokens)
+    metrics.SUMMARIZER_TOKENS_PER_SECOND.set(tokens / elapsed if elapsed else 0)
+    return new_title, new_summary
 
-        cursor.execute("INSERT INTO summerized_news (id, title, summary) VALUES (?, ?, ?)", (id,new_title, new_summary))
+def store_summary(id, title, news_text, summary):
+    """Summarize one news item and mark it processed. The caller commits."""
+    new_title, new_summary = summerize_news(title, summary, news_text or '')
+    db.session.add(NewsSummary(
+        news_id=id,
+        title=new_title,
+        summary=new_summary,
+        model=model_id,
+        prompt_version=PROMPT_VERSION,
+    ))
+    News.query.filter_by(id=id).update({'processed': datetime.now()})
+    return new_title
+
+def handle_summarize(task):
+    """Job handler of the summarize stage, see workers/pipeline.py."""
+    row = (News.query
+           .with_entities(News.id, News.title, News.news_text, News.summary, News.processed)
+           .filter(News.id == task.news_id)
+           .first())
+    if row is None or row.processed is not None:
+        return []  # deleted, or already summarized by a polling run
+    new_title = store_summary(row.id, row.title, row.news_text, row.summary)
+    progress.publish(progress.SUMMARY_WRITTEN, 'summarizer', news_id=row.id, title=new_title)
+    return []
 
-        cursor.execute("UPDATE news SET processed = CURRENT_TIMESTAMP WHERE id = ?", (id,))
-        conn.commit()
+def load_news():
+    rows = (News.query
+            .with_entities(News.id, News.title, News.news_text, News.summary)
+            .filter(News.processed.is_(None))
+            .all())
+
+    progress.publish(progress.RUN_STARTED, 'summarizer', pending=len(rows))
+    metrics.SUMMARIZER_QUEUE_DEPTH.set(len(rows))
+    for id, title, news_text, summary in rows:
+        metrics.SUMMARIZER_QUEUE_DEPTH.dec()
+        try:
+            new_title = store_summary(id, title, news_text, summary)
+            # Deployments without a summarize consumer would otherwise collect the jobs forever
+            discard_summary(id)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Could not summarize news {id}: {e}")
+            progress.publish(progress.FAILURE, 'summarizer', news_id=id, error=str(e))
+            continue
+
+        db.session.commit()
+        progress.publish(progress.SUMMARY_WRITTEN, 'summarizer', news_id=id, title=new_title)
         print(f"New Title:\n {new_title}\n===\n")
+    progress.publish(progress.RUN_FINISHED, 'summarizer')
 
-    conn.close()
+if __name__ == "__main__":
+    app = create_worker_app()
+    metrics.init_worker('summarizer')
 
-load_news()
\ No newline at end of file
+    with app.app_context():
+        load_news()
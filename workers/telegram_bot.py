@@ -5,48 +5,364 @@ import sys
 sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
 
 import asyncio
+import html
+import logging
+import signal
+import time
+from datetime import datetime, timedelta
 
+from data.bootstrap import create_worker_app
+from data.db import db
+from data.publishing import schedule_news
 from dotenv import load_dotenv
+from models.approval import ApprovalRequest
+from models.news import News
+from models.schedule import ScheduledPost
+from shared.rate_limit import TokenBucket
 from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.error import NetworkError, TelegramError, TimedOut
+from telegram.constants import MessageLimit, ParseMode
+from telegram.error import Forbidden, RetryAfter, TelegramError
 from telegram.request import HTTPXRequest
-from wsgi import create_app
 
 load_dotenv()  # This loads variables from .env into os.environ
 
-# Bot token (DO NOT hardcode in real-world, use environment variable or config)
+logger = logging.getLogger('telegram_bot')
+
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-USER_CHAT_ID = 62717266  # Replace with dynamic user ID if needed
+# Chats the articles are offered in, e.g. the editors' group and a private chat
+TELEGRAM_CHAT_IDS = [int(chat_id) for chat_id in os.getenv("TELEGRAM_CHAT_IDS", "").split(",") if chat_id.strip()]
+# Point it at benchmarks/telegram_stub.py to run without Telegram
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")
+BATCH_SIZE = int(os.getenv("TELEGRAM_BATCH_SIZE", 20))  # articles per chat and round
+PUSH_SECONDS = int(os.getenv("TELEGRAM_PUSH_SECONDS", 30))  # delay between rounds
+MAX_AGE_HOURS = int(os.getenv("TELEGRAM_MAX_AGE_HOURS", 24))  # older summaries are never offered
+LONG_POLL_SECONDS = 30
+# Bot API limits: 30 messages a second overall, 1 a second per chat and 20 a minute per group
+GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", 30))
+CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", 1))
+GROUP_RATE = float(os.getenv("TELEGRAM_GROUP_RATE", 20 / 60))
+MAX_RETRIES = 3
+SUMMARY_LENGTH = 3000  # leaves room for the title and URL within MessageLimit.MAX_TEXT_LENGTH
+
+
+def tomorrow_morning(now):
+    return datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) + timedelta(hours=9)
+
+
+# Callback action -> (button label, publication time)
+SCHEDULE_OPTIONS = {
+    'now': ("✅ Publish now", lambda now: now),
+    'hour': ("🕐 In 1 hour", lambda now: now + timedelta(hours=1)),
+    'morning': ("🌅 Tomorrow 9:00", tomorrow_morning),
+}
+REJECT = 'reject'
+
+
+def retry_seconds(error):
+    """``RetryAfter.retry_after`` is an int or a timedelta depending on the library settings."""
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+
+class RateLimiter:
+    """
+    Per-chat and global send rate of the bot.
+
+    A call first waits for its chat's bucket, then for the global one, so a busy chat
+    does not hold back the others. After a 429 every call waits out its ``retry_after``.
+    """
+
+    def __init__(self, global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE, group_rate=GROUP_RATE):
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chats = {}
+        self.held_until = 0
+
+    async def wait(self, chat_id=None):
+        """Wait for a send slot; without ``chat_id`` (e.g. callback answers) only the global limit applies."""
+        if chat_id is not None:
+            bucket = self.chats.get(chat_id)
+            if bucket is None:
+                # Group and channel IDs are negative
+                bucket = self.chats[chat_id] = TokenBucket(self.group_rate if chat_id < 0 else self.chat_rate)
+            await bucket.acquire()
+        await self.global_bucket.acquire()
+        while (hold := self.held_until - time.monotonic()) > 0:
+            await asyncio.sleep(hold)
+
+    def hold(self, seconds):
+        self.held_until = max(self.held_until, time.monotonic() + seconds)
+
+
+def article_text(news):
+    summary = news.latest_summary
+    title = (summary.title if summary and summary.title else news.title).strip()
+    text = (summary.summary if summary else news.summary or '').strip()
+    if len(text) > SUMMARY_LENGTH:
+        text = text[:SUMMARY_LENGTH].rsplit(' ', 1)[0] + '…'
+    parts = [f"<b>{html.escape(title)}</b>", html.escape(text)]
+    if news.url:
+        parts.append(html.escape(news.url))
+    return '\n\n'.join(part for part in parts if part)[:MessageLimit.MAX_TEXT_LENGTH]
+
+
+def approval_markup(request_id):
+    buttons = [InlineKeyboardButton(label, callback_data=f"{action}:{request_id}")
+               for action, (label, _) in SCHEDULE_OPTIONS.items()]
+    return InlineKeyboardMarkup([buttons[:2], buttons[2:] + [
+        InlineKeyboardButton("❌ Reject", callback_data=f"{REJECT}:{request_id}")]])
+
+
+def status_markup(request_id, label):
+    # Tapping it again only repeats the decision
+    return InlineKeyboardMarkup([[InlineKeyboardButton(label, callback_data=f"status:{request_id}")]])
+
 
-request = HTTPXRequest(read_timeout=30, connect_timeout=30)
+def decide(request, action, user):
+    """
+    Apply an editor's answer to an approval request, then commit.
 
-bot = Bot(token=TELEGRAM_BOT_TOKEN, request=request)
+    Scheduling creates one ScheduledPost per media provider of the article. The first
+    answer decides for every chat the article was offered in: the requests still pending
+    in the other chats take the same status, and an article that already has posts is
+    not scheduled again.
 
-post_options = [
-    {"id": 1, "text": "Post A"},
-    {"id": 2, "text": "Post B"},
-    {"id": 3, "text": "Post C"},
-]
+    Returns:
+        tuple: The answer shown to the editor, and the other chats' requests it closed
+    """
+    now = datetime.now()
+    if action == REJECT:
+        request.status = 'rejected'
+        answer = "Rejected"
+    elif request.news is None:
+        return "This article is no longer available", []
+    elif ScheduledPost.query.filter_by(news_id=request.news_id).first() is not None:
+        request.status = 'scheduled'
+        answer = "Already scheduled"
+    else:
+        scheduled_at = SCHEDULE_OPTIONS[action][1](now)
+        posts = schedule_news(request.news, scheduled_at)
+        if not posts:
+            return "No media provider is enabled, nothing was scheduled", []
+        request.status = 'scheduled'
+        answer = f"Scheduled for {scheduled_at:%Y-%m-%d %H:%M} on {', '.join(p.media.media_name for p in posts)}"
+    closed = (ApprovalRequest.query
+              .filter(ApprovalRequest.news_id == request.news_id, ApprovalRequest.id != request.id,
+                      ApprovalRequest.status == 'pending')
+              .all())
+    for decided in [request] + closed:
+        decided.status = request.status
+        decided.decided_at = now
+        decided.decided_by = user
+    db.session.commit()
+    return answer, closed
 
-keyboard = [
-    [InlineKeyboardButton(p["text"], callback_data=f"post_{p['id']}")]
-    for p in post_options
-]
 
-markup = InlineKeyboardMarkup(keyboard)
+def decision_label(request, answer):
+    return ("❌ Rejected" if request.status == 'rejected' else f"✅ {answer}")[:64]
 
-async def send_message():
+
+class ApprovalBot:
+    """
+    Offers freshly summarized articles to the editors and turns their answers into posts.
+
+    Two loops share one rate limiter: ``push`` sends each chat the summaries it has not
+    seen yet, ``BATCH_SIZE`` at a time and concurrently across chats, and ``listen``
+    long-polls ``getUpdates`` for the editors' button presses.
+    """
+
+    def __init__(self, bot, chat_ids, limiter=None, batch_size=BATCH_SIZE, push_seconds=PUSH_SECONDS,
+                 max_age=timedelta(hours=MAX_AGE_HOURS)):
+        self.bot = bot
+        self.chat_ids = chat_ids
+        self.limiter = limiter or RateLimiter()
+        self.batch_size = batch_size
+        self.push_seconds = push_seconds
+        self.max_age = max_age
+        self.stopping = asyncio.Event()
+        self.answering = set()
+
+    async def call(self, chat_id, method, /, *args, **kwargs):
+        """Call a Bot API method within the rate limits, retrying after a 429."""
+        for attempt in range(MAX_RETRIES):
+            await self.limiter.wait(chat_id)
+            try:
+                return await method(*args, **kwargs)
+            except RetryAfter as e:
+                seconds = retry_seconds(e)
+                logger.warning('Telegram asks to wait %.0fs (chat %s)', seconds, chat_id)
+                self.limiter.hold(seconds)
+                if attempt == MAX_RETRIES - 1:
+                    raise
+
+    def unsent(self, chat_id):
+        """Summarized articles not offered in ``chat_id`` yet, oldest summary first."""
+        offered = db.select(ApprovalRequest.id).where(ApprovalRequest.news_id == News.id,
+                                                      ApprovalRequest.chat_id == chat_id)
+        # Decided in another chat
+        decided = db.select(ApprovalRequest.id).where(ApprovalRequest.news_id == News.id,
+                                                      ApprovalRequest.status != 'pending')
+        return (News.query
+                .filter(News.processed >= datetime.now() - self.max_age, ~offered.exists(), ~decided.exists())
+                .order_by(News.processed, News.id)
+                .limit(self.batch_size)
+                .all())
+
+    async def offer(self, chat_id, news):
+        # The request is stored first so its ID can go in the buttons
+        request = ApprovalRequest(news_id=news.id, chat_id=chat_id)
+        db.session.add(request)
+        db.session.commit()
+        try:
+            message = await self.call(chat_id, self.bot.send_message, chat_id=chat_id, text=article_text(news),
+                                      parse_mode=ParseMode.HTML, reply_markup=approval_markup(request.id))
+        except Exception:
+            # Offered again next round
+            db.session.delete(request)
+            db.session.commit()
+            raise
+        request.message_id = message.message_id
+        db.session.commit()
+
+    async def push_batch(self):
+        """Send one batch to every chat. Returns the number of messages sent."""
+        sends = []
+        for chat_id in self.chat_ids:
+            sends.extend((chat_id, self.offer(chat_id, news)) for news in self.unsent(chat_id))
+        results = await asyncio.gather(*(send for _, send in sends), return_exceptions=True)
+        sent = 0
+        for (chat_id, _), result in zip(sends, results):
+            if isinstance(result, Forbidden):
+                logger.error('The bot cannot write to chat %s: %s', chat_id, result)
+            elif isinstance(result, Exception):
+                logger.error('Sending to chat %s failed: %s', chat_id, result)
+            else:
+                sent += 1
+        return sent
+
+    async def push(self):
+        while not self.stopping.is_set():
+            try:
+                sent = await self.push_batch()
+                if sent:
+                    logger.info('Offered %d articles', sent)
+            except Exception as e:
+                db.session.rollback()
+                logger.error('Error offering articles: %s', e)
+                sent = 0
+            if sent < self.batch_size * len(self.chat_ids):
+                # A full batch means more are waiting, so only pause when caught up
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), self.push_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def answer(self, query):
+        """Handle a button press on an approval message."""
+        chat_id, message_id = (query.message.chat.id, query.message.message_id) if query.message else (0, 0)
+        action, _, request_id = (query.data or '').partition(':')
+        request = db.session.get(ApprovalRequest, int(request_id)) if request_id.isdigit() else None
+        if request is None or (request.chat_id, request.message_id) != (chat_id, message_id):
+            await self.call(None, self.bot.answer_callback_query, query.id, text="Unknown article")
+            return
+        if request.status != 'pending':
+            await self.call(None, self.bot.answer_callback_query, query.id, text=f"Already {request.status}")
+            return
+        if action != REJECT and action not in SCHEDULE_OPTIONS:
+            await self.call(None, self.bot.answer_callback_query, query.id, text="Unknown action")
+            return
+
+        user = (query.from_user.username or str(query.from_user.id)) if query.from_user else None
+        text, closed = decide(request, action, user)
+        await self.call(None, self.bot.answer_callback_query, query.id, text=text[:200])
+        if request.status != 'pending':
+            label = decision_label(request, text)
+            # The other chats see the decision in place of their buttons
+            for decided in [request] + [other for other in closed if other.message_id]:
+                try:
+                    await self.call(decided.chat_id, self.bot.edit_message_reply_markup, chat_id=decided.chat_id,
+                                    message_id=decided.message_id, reply_markup=status_markup(decided.id, label))
+                except TelegramError as e:
+                    logger.warning('Could not update the message of request %s: %s', decided.id, e)
+        logger.info('Article %s %s by %s', request.news_id, request.status, user)
+
+    async def listen(self):
+        offset = None
+        while not self.stopping.is_set():
+            try:
+                updates = await self.bot.get_updates(offset=offset, timeout=LONG_POLL_SECONDS,
+                                                     allowed_updates=['callback_query'])
+            except RetryAfter as e:
+                await asyncio.sleep(retry_seconds(e))
+                continue
+            except TelegramError as e:
+                logger.warning('Polling Telegram failed: %s', e)
+                await asyncio.sleep(5)
+                continue
+            for update in updates:
+                # Acknowledged with the next poll, even when handling fails
+                offset = update.update_id + 1
+                if update.callback_query is None:
+                    continue
+                # Answered concurrently, so a press does not wait for the messages queued before it
+                task = asyncio.create_task(self.handle(update.callback_query))
+                self.answering.add(task)
+                task.add_done_callback(self.answering.discard)
+
+    async def handle(self, query):
+        try:
+            await self.answer(query)
+        except Exception as e:
+            # Nothing awaits this task, and push() shares the session
+            db.session.rollback()
+            logger.error('Error handling %s: %s', query.data, e)
+
+    async def run(self):
+        # Requests whose message never went out, e.g. the bot was killed while sending
+        ApprovalRequest.query.filter(ApprovalRequest.chat_id.in_(self.chat_ids),
+                                     ApprovalRequest.message_id.is_(None)).delete(synchronize_session=False)
+        db.session.commit()
+        tasks = [asyncio.create_task(self.push()), asyncio.create_task(self.listen())]
+        await self.stopping.wait()
+        for task in tasks + list(self.answering):
+            task.cancel()
+        await asyncio.gather(*tasks, *self.answering, return_exceptions=True)
+
+    def stop(self):
+        self.stopping.set()
+
+
+async def main():
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_IDS:
+        print("❌ TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_IDS must be set.")
+        return 1
+    # Sends run concurrently, so they need more than the default single connection
+    request = HTTPXRequest(connection_pool_size=16, read_timeout=30, connect_timeout=30, pool_timeout=30)
+    get_updates_request = HTTPXRequest(read_timeout=LONG_POLL_SECONDS + 10, connect_timeout=30)
+    bot = Bot(token=TELEGRAM_BOT_TOKEN, base_url=TELEGRAM_API_URL, request=request,
+              get_updates_request=get_updates_request)
     try:
-        await bot.send_message(chat_id=USER_CHAT_ID, text="Choose a post:", reply_markup=markup)
-    except TimedOut:
-        print("❌ Connection to Telegram timed out.")
-    except NetworkError:
-        print("❌ Network error.")
+        await bot.initialize()
     except TelegramError as e:
         print(f"❌ Telegram error: {e}")
+        return 1
+
+    service = ApprovalBot(bot, TELEGRAM_CHAT_IDS)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, service.stop)
+    logger.info('Approval bot @%s serving chats %s', bot.username, TELEGRAM_CHAT_IDS)
+    try:
+        await service.run()
+    finally:
+        await bot.shutdown()
+    return 0
+
 
-app = create_app()
-with app.app_context():
-    #asyncio.run(get_me())
-    markup = InlineKeyboardMarkup(keyboard)
-    asyncio.run(send_message())
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    logging.getLogger('httpx').setLevel(logging.WARNING)  # one line per request otherwise
+    app = create_worker_app()
+    with app.app_context():
+        exit(asyncio.run(main()))
@@ -1,11 +1,14 @@
 import os
 import time
 
-from data.db import db
-from extensions import login_manager, oauth
+import assets
+from data.db import configure_db, db
+from extensions import cache, login_manager, oauth, profiler
 from flask import Flask, session
 from flask_migrate import Migrate
 from models.news import News
+# Only the Telegram bot uses it, imported so that `flask db migrate` sees its table
+import models.approval  # noqa: F401
 
 migrate = Migrate()
 
@@ -17,13 +20,11 @@ def create_app():
     login_manager.init_app(app)
 
     oauth.init_app(app)
+    cache.init_app(app)
+    assets.init_app(app)
+    profiler.init_app(app)
 
-    basedir = os.path.dirname(os.path.abspath(__file__))
-    # Configure SQLite database
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'data/contentoire.db')
-    # print(f"Database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
+    configure_db(app)
     db.init_app(app)
     migrate.init_app(app, db)
 
@@ -54,11 +55,11 @@ app = create_app()
 @app.before_request
 def before_request():
     if (token := (s := session).get('google_oauth_token')):
-        print("Token expiring in", token['expires_at']-time.time())
         if time.time() >= token['expires_at']:
-            print("Token expired, removing from session")
+            app.logger.info("Google OAuth token expired, removing from session")
             del s['google_oauth_token']
 
 if __name__ == "__main__":
+    # Development server only, use gunicorn.conf.py in production
     context = ('../certs/gpu.pem', '../certs/gpu-key.pem')
-    app.run(host='0.0.0.0', ssl_context=context, debug=True, port=8443)
+    app.run(host='0.0.0.0', ssl_context=context, debug=os.environ.get('FLASK_DEBUG', '1') == '1', port=8443)